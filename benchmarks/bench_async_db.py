@@ -0,0 +1,89 @@
+# benchmarks/bench_async_db.py
+#
+# Compara o tempo total de um "burst" de atualizações concorrentes quando o
+# handler usa a sessão síncrona (SessionLocal) dentro de um `async def` versus a
+# sessão assíncrona (AsyncSessionLocal).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_async_db --updates 50 --latency-ms 20
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Banco temporário, para não tocar no banco de desenvolvimento.
+_tmpdir = tempfile.mkdtemp(prefix="bench_async_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import event, text  # noqa: E402
+
+from database.database import engine, async_engine, SessionLocal, AsyncSessionLocal, create_db_and_tables  # noqa: E402
+from database.models import User  # noqa: E402
+
+# Consulta que simula a latência de ida e volta de um banco remoto.
+SLOW_QUERY = text("SELECT sleep_ms(:ms), id FROM users WHERE id = :id")
+
+
+def _sleep_ms(ms: int) -> int:
+    time.sleep(ms / 1000)
+    return ms
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, _sleep_ms)
+
+
+async def sync_handler(user_id: int, latency_ms: int) -> None:
+    """Padrão antigo: sessão síncrona dentro de um handler assíncrono."""
+    db = SessionLocal()
+    try:
+        db.execute(SLOW_QUERY, {"ms": latency_ms, "id": user_id}).first()
+    finally:
+        db.close()
+
+
+async def async_handler(user_id: int, latency_ms: int) -> None:
+    """Padrão novo: sessão assíncrona, a consulta não bloqueia o event loop."""
+    async with AsyncSessionLocal() as db:
+        (await db.execute(SLOW_QUERY, {"ms": latency_ms, "id": user_id})).first()
+
+
+async def run_burst(handler, updates: int, latency_ms: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(user_id, latency_ms) for user_id in range(updates)))
+    return time.perf_counter() - started
+
+
+async def main(updates: int, latency_ms: int) -> None:
+    create_db_and_tables()
+    with SessionLocal() as db:
+        db.add_all(User(id=user_id, full_name=f"Usuário {user_id}") for user_id in range(updates))
+        db.commit()
+
+    # Aquece os pools de conexão antes de medir.
+    await run_burst(sync_handler, 1, 0)
+    await run_burst(async_handler, 1, 0)
+
+    sync_elapsed = await run_burst(sync_handler, updates, latency_ms)
+    async_elapsed = await run_burst(async_handler, updates, latency_ms)
+
+    print(f"{updates} atualizações concorrentes, {latency_ms} ms por consulta")
+    print(f"  sessão síncrona:   {sync_elapsed * 1000:8.1f} ms (serializado: ~{updates * latency_ms} ms)")
+    print(f"  sessão assíncrona: {async_elapsed * 1000:8.1f} ms")
+    print(f"  ganho: {sync_elapsed / async_elapsed:.1f}x")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da camada de banco assíncrona.")
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    event.listen(engine, "connect", _register_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sleep)
+    asyncio.run(main(args.updates, args.latency_ms))
@@ -0,0 +1,53 @@
+# benchmarks/bench_catalog_import.py
+#
+# Vazão e pico de memória da importação de catálogo (import_catalog.py) para arquivos
+# CSV de tamanhos crescentes: a memória deve ficar constante, limitada pelo lote.
+# Cada arquivo é importado duas vezes (inserção e, depois, atualização por nome).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_catalog_import --sizes 10000,100000 --batch-size 1000
+
+import argparse
+import csv
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_catalog_import_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from database.database import create_db_and_tables  # noqa: E402
+from import_catalog import import_catalog  # noqa: E402
+
+
+def write_catalog(path: Path, rows: int, prefix: str) -> None:
+    with path.open("w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "description", "price", "content"])
+        for index in range(rows):
+            writer.writerow([f"{prefix} {index}", f"Descrição do produto {index}", f"{index % 500}.90",
+                             f"https://example.com/conteudo/{index}"])
+
+
+def main(sizes: list[int], batch_size: int) -> None:
+    create_db_and_tables()
+    print(f"lotes de {batch_size}:")
+    for rows in sizes:
+        path = Path(_tmpdir) / f"catalog_{rows}.csv"
+        write_catalog(path, rows, f"Produto {rows}")
+        for label in ("inserção", "atualização"):
+            tracemalloc.start()
+            report = import_catalog(path, batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  {rows:>7} linhas, {label:<11} {report.rows_per_second:8.0f} linhas/s | "
+                  f"pico de memória {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vazão e memória da importação de catálogo.")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.batch_size)
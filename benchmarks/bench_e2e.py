@@ -0,0 +1,281 @@
+# benchmarks/bench_e2e.py
+#
+# Benchmark de ponta a ponta: sobe o projeto inteiro (FastAPI + bot no mesmo loop,
+# modo webhook) apontado para um Telegram e um Mercado Pago falsos, com latência
+# e taxa de erro configuráveis, e leva N usuários simulados pelo fluxo completo:
+#
+#     /start -> catálogo -> comprar -> webhook assinado do Mercado Pago -> entrega
+#
+# Mostra vazão, p50/p95/p99 por etapa, consultas ao banco e chamadas às APIs, e
+# salva o resultado em benchmarks/results/ para comparar versões (--compare).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_e2e --users 100 --concurrency 25
+#     python -m benchmarks.bench_e2e --users 100 --compare benchmarks/results/<anterior>.json
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from itertools import count
+from pathlib import Path
+
+from benchmarks.common import free_port, percentile, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_e2e_")
+_app_port = free_port()
+_mp_port = free_port()
+_tg_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+os.environ["MERCADO_PAGO_NOTIFICATION_URL"] = f"http://127.0.0.1:{_app_port}/webhook/mercadopago"
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{_tg_port}"
+os.environ["WEBHOOK_SECRET"] = "bench-secret"
+os.environ["TELEGRAM_WEBHOOK_SECRET"] = "bench-telegram-secret"
+os.environ["APP_ROLE"] = "all"
+os.environ["BOT_RUN_MODE"] = "webhook"
+os.environ.pop("TELEGRAM_WEBHOOK_URL", None)
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STAGES = ("start", "catalog", "buy", "webhook", "delivery", "total")
+PIX_CODE = re.compile(r"PIXFAKE(\d+)")
+
+_update_ids = count(1)
+
+
+def message_update(user_id: int, text: str) -> dict:
+    message = {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": next(_update_ids), "message": message}
+
+
+def callback_update(user_id: int, data: str) -> dict:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "Catálogo"},
+        },
+    }
+
+
+def seed_products(products: int) -> list[int]:
+    from database.catalog import bump_catalog_version
+    from database.database import SessionLocal, create_db_and_tables
+    from database.models import Product
+
+    create_db_and_tables()
+    with SessionLocal() as db:
+        db.add_all(
+            Product(id=product_id, name=f"Produto {product_id}", description="Conteúdo de teste.",
+                    price=Decimal("9.90"), content=f"https://example.com/{product_id}")
+            for product_id in range(1, products + 1)
+        )
+        bump_catalog_version(db)
+        db.commit()
+    return list(range(1, products + 1))
+
+
+async def expect(fake_tg, chat_id: int, marker: str, timeout: float) -> str:
+    """Espera a mensagem do bot para o chat que contém `marker`, ignorando as demais."""
+    deadline = time.monotonic() + timeout
+    while True:
+        _, text = await fake_tg.next_message(chat_id, timeout=max(0.01, deadline - time.monotonic()))
+        if marker in text:
+            return text
+
+
+async def user_flow(user_id: int, product_id: int, client, fake_tg, fake_mp, stats: dict, timeout: float) -> None:
+    headers = {"x-telegram-bot-api-secret-token": "bench-telegram-secret"}
+
+    async def send_update(update: dict) -> None:
+        response = await client.post("/webhook/telegram", json=update, headers=headers)
+        response.raise_for_status()
+
+    flow_started = started = time.perf_counter()
+    await send_update(message_update(user_id, "/start"))
+    await expect(fake_tg, user_id, "Bem-vindo", timeout)
+    stats["start"].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await send_update(message_update(user_id, "🛍️ Ver Produtos"))
+    await expect(fake_tg, user_id, "Produto", timeout)
+    stats["catalog"].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await send_update(callback_update(user_id, f"buy_{product_id}"))
+    code = await expect(fake_tg, user_id, "PIXFAKE", timeout)
+    stats["buy"].append(time.perf_counter() - started)
+    payment_id = PIX_CODE.search(code).group(1)
+
+    # O usuário paga: o Mercado Pago aprova e notifica o webhook.
+    fake_mp.approve(payment_id)
+    started = time.perf_counter()
+    response = await fake_mp.notify(payment_id, client)
+    response.raise_for_status()
+    stats["webhook"].append(time.perf_counter() - started)
+    await expect(fake_tg, user_id, "Pagamento aprovado", timeout)
+    stats["delivery"].append(time.perf_counter() - started)
+    stats["total"].append(time.perf_counter() - flow_started)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(stats: dict) -> dict:
+    return {
+        stage: {
+            "count": len(stats[stage]),
+            "p50_ms": round(percentile(stats[stage], 50) * 1000, 2),
+            "p95_ms": round(percentile(stats[stage], 95) * 1000, 2),
+            "p99_ms": round(percentile(stats[stage], 99) * 1000, 2),
+        }
+        for stage in STAGES
+    }
+
+
+def compare(result: dict, previous_path: str, threshold: float) -> bool:
+    """Compara com um resultado salvo; retorna False se houver regressão acima do limite."""
+    previous = json.loads(Path(previous_path).read_text(encoding="utf-8"))
+    ok = True
+    print(f"\nComparação com {previous_path} (commit {previous.get('commit')}):")
+
+    def line(label: str, old: float, new: float, higher_is_worse: bool) -> None:
+        nonlocal ok
+        change = (new - old) / old if old else 0.0
+        worse = change > threshold if higher_is_worse else change < -threshold
+        ok = ok and not worse
+        flag = "  <-- REGRESSÃO" if worse else ""
+        print(f"  {label:<22} {old:>10.1f} -> {new:>10.1f} ({change:+.1%}){flag}")
+
+    line("vazão (fluxos/s)", previous["throughput"], result["throughput"], higher_is_worse=False)
+    for stage in STAGES:
+        line(f"{stage} p95 (ms)", previous["stages"][stage]["p95_ms"], result["stages"][stage]["p95_ms"], True)
+    line("consultas por usuário", previous["db_queries_per_user"], result["db_queries_per_user"], True)
+    return ok
+
+
+async def main(args) -> dict:
+    import httpx
+
+    from benchmarks.fake_mercadopago import FakeMercadoPago
+    from benchmarks.fake_telegram import FakeTelegram
+    from core.metrics import DB_QUERY_SECONDS
+    from web.server import api
+
+    product_ids = seed_products(args.products)
+    fake_mp = FakeMercadoPago(latency=args.mp_latency, error_rate=args.mp_error_rate, webhook_secret="bench-secret")
+    fake_tg = FakeTelegram(latency=args.telegram_latency, error_rate=args.telegram_error_rate)
+    mp_server = await start_server(fake_mp.app, _mp_port)
+    tg_server = await start_server(fake_tg.app, _tg_port)
+    app_server = await start_server(api, _app_port, lifespan="on")
+
+    stats: dict[str, list[float]] = defaultdict(list)
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    queries_before = DB_QUERY_SECONDS.count()
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{_app_port}", timeout=args.timeout) as client:
+
+        async def run_user(user_id: int) -> None:
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await user_flow(user_id, product_ids[user_id % len(product_ids)], client, fake_tg, fake_mp,
+                                    stats, args.timeout)
+                except Exception as e:
+                    failures += 1
+                    print(f"Usuário {user_id} não completou o fluxo: {e!r}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(user_id) for user_id in range(1, args.users + 1)))
+        elapsed = time.perf_counter() - started
+
+    queries = DB_QUERY_SECONDS.count() - queries_before
+    await stop_server(app_server)
+    await stop_server(tg_server)
+    await stop_server(mp_server)
+
+    completed = len(stats["total"])
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output", "no_save")},
+        "elapsed_s": round(elapsed, 3),
+        "completed": completed,
+        "failed": failures,
+        "throughput": round(completed / elapsed, 2),
+        "stages": summarize(stats),
+        "db_queries": queries,
+        "db_queries_per_user": round(queries / max(completed, 1), 1),
+        "mercadopago_requests": fake_mp.requests,
+        "telegram_calls": dict(fake_tg.calls),
+    }
+
+
+def report(result: dict) -> None:
+    print(f"\n{result['completed']} fluxos completos ({result['failed']} falhas) em {result['elapsed_s']:.2f} s: "
+          f"{result['throughput']:.2f} fluxos/s")
+    print(f"  {'etapa':<10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for stage, values in result["stages"].items():
+        print(f"  {stage:<10} {values['p50_ms']:>10.1f} {values['p95_ms']:>10.1f} {values['p99_ms']:>10.1f}")
+    print(f"  consultas ao banco: {result['db_queries']} ({result['db_queries_per_user']} por usuário)")
+    print(f"  chamadas ao Mercado Pago: {result['mercadopago_requests']} | Telegram: {result['telegram_calls']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta com Telegram e Mercado Pago falsos.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--products", type=int, default=12)
+    parser.add_argument("--mp-latency", type=float, default=0.1)
+    parser.add_argument("--mp-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.03)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-rate", type=float, default=None,
+                        help="Sobrescreve TELEGRAM_GLOBAL_RATE (msg/s) para medir o resto do sistema.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Arquivo do resultado (padrão: benchmarks/results/e2e-<data>-<commit>.json)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", help="Resultado salvo anteriormente, para comparar.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Piora relativa considerada regressão.")
+    args = parser.parse_args()
+
+    # Antes de importar o projeto: a configuração é lida na importação.
+    if args.telegram_rate is not None:
+        os.environ["TELEGRAM_GLOBAL_RATE"] = str(args.telegram_rate)
+
+    result = asyncio.run(main(args))
+    report(result)
+
+    if not args.no_save:
+        output = Path(args.output) if args.output else RESULTS_DIR / (
+            f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Resultado salvo em {output}")
+
+    if args.compare and not compare(result, args.compare, args.threshold):
+        raise SystemExit(1)
@@ -0,0 +1,89 @@
+# benchmarks/bench_file_delivery.py
+#
+# Entrega de um produto em arquivo com e sem o cache de file_id: sem cache, cada venda
+# faz o upload do arquivo de novo; com cache, só a primeira. O Telegram falso simula a
+# banda de upload (--upload-mbps) e conta os bytes recebidos.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_file_delivery --deliveries 20 --size-mb 5 --upload-mbps 50
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks.common import free_port, percentile, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_file_delivery_")
+_tg_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{_tg_port}"
+os.environ["PRODUCT_FILES_DIR"] = _tmpdir
+
+from benchmarks.fake_telegram import FakeTelegram  # noqa: E402
+from bot.delivery import deliver_product  # noqa: E402
+from bot.dispatcher import TelegramDispatcher, build_bot_client  # noqa: E402
+from database.catalog import save_product_file_id  # noqa: E402
+from database.database import AsyncSessionLocal, SessionLocal, async_engine, create_db_and_tables  # noqa: E402
+from database.models import Order, Product  # noqa: E402
+
+
+def seed(size_mb: float) -> int:
+    with open(os.path.join(_tmpdir, "ebook.pdf"), "wb") as file:
+        file.write(os.urandom(int(size_mb * 1024 * 1024)))
+    create_db_and_tables()
+    with SessionLocal() as db:
+        product = Product(name="E-book", description="-", price=Decimal("9.90"), content="ebook.pdf")
+        db.add(product)
+        db.commit()
+        return product.id
+
+
+async def deliver(product_id: int, dispatcher: TelegramDispatcher, deliveries: int, cached: bool) -> list[float]:
+    latencies = []
+    for index in range(deliveries):
+        async with AsyncSessionLocal() as db:
+            if not cached:
+                await save_product_file_id(db, product_id, None)
+            # Como em fulfill_order: o produto é relido a cada entrega.
+            product = await db.get(Product, product_id)
+        order = Order(id=uuid.uuid4(), user_id=1000 + index, product_id=product_id)
+        started = time.perf_counter()
+        assert await deliver_product(order, product, dispatcher)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main(deliveries: int, size_mb: float, upload_mbps: float) -> None:
+    product_id = seed(size_mb)
+    fake_tg = FakeTelegram(latency=0.02, upload_rate=upload_mbps * 1_000_000 / 8)
+    tg_server = await start_server(fake_tg.app, _tg_port)
+    bot = build_bot_client()
+    await bot.initialize()
+    dispatcher = TelegramDispatcher(bot, global_rate=1000, chat_rate=1000, chat_burst=1000)
+    dispatcher.start()
+
+    print(f"{deliveries} entregas de um arquivo de {size_mb:.1f} MB, upload a {upload_mbps:.0f} Mbit/s:")
+    for label, cached in (("sem cache (upload sempre)", False), ("com cache de file_id", True)):
+        before = fake_tg.bytes_received.get("sendDocument", 0)
+        latencies = await deliver(product_id, dispatcher, deliveries, cached)
+        uploaded = fake_tg.bytes_received.get("sendDocument", 0) - before
+        print(f"  {label:<26} p50={percentile(latencies, 50) * 1000:7.1f} ms "
+              f"p95={percentile(latencies, 95) * 1000:7.1f} ms | enviados {uploaded / 1024 / 1024:7.1f} MB")
+
+    await dispatcher.stop()
+    await bot.shutdown()
+    await stop_server(tg_server)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrega de produto em arquivo com e sem cache de file_id.")
+    parser.add_argument("--deliveries", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--upload-mbps", type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.deliveries, args.size_mb, args.upload_mbps))
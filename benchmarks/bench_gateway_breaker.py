@@ -0,0 +1,169 @@
+# benchmarks/bench_gateway_breaker.py
+#
+# Cliques em "Comprar" durante uma pane do Mercado Pago (gateway lento e respondendo
+# 503), com e sem o disjuntor de payments/breaker.py. Os cliques passam pelo bot de
+# verdade (Application + handlers) contra o Mercado Pago falso, chegando a uma taxa
+# fixa. Mostra a latência de cada clique até a resposta, as chamadas que chegaram ao
+# gateway, os pedidos gravados e quantos ficaram PENDING sem cobrança. Depois o gateway
+# volta e, passado o tempo de circuito aberto, as compras voltam a gerar cobrança (aí a
+# latência inclui o envio do QR Code e do código, limitado pelo dispatcher). O bot roda
+# como APP_ROLE=bot, e ao final o estado do disjuntor e as chamadas recusadas são lidos do
+# /metrics do próprio processo do bot, como numa implantação separada.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_gateway_breaker --clicks 200 --rate 50 --gateway-latency 0.5
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from decimal import Decimal
+
+from benchmarks.common import FakeBot, free_port, percentile, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_gateway_breaker_")
+_mp_port = free_port()
+_metrics_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+os.environ["BOT_RUN_MODE"] = "webhook"
+os.environ["APP_ROLE"] = "bot"
+os.environ["SERVER_HOST"] = "127.0.0.1"
+os.environ["METRICS_PORT"] = str(_metrics_port)
+os.environ["TELEGRAM_WEBHOOK_SECRET"] = "bench-telegram-secret"
+os.environ.pop("TELEGRAM_WEBHOOK_URL", None)
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from telegram import Update  # noqa: E402
+
+from benchmarks.fake_mercadopago import FakeMercadoPago  # noqa: E402
+from bot.bot import run_bot, setup_bot  # noqa: E402
+from core.config import (  # noqa: E402
+    MP_BREAKER_FAILURE_RATE, MP_BREAKER_HALF_OPEN_CALLS, MP_BREAKER_MIN_CALLS, MP_BREAKER_SLOW_CALL_RATE,
+    MP_BREAKER_SLOW_CALL_SECONDS, MP_BREAKER_WINDOW_SECONDS, MP_MAX_IN_FLIGHT,
+)
+from database.database import SessionLocal, async_engine, create_db_and_tables  # noqa: E402
+from database.models import Order, OrderStatus, Product  # noqa: E402
+from payments.breaker import CircuitBreaker  # noqa: E402
+from payments.mercadopago import mp_client  # noqa: E402
+
+
+def buy_update(user_id: int, product_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"}
+    return {
+        "update_id": user_id,
+        "callback_query": {
+            "id": str(user_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": f"buy_{product_id}",
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "Catálogo"},
+        },
+    }
+
+
+def breaker(enabled: bool, open_seconds: float) -> CircuitBreaker:
+    if not enabled:
+        # Limiares inalcançáveis: toda chamada vai ao gateway, como antes do disjuntor.
+        return CircuitBreaker("bench", failure_rate=2, slow_call_seconds=float("inf"), slow_call_rate=2,
+                              window=1, min_calls=10 ** 9, open_seconds=0, half_open_calls=1,
+                              max_in_flight=10 ** 9)
+    return CircuitBreaker("bench", failure_rate=MP_BREAKER_FAILURE_RATE,
+                          slow_call_seconds=MP_BREAKER_SLOW_CALL_SECONDS, slow_call_rate=MP_BREAKER_SLOW_CALL_RATE,
+                          window=MP_BREAKER_WINDOW_SECONDS, min_calls=MP_BREAKER_MIN_CALLS,
+                          open_seconds=open_seconds, half_open_calls=MP_BREAKER_HALF_OPEN_CALLS,
+                          max_in_flight=MP_MAX_IN_FLIGHT)
+
+
+def order_statuses(first_user: int, last_user: int) -> tuple[Counter, int]:
+    """Pedidos dos usuários por status e quantos estão PENDING sem cobrança (órfãos)."""
+    users = Order.user_id.between(first_user, last_user)
+    with SessionLocal() as db:
+        statuses = Counter(dict(db.execute(select(Order.status, func.count()).where(users).group_by(Order.status)).all()))
+        orphans = db.scalar(select(func.count()).select_from(Order).where(
+            users, Order.status == OrderStatus.PENDING, Order.gateway_payment_id.is_(None)))
+    return statuses, orphans
+
+
+async def scrape_breaker_metrics() -> list[str]:
+    """Séries do disjuntor expostas no /metrics do processo do bot (APP_ROLE=bot)."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"http://127.0.0.1:{_metrics_port}/metrics")
+    response.raise_for_status()
+    return [line for line in response.text.splitlines()
+            if line.startswith(("mercadopago_circuit_state", "mercadopago_rejected_calls"))]
+
+
+async def click_burst(application, first_user: int, clicks: int, rate: float) -> list[float]:
+    """Um clique por usuário novo, `rate` por segundo; devolve o tempo até cada um ser respondido."""
+    async def click(user_id: int) -> float:
+        update = Update.de_json(buy_update(user_id, 1), application.bot)
+        started = time.perf_counter()
+        await application.process_update(update)
+        return time.perf_counter() - started
+
+    tasks = []
+    for offset in range(clicks):
+        tasks.append(asyncio.create_task(click(first_user + offset)))
+        await asyncio.sleep(1 / rate)
+    return await asyncio.gather(*tasks)
+
+
+async def scenario(application, fake_mp: FakeMercadoPago, label: str, first_user: int,
+                   clicks: int, rate: float) -> None:
+    requests_before = fake_mp.requests
+    latencies = await click_burst(application, first_user, clicks, rate)
+    statuses, orphans = order_statuses(first_user, first_user + clicks - 1)
+    print(f"  {label:<15} p50={percentile(latencies, 50) * 1000:7.1f} ms p99={percentile(latencies, 99) * 1000:7.1f} ms"
+          f" | {fake_mp.requests - requests_before:>4} chamadas ao gateway"
+          f" | {sum(statuses.values()):>4} pedidos: {statuses[OrderStatus.PENDING]:>4} com cobrança,"
+          f" {statuses[OrderStatus.FAILED]:>4} FAILED, {orphans} órfãos")
+    assert orphans == 0, "pedido PENDING sem cobrança"
+
+
+async def main(clicks: int, rate: float, gateway_latency: float, open_seconds: float) -> None:
+    create_db_and_tables()
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="Bench", description="Bench", price=Decimal("1.00"), content="ok"))
+        db.commit()
+    fake_mp = FakeMercadoPago(latency=gateway_latency, error_rate=1.0)
+    mp_server = await start_server(fake_mp.app, _mp_port)
+    application = setup_bot(bot=FakeBot())
+
+    print(f"{clicks} cliques a {rate:.0f}/s; gateway com {gateway_latency * 1000:.0f} ms e 503 em toda chamada:")
+    next_user = 1
+    async with run_bot(application):
+        for enabled in (False, True):
+            mp_client.breaker = breaker(enabled, open_seconds)
+            await scenario(application, fake_mp, "com disjuntor" if enabled else "sem disjuntor",
+                           next_user, clicks, rate)
+            next_user += clicks
+
+        # Gateway recuperado: depois de `open_seconds` as chamadas de teste passam e o circuito fecha.
+        fake_mp.latency, fake_mp.error_rate = 0.05, 0.0
+        await asyncio.sleep(open_seconds)
+        await scenario(application, fake_mp, "após recuperar", next_user, clicks, rate)
+        print(f"  estado do disjuntor: {mp_client.breaker.state.name}")
+
+        series = await scrape_breaker_metrics()
+        print("  /metrics do bot:")
+        for line in series:
+            print(f"    {line}")
+        assert any(line.startswith("mercadopago_circuit_state ") for line in series)
+        assert any('operation="create"' in line for line in series), "recusas da criação não exportadas"
+
+    await stop_server(mp_server)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compras durante uma pane do gateway, com e sem disjuntor.")
+    parser.add_argument("--clicks", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--gateway-latency", type=float, default=0.5)
+    parser.add_argument("--open-seconds", type=float, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.clicks, args.rate, args.gateway_latency, args.open_seconds))
@@ -0,0 +1,88 @@
+# benchmarks/bench_logging.py
+#
+# Quanto o event loop espera por log quando a saída está lenta (pipe cheio, terminal,
+# coletor de logs atrasado): StreamHandler direto no root (como o logging.basicConfig
+# anterior) contra a fila de core/log.py, em que um thread próprio faz a escrita.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_logging --records 2000 --sink-latency 0.5
+
+import argparse
+import asyncio
+import io
+import logging
+import sys
+import time
+
+from benchmarks.common import percentile
+from core.log import JsonFormatter, setup_logging, stop_logging
+
+
+class SlowStream(io.StringIO):
+    """Saída que demora `latency` segundos em cada escrita."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        return super().write(text)
+
+
+async def run(records: int) -> tuple[float, list[float]]:
+    """Registra `records` eventos no loop; devolve o tempo por chamada e os atrasos do loop."""
+    logger = logging.getLogger("bench")
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    for index in range(records):
+        logger.info("Pedido %s atualizado para PAGO.", index, extra={"order_id": index, "user_id": index})
+        if index % 10 == 0:
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return elapsed / records, lags
+
+
+def report(label: str, per_call: float, lags: list[float]) -> None:
+    print(f"  {label:<22} {per_call * 1e6:9.1f} µs/log | atraso do loop "
+          f"p99={percentile(lags, 99) * 1000:.2f} ms max={max(lags) * 1000:.2f} ms")
+
+
+def main(records: int, sink_latency: float) -> None:
+    print(f"{records} logs, saída com {sink_latency * 1000:.1f} ms por escrita:")
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+
+    blocking = logging.StreamHandler(SlowStream(sink_latency))
+    blocking.setFormatter(JsonFormatter())
+    root.addHandler(blocking)
+    report("StreamHandler direto", *asyncio.run(run(records)))
+    root.removeHandler(blocking)
+
+    stdout, sys.stdout = sys.stdout, SlowStream(sink_latency)
+    try:
+        setup_logging()
+        result = asyncio.run(run(records))
+        stop_logging()
+    finally:
+        sys.stdout = stdout
+    report("fila (core/log.py)", *result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo de logar no event loop com uma saída lenta.")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--sink-latency", type=float, default=0.5, help="Milissegundos por escrita.")
+    args = parser.parse_args()
+    main(args.records, args.sink_latency / 1000)
@@ -0,0 +1,62 @@
+# benchmarks/bench_metrics.py
+#
+# Custo da instrumentação de core/metrics.py por chamada (observe, inc, time)
+# e da renderização de /metrics, para confirmar que dá para deixar ligada em produção.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_metrics --iterations 200000
+
+import argparse
+import random
+import time
+
+from core.metrics import Counter, Histogram, Registry
+
+
+def per_call(label: str, function, iterations: int) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {elapsed / iterations * 1e9:.0f} ns por chamada")
+
+
+def main(iterations: int) -> None:
+    registry = Registry()
+    histogram = registry.register(Histogram("bench_seconds", "Bench.", ("operation", "outcome")))
+    counter = registry.register(Counter("bench_events", "Bench.", ("from_status", "to_status")))
+    values = [random.expovariate(20) for _ in range(1024)]
+
+    def observe():
+        histogram.observe(values[iterations & 1023], operation="get", outcome="2xx")
+
+    def inc():
+        counter.inc(from_status="PENDING", to_status="PAID")
+
+    def timer():
+        with histogram.time(operation="create", outcome="2xx"):
+            pass
+
+    def baseline():
+        pass
+
+    per_call("chamada vazia (referência)", baseline, iterations)
+    per_call("Histogram.observe", observe, iterations)
+    per_call("Counter.inc", inc, iterations)
+    per_call("Histogram.time (context manager)", timer, iterations)
+
+    # Cardinalidade parecida com a do projeto: algumas dezenas de séries.
+    for operation in ("create", "get", "search"):
+        for outcome in ("2xx", "4xx", "5xx", "error"):
+            histogram.observe(0.1, operation=operation, outcome=outcome)
+    started = time.perf_counter()
+    for _ in range(100):
+        body = registry.render()
+    print(f"render de /metrics: {(time.perf_counter() - started) / 100 * 1000:.2f} ms ({len(body)} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo da instrumentação de métricas.")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.iterations)
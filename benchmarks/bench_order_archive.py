@@ -0,0 +1,158 @@
+# benchmarks/bench_order_archive.py
+#
+# Tabela orders com e sem o arquivamento de database/archive.py enquanto o volume
+# cresce: a cada rodada entra um "mês" de pedidos e, no banco com arquivamento, os
+# pedidos em estado final mais antigos que --archive-after-months vão para
+# orders_archive em lotes. Mostra o tamanho da tabela quente (linhas e MiB com os
+# índices), a latência das buscas do webhook (pela chave primária e por
+# gateway_payment_id) e do histórico, e o maior tempo de um lote (duração do lock).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_order_archive --rounds 8 --orders-per-round 40000
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_order_archive_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'archived.db')}"
+
+from sqlalchemy import create_engine, func, insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from benchmarks.common import percentile  # noqa: E402
+from core.config import ORDER_ARCHIVE_BATCH_SIZE  # noqa: E402
+from database.archive import archive_orders_batch  # noqa: E402
+from database.database import (  # noqa: E402
+    AsyncSessionLocal, SessionLocal, apply_sqlite_pragmas, async_engine, engine, to_async_url, utcnow,
+)
+from database.models import Base, Order, OrderArchive, OrderStatus, Product, User  # noqa: E402
+from database.orders import fetch_order_history, get_order_status  # noqa: E402
+
+BASELINE_URL = f"sqlite:///{os.path.join(_tmpdir, 'baseline.db')}"
+USERS = 5000
+MONTH = timedelta(days=30)
+LOOKUPS = 300
+
+
+def orders_for_month(rng: random.Random, month_end, count: int) -> list[dict]:
+    rows = []
+    for _ in range(count):
+        created_at = month_end - timedelta(seconds=rng.uniform(0, MONTH.total_seconds()))
+        rows.append({
+            "id": uuid.uuid4(),
+            "user_id": rng.randint(1, USERS),
+            "product_id": rng.randint(1, 20),
+            "status": rng.choice((OrderStatus.PAID, OrderStatus.EXPIRED, OrderStatus.EXPIRED, OrderStatus.FAILED)),
+            "gateway_payment_id": str(rng.getrandbits(60)),
+            "pix_qr_code": "0" * 150,
+            "created_at": created_at,
+        })
+    return rows
+
+
+def setup(sync_engine) -> None:
+    Base.metadata.create_all(sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(insert(User), [{"id": user_id, "full_name": f"Usuário {user_id}"}
+                                    for user_id in range(1, USERS + 1)])
+        conn.execute(insert(Product), [{"id": product_id, "name": f"Produto {product_id}", "description": "-",
+                                        "price": Decimal("9.90"), "content": "-"} for product_id in range(1, 21)])
+
+
+def table_mib(sync_engine, table: str) -> float:
+    """Tamanho da tabela e dos seus índices no arquivo SQLite (tabela virtual dbstat)."""
+    with sync_engine.connect() as conn:
+        names = [table] + [row[0] for row in conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {"table": table})]
+        size = sum(conn.execute(text("SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name = :name"),
+                                {"name": name}).scalar() for name in names)
+    return size / 1024 / 1024
+
+
+async def lookups(session_factory, recent: list[dict]) -> dict[str, float]:
+    """p50 (ms) das buscas do webhook e do histórico sobre pedidos recentes."""
+    rng = random.Random(1)
+    timings: dict[str, list[float]] = {"id": [], "gateway": [], "history": []}
+    async with session_factory() as db:
+        for row in rng.sample(recent, LOOKUPS):
+            started = time.perf_counter()
+            await get_order_status(db, row["id"])
+            timings["id"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await db.scalar(select(Order.id).where(Order.gateway_payment_id == row["gateway_payment_id"]))
+            timings["gateway"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await fetch_order_history(db, row["user_id"], None, 6)
+            timings["history"].append(time.perf_counter() - started)
+    return {name: percentile(values, 50) * 1000 for name, values in timings.items()}
+
+
+async def archive(cutoff, batch_size: int) -> tuple[int, float]:
+    """Arquiva tudo o que passou do corte; devolve (pedidos movidos, maior lote em ms)."""
+    moved_total, slowest = 0, 0.0
+    while True:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            moved = await archive_orders_batch(db, cutoff, batch_size)
+        slowest = max(slowest, time.perf_counter() - started)
+        moved_total += moved
+        if moved < batch_size:
+            return moved_total, slowest * 1000
+
+
+async def main(rounds: int, orders_per_round: int, archive_after_months: int, batch_size: int) -> None:
+    setup(engine)
+    baseline_engine = create_engine(BASELINE_URL)
+    apply_sqlite_pragmas(baseline_engine)
+    setup(baseline_engine)
+    baseline_async = create_async_engine(to_async_url(BASELINE_URL))
+    BaselineSession = async_sessionmaker(baseline_async, expire_on_commit=False)
+
+    rng = random.Random(42)
+    start = utcnow() - MONTH * rounds
+    print(f"{orders_per_round} pedidos por mês; arquivamento após {archive_after_months} meses, "
+          f"lotes de {batch_size} (p50 em ms)")
+    print(f"{'mês':>3} {'total':>8} | {'sem arquivamento: linhas':>24} {'MiB':>6} {'id':>6} {'gw':>6} {'hist':>6} "
+          f"| {'com arquivamento: linhas':>24} {'MiB':>6} {'id':>6} {'gw':>6} {'hist':>6} {'lote':>7}")
+    for month in range(1, rounds + 1):
+        month_end = start + MONTH * month
+        rows = orders_for_month(rng, month_end, orders_per_round)
+        with baseline_engine.begin() as conn:
+            conn.execute(insert(Order), rows)
+        with SessionLocal() as db:
+            db.execute(insert(Order), rows)
+            db.commit()
+
+        _, slowest = await archive(month_end - MONTH * archive_after_months, batch_size)
+        with SessionLocal() as db:
+            hot = db.scalar(select(func.count()).select_from(Order))
+            archived = db.scalar(select(func.count()).select_from(OrderArchive))
+        baseline = await lookups(BaselineSession, rows)
+        current = await lookups(AsyncSessionLocal, rows)
+        print(f"{month:>3} {hot + archived:>8} "
+              f"| {month * orders_per_round:>24} {table_mib(baseline_engine, 'orders'):>6.1f} "
+              f"{baseline['id']:>6.3f} {baseline['gateway']:>6.3f} {baseline['history']:>6.3f} "
+              f"| {hot:>24} {table_mib(engine, 'orders'):>6.1f} "
+              f"{current['id']:>6.3f} {current['gateway']:>6.3f} {current['history']:>6.3f} {slowest:>7.1f}")
+
+    await baseline_async.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tamanho e latência da tabela orders com e sem arquivamento.")
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--orders-per-round", type=int, default=40000)
+    parser.add_argument("--archive-after-months", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=ORDER_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.orders_per_round, args.archive_after_months, args.batch_size))
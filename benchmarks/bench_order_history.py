@@ -0,0 +1,133 @@
+# benchmarks/bench_order_history.py
+#
+# Histórico de pedidos (/pedidos) de um usuário com muitos pedidos, numa tabela com
+# pedidos de vários usuários: keyset em (created_at, id) com o produto no mesmo SELECT
+# (database/orders.py) contra OFFSET e um SELECT do produto por pedido (N+1), em
+# páginas cada vez mais fundas, e o custo de uma página vinda do cache (bot/history.py).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_order_history --users 2000 --orders-per-user 50 --heavy-orders 5000
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_order_history_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from benchmarks.common import percentile  # noqa: E402
+from bot.history import OrderHistoryCache  # noqa: E402
+from core.metrics import DB_QUERY_SECONDS  # noqa: E402
+from database.database import AsyncSessionLocal, SessionLocal, async_engine, create_db_and_tables, utcnow  # noqa: E402
+from database.models import Order, OrderStatus, Product, User  # noqa: E402
+from database.orders import fetch_order_history  # noqa: E402
+
+PAGE_SIZE = 5
+HEAVY_USER = 1
+STATUSES = [OrderStatus.PAID, OrderStatus.PAID, OrderStatus.EXPIRED, OrderStatus.FAILED]
+
+
+def seed(users: int, orders_per_user: int, heavy_orders: int) -> None:
+    create_db_and_tables()
+    rng = random.Random(42)
+    now = utcnow()
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"id": user_id, "full_name": f"Usuário {user_id}"}
+                                  for user_id in range(1, users + 1)])
+        db.execute(insert(Product), [{"id": product_id, "name": f"Produto {product_id}", "description": "-",
+                                      "price": Decimal("9.90"), "content": "-"} for product_id in range(1, 51)])
+        rows = []
+        for user_id in range(1, users + 1):
+            count = heavy_orders if user_id == HEAVY_USER else orders_per_user
+            for _ in range(count):
+                rows.append({"id": uuid.uuid4(), "user_id": user_id, "product_id": rng.randint(1, 50),
+                             "status": rng.choice(STATUSES),
+                             "created_at": now - timedelta(minutes=rng.randint(1, 365 * 24 * 60))})
+                if len(rows) == 10_000:
+                    db.execute(insert(Order), rows)
+                    rows.clear()
+        if rows:
+            db.execute(insert(Order), rows)
+        db.commit()
+
+
+async def offset_page(user_id: int, page: int) -> list:
+    """Como seria sem keyset: OFFSET e o produto de cada pedido buscado à parte."""
+    async with AsyncSessionLocal() as db:
+        orders = (await db.scalars(
+            select(Order).where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc()).offset(page * PAGE_SIZE).limit(PAGE_SIZE + 1)
+        )).all()
+        return [(order, await db.get(Product, order.product_id)) for order in orders[:PAGE_SIZE]]
+
+
+async def keyset_cursors(user_id: int, pages: int) -> list[uuid.UUID | None]:
+    """Cursor (último pedido da página anterior) de cada página, percorrendo o histórico."""
+    cursors: list[uuid.UUID | None] = [None]
+    async with AsyncSessionLocal() as db:
+        while len(cursors) < pages:
+            rows = await fetch_order_history(db, user_id, cursors[-1], PAGE_SIZE)
+            if not rows:
+                break
+            cursors.append(rows[-1].id)
+    return cursors
+
+
+async def measure(fetch, repeats: int) -> tuple[list[float], float]:
+    latencies = []
+    queries_before = DB_QUERY_SECONDS.count()
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await fetch()
+        latencies.append(time.perf_counter() - started)
+    return latencies, (DB_QUERY_SECONDS.count() - queries_before) / repeats
+
+
+def report(label: str, latencies: list[float], queries: float) -> None:
+    print(f"    {label:<20} p50={percentile(latencies, 50) * 1000:7.2f} ms "
+          f"p95={percentile(latencies, 95) * 1000:7.2f} ms | {queries:.0f} consultas por página")
+
+
+async def main(users: int, orders_per_user: int, heavy_orders: int, repeats: int) -> None:
+    seed(users, orders_per_user, heavy_orders)
+    total_orders = heavy_orders + (users - 1) * orders_per_user
+    last_page = (heavy_orders - 1) // PAGE_SIZE
+    depths = sorted({0, min(10, last_page), last_page // 2, last_page})
+    cursors = await keyset_cursors(HEAVY_USER, last_page + 1)
+
+    print(f"{total_orders} pedidos; histórico do usuário com {heavy_orders} pedidos, {PAGE_SIZE} por página:")
+    for depth in depths:
+        print(f"  página {depth + 1}:")
+        report("keyset + JOIN", *await measure(
+            lambda: fetch_order_history_once(HEAVY_USER, cursors[depth]), repeats))
+        report("OFFSET + N+1", *await measure(lambda: offset_page(HEAVY_USER, depth), repeats))
+
+    cache = OrderHistoryCache(ttl=60, page_size=PAGE_SIZE)
+    await cache.page(HEAVY_USER)
+    print("  página em cache:")
+    report("OrderHistoryCache", *await measure(lambda: cache.page(HEAVY_USER), repeats))
+
+    await async_engine.dispose()
+
+
+async def fetch_order_history_once(user_id: int, before_id: uuid.UUID | None) -> list:
+    async with AsyncSessionLocal() as db:
+        return await fetch_order_history(db, user_id, before_id, PAGE_SIZE + 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Histórico de pedidos: keyset + JOIN contra OFFSET + N+1.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orders-per-user", type=int, default=50)
+    parser.add_argument("--heavy-orders", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.orders_per_user, args.heavy_orders, args.repeats))
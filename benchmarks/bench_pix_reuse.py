@@ -0,0 +1,117 @@
+# benchmarks/bench_pix_reuse.py
+#
+# Usuários impacientes tocam "Comprar" várias vezes seguidas. Passa os toques pelo
+# bot de verdade (Application + handlers, Telegram falso) contra o Mercado Pago
+# falso e confere que cada usuário gera uma única cobrança: os toques repetidos
+# recebem a mesma, sem nova chamada ao gateway. Depois que o pagamento é aprovado,
+# um novo toque gera uma cobrança nova.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_pix_reuse --users 100 --taps 3 --gateway-latency 0.2
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+from benchmarks.common import FakeBot, free_port, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_pix_reuse_")
+_mp_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+os.environ["BOT_RUN_MODE"] = "webhook"
+os.environ["TELEGRAM_WEBHOOK_SECRET"] = "bench-telegram-secret"
+os.environ.pop("TELEGRAM_WEBHOOK_URL", None)
+
+from sqlalchemy import func, select  # noqa: E402
+from telegram import Update  # noqa: E402
+
+from benchmarks.fake_mercadopago import FakeMercadoPago  # noqa: E402
+from bot.bot import run_bot, setup_bot  # noqa: E402
+from bot.delivery import fulfill_order  # noqa: E402
+from database.database import SessionLocal, create_db_and_tables  # noqa: E402
+from database.models import Order, Product, User  # noqa: E402
+
+
+def buy_update(update_id: int, user_id: int, product_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": f"buy_{product_id}",
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "Catálogo"},
+        },
+    }
+
+
+def seed(users: int) -> None:
+    create_db_and_tables()
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="Bench", description="Bench", price=Decimal("1.00"), content="ok"))
+        db.add_all(User(id=user_id, full_name=f"Bench {user_id}") for user_id in range(1, users + 1))
+        db.commit()
+
+
+def count_orders() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Order))
+
+
+async def tap_all(application, bot: FakeBot, users: int, taps: int, first_update_id: int) -> float:
+    """
+    Envia `taps` toques de cada usuário e espera todas as cobranças chegarem: o aviso
+    ("Gerando pagamento" ou "pagamento em aberto"), o QR Code e o código.
+    """
+    expected = bot.delivered + users * taps * 3
+    update_id = first_update_id
+    started = time.perf_counter()
+    for _ in range(taps):
+        for user_id in range(1, users + 1):
+            update_id += 1
+            await application.update_queue.put(Update.de_json(buy_update(update_id, user_id, 1), application.bot))
+    while bot.delivered < expected:
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+async def main(users: int, taps: int, gateway_latency: float) -> None:
+    seed(users)
+    fake_mp = FakeMercadoPago(latency=gateway_latency)
+    mp_server = await start_server(fake_mp.app, _mp_port)
+    bot = FakeBot()
+    application = setup_bot(bot=bot)
+
+    async with run_bot(application):
+        elapsed = await tap_all(application, bot, users, taps, 0)
+        print(f"{users} usuários x {taps} toques em {elapsed:.2f} s: "
+              f"{fake_mp.requests} chamadas ao gateway, {count_orders()} pedidos")
+        assert fake_mp.requests == users, "toques repetidos geraram novas cobranças"
+        assert count_orders() == users
+
+        # Pagamento aprovado: a cobrança deixa de valer e o próximo toque gera outra.
+        with SessionLocal() as db:
+            paid = [order.id for order in db.scalars(select(Order).where(Order.user_id <= users // 2))]
+        for order_id in paid:
+            await fulfill_order(order_id, application.bot_data["dispatcher"])
+        requests_before = fake_mp.requests
+        await tap_all(application, bot, users, 1, users * taps)
+        print(f"Após {len(paid)} pagamentos: {fake_mp.requests - requests_before} novas cobranças")
+        assert fake_mp.requests - requests_before == len(paid)
+
+    await stop_server(mp_server)
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reaproveitamento de cobranças PIX em aberto.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--taps", type=int, default=3)
+    parser.add_argument("--gateway-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.taps, args.gateway_latency))
@@ -0,0 +1,157 @@
+# benchmarks/bench_query_plans.py
+#
+# Planos de execução e latência das consultas quentes da tabela `orders` (expiração,
+# reconciliação, cobrança em aberto e histórico do usuário) com e sem os índices
+# compostos, e o custo de um commit no SQLite com o perfil padrão (journal DELETE,
+# synchronous FULL) e com o perfil da aplicação (WAL, synchronous NORMAL).
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_query_plans --orders 100000 --users 2000
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_query_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import event, insert, select, update  # noqa: E402
+
+from database.database import create_db_and_tables, engine, utcnow  # noqa: E402
+from database.models import Order, OrderStatus, Product, User  # noqa: E402
+
+# Índices compostos de `orders` comparados (o da chave primária e o único de
+# gateway_payment_id ficam nos dois cenários).
+ORDER_INDEXES = [index for index in Order.__table__.indexes if len(index.columns) > 1]
+
+
+def seed(orders: int, users: int, products: int) -> None:
+    create_db_and_tables()
+    now = utcnow()
+    rng = random.Random(42)
+    # Como a rotina de expiração roda a cada poucos minutos, só pedidos recentes seguem PENDING.
+    settled = [OrderStatus.PAID] * 2 + [OrderStatus.EXPIRED]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": user_id, "full_name": f"User {user_id}"} for user_id in range(1, users + 1)])
+        conn.execute(insert(Product), [
+            {"id": product_id, "name": f"Produto {product_id}", "description": "-", "price": 9.9, "content": "-"}
+            for product_id in range(1, products + 1)
+        ])
+        rows = []
+        for _ in range(orders):
+            created_at = now - timedelta(minutes=rng.uniform(0, 60 * 24 * 60))
+            rows.append({
+                "id": uuid.uuid4(),
+                "user_id": rng.randint(1, users),
+                "product_id": rng.randint(1, products),
+                "status": OrderStatus.PENDING if now - created_at < timedelta(hours=1) else rng.choice(settled),
+                "pix_qr_code": "PIX",
+                "created_at": created_at,
+                "expires_at": created_at + timedelta(minutes=30),
+            })
+        conn.execute(insert(Order), rows)
+
+
+def hot_queries(users: int, products: int) -> dict:
+    now = utcnow()
+    return {
+        "expiração": lambda rng: update(Order)
+            .where(Order.status == OrderStatus.PENDING, Order.created_at < now - timedelta(minutes=35))
+            .values(status=OrderStatus.EXPIRED),
+        "reconciliação": lambda rng: select(Order.id, Order.created_at)
+            .where(Order.status == OrderStatus.PENDING, Order.created_at >= now - timedelta(hours=24)),
+        "cobrança em aberto": lambda rng: select(Order)
+            .where(Order.user_id == rng.randint(1, users), Order.product_id == rng.randint(1, products),
+                   Order.status == OrderStatus.PENDING, Order.pix_qr_code.is_not(None), Order.expires_at > now)
+            .order_by(Order.expires_at.desc()).limit(1),
+        "histórico do usuário": lambda rng: select(Order)
+            .where(Order.user_id == rng.randint(1, users))
+            .order_by(Order.created_at.desc()).limit(10),
+    }
+
+
+def measure(queries: dict, repeat: int) -> dict[str, tuple[str, float]]:
+    """Plano (EXPLAIN QUERY PLAN) e latência média (ms) de cada consulta; os UPDATEs são desfeitos."""
+    captured = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured["sql"], captured["params"] = statement, parameters
+
+    event.listen(engine, "before_cursor_execute", capture)
+    results = {}
+    try:
+        for label, build in queries.items():
+            rng = random.Random(7)
+            with engine.connect() as conn:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    transaction = conn.begin()
+                    result = conn.execute(build(rng))
+                    if result.returns_rows:
+                        result.fetchall()
+                    transaction.rollback()
+                elapsed = (time.perf_counter() - started) / repeat
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + captured["sql"], captured["params"]).fetchall()
+            results[label] = (" | ".join(row[-1] for row in plan), elapsed * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return results
+
+
+def commit_latency(path: str, pragmas: list[str], commits: int) -> float:
+    """Tempo médio (ms) de um INSERT + commit com os PRAGMAs dados."""
+    conn = sqlite3.connect(path)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    conn.execute("CREATE TABLE IF NOT EXISTS bench_commits (id INTEGER PRIMARY KEY, value TEXT)")
+    started = time.perf_counter()
+    for index in range(commits):
+        conn.execute("INSERT INTO bench_commits (value) VALUES (?)", (str(index),))
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / commits * 1000
+
+
+def main(orders: int, users: int, products: int, repeat: int, commits: int) -> None:
+    seed(orders, users, products)
+    queries = hot_queries(users, products)
+    print(f"{orders} pedidos, {users} usuários, {products} produtos; média de {repeat} execuções\n")
+
+    with engine.begin() as conn:
+        for index in ORDER_INDEXES:
+            index.drop(conn)
+    before = measure(queries, repeat)
+    with engine.begin() as conn:
+        for index in ORDER_INDEXES:
+            index.create(conn)
+        conn.exec_driver_sql("ANALYZE")
+    after = measure(queries, repeat)
+
+    for label in queries:
+        (plan_before, ms_before), (plan_after, ms_after) = before[label], after[label]
+        print(f"{label}: {ms_before:.2f} ms -> {ms_after:.2f} ms ({ms_before / ms_after:.1f}x)")
+        print(f"  sem índices: {plan_before}")
+        print(f"  com índices: {plan_after}")
+
+    default = commit_latency(os.path.join(_tmpdir, "default.db"),
+                             ["PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL"], commits)
+    tuned = commit_latency(os.path.join(_tmpdir, "tuned.db"),
+                           ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"], commits)
+    print(f"\ncommit no SQLite: DELETE/FULL {default:.3f} ms, WAL/NORMAL {tuned:.3f} ms ({default / tuned:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planos e latência das consultas de pedidos com e sem índices.")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--commits", type=int, default=300)
+    args = parser.parse_args()
+    main(args.orders, args.users, args.products, args.repeat, args.commits)
@@ -0,0 +1,108 @@
+# benchmarks/bench_reconcile.py
+#
+# Roda a expiração e a reconciliação de pedidos contra o Mercado Pago falso e
+# confere o resultado: aprovados viram PAID (e são entregues), cancelados viram
+# FAILED, PENDING antigos viram EXPIRED. Mostra quantas chamadas ao gateway a
+# busca em lote fez, comparado a um GET por pedido.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_reconcile --orders 1000
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks.common import free_port, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_reconcile_")
+_mp_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+
+from sqlalchemy import func, select  # noqa: E402
+
+from benchmarks.fake_mercadopago import FakeMercadoPago  # noqa: E402
+from bot.jobs import expire_orders, reconcile_pending_orders  # noqa: E402
+from database.database import SessionLocal, async_engine, create_db_and_tables  # noqa: E402
+from database.models import Order, Product, User  # noqa: E402
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.delivered = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.delivered += 1
+        return text
+
+
+def seed(fake_mp: FakeMercadoPago, orders: int, stale: int) -> Counter:
+    """Cria pedidos recentes (com pagamento no gateway) e pedidos PENDING antigos."""
+    create_db_and_tables()
+    expected = Counter()
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="Bench", description="Bench", price=Decimal("1.00"), content="ok"))
+        for user_id in range(1, orders + 1):
+            db.add(User(id=user_id, full_name=f"Bench {user_id}"))
+            order = Order(id=uuid.uuid4(), user_id=user_id, product_id=1)
+            status = ("approved", "cancelled", "pending", "pending", "approved")[user_id % 5]
+            payment = fake_mp.add_payment(str(order.id), status=status)
+            order.gateway_payment_id = str(payment["id"])
+            db.add(order)
+            expected[status] += 1
+        for _ in range(stale):
+            db.add(Order(id=uuid.uuid4(), user_id=1, product_id=1, created_at=old))
+        db.commit()
+    return expected
+
+
+def count_by_status() -> dict:
+    with SessionLocal() as db:
+        return {status.value: count for status, count in db.execute(
+            select(Order.status, func.count()).group_by(Order.status)
+        )}
+
+
+async def main(orders: int, stale: int) -> None:
+    fake_mp = FakeMercadoPago()
+    expected = seed(fake_mp, orders, stale)
+    mp_server = await start_server(fake_mp.app, _mp_port)
+    dispatcher = FakeDispatcher()
+
+    started = time.perf_counter()
+    summary = await reconcile_pending_orders(dispatcher)
+    reconcile_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expired = await expire_orders()
+    expire_elapsed = time.perf_counter() - started
+
+    await stop_server(mp_server)
+    await async_engine.dispose()
+
+    statuses = count_by_status()
+    print(f"Reconciliação: {summary} em {reconcile_elapsed * 1000:.0f} ms, "
+          f"{fake_mp.requests} chamadas ao gateway (um GET por pedido seriam {orders})")
+    print(f"Expiração: {expired} pedidos em {expire_elapsed * 1000:.1f} ms")
+    print(f"Status finais: {statuses}")
+
+    assert statuses.get("PAID", 0) == expected["approved"] == dispatcher.delivered
+    assert statuses.get("FAILED", 0) == expected["cancelled"]
+    assert statuses.get("PENDING", 0) == expected["pending"]
+    assert statuses.get("EXPIRED", 0) == stale == expired
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expiração e reconciliação de pedidos contra o gateway falso.")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--stale", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.orders, args.stale))
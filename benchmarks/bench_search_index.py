@@ -0,0 +1,148 @@
+# benchmarks/bench_search_index.py
+#
+# Busca inline com catálogos grandes: tempo para montar o índice em memória de
+# bot/search.py, latência das buscas (p50/p99) comparada a um LIKE no banco, e tempo
+# da sincronização incremental depois de alterar alguns produtos e da reconstrução
+# completa depois de remover um, com buscas rodando durante ela.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_search_index --products 100000 --queries 500
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_search_index_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import delete, func, or_, select, update  # noqa: E402
+
+from benchmarks.common import percentile  # noqa: E402
+from bot.search import ProductSearchIndex  # noqa: E402
+from database.catalog import bump_catalog_version, upsert_products  # noqa: E402
+from database.database import AsyncSessionLocal, SessionLocal, async_engine, create_db_and_tables  # noqa: E402
+from database.models import Product  # noqa: E402
+
+SUBJECTS = ["Curso", "E-book", "Planilha", "Mentoria", "Guia", "Pacote", "Template", "Workshop"]
+TOPICS = ["Python", "Fotografia", "Marketing", "Finanças", "Inglês", "Excel", "Culinária", "Música",
+          "Design", "Programação", "Yoga", "Violão", "Investimentos", "Redação", "Vendas", "Edição"]
+LEVELS = ["Básico", "Intermediário", "Avançado", "Completo", "Essencial", "Prático"]
+WORDS = ["aulas", "exercícios", "certificado", "suporte", "projetos", "vídeos", "módulos", "bônus",
+         "acesso", "vitalício", "comunidade", "atualizações", "material", "apostila", "desafios"]
+
+# Buscas típicas: prefixo curto, palavra inteira, duas palavras, acento e termo inexistente.
+QUERIES = ["p", "cu", "curso", "curso py", "fotografia basica", "financas", "certif", "yoga aval",
+           "ebook excel", "inexistente"]
+
+
+def product(index: int, rng: random.Random) -> dict:
+    name = f"{rng.choice(SUBJECTS)} de {rng.choice(TOPICS)} {rng.choice(LEVELS)} {index}"
+    description = " ".join(rng.sample(WORDS, 6))
+    return {"name": name, "description": description, "price": Decimal(f"{index % 500}.90"),
+            "content": f"https://example.com/conteudo/{index}"}
+
+
+def seed(products: int, batch_size: int = 5000) -> None:
+    create_db_and_tables()
+    rng = random.Random(42)
+    for start in range(0, products, batch_size):
+        with SessionLocal() as db:
+            upsert_products(db, [product(index, rng) for index in range(start, min(start + batch_size, products))])
+            db.commit()
+    with SessionLocal() as db:
+        # Catálogo importado antes: fora da janela de sobreposição da sincronização incremental.
+        db.execute(update(Product).values(updated_at=func.datetime("now", "-1 day")))
+        bump_catalog_version(db)
+        db.commit()
+
+
+def time_queries(search, queries: int) -> list[float]:
+    latencies = []
+    for index in range(queries):
+        started = time.perf_counter()
+        search(QUERIES[index % len(QUERIES)])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def like_search(query: str, limit: int = 20) -> list:
+    """O que seria a busca sem índice: LIKE em nome e descrição a cada consulta inline."""
+    conditions = [or_(Product.name.ilike(f"%{term}%"), Product.description.ilike(f"%{term}%"))
+                  for term in query.split()]
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Product.id).where(*conditions).order_by(Product.name).limit(limit))
+        return result.all()
+
+
+def report(label: str, latencies: list[float]) -> None:
+    print(f"  {label:<22} p50={percentile(latencies, 50) * 1000:8.3f} ms "
+          f"p99={percentile(latencies, 99) * 1000:8.3f} ms max={max(latencies) * 1000:8.3f} ms")
+
+
+async def main(products: int, queries: int, changes: int) -> None:
+    seed(products)
+    index = ProductSearchIndex()
+
+    started = time.perf_counter()
+    await index.refresh()
+    print(f"{len(index)} produtos indexados em {time.perf_counter() - started:.2f} s")
+
+    print(f"{queries} buscas ({len(QUERIES)} termos diferentes, 20 resultados por página):")
+    report("índice em memória", time_queries(lambda query: index.search(query, 0, 20), queries))
+    report("segunda página", time_queries(lambda query: index.search(query, 20, 20), queries))
+
+    like_latencies = []
+    for position in range(min(queries, 50)):
+        started = time.perf_counter()
+        await like_search(QUERIES[position % len(QUERIES)])
+        like_latencies.append(time.perf_counter() - started)
+    report("LIKE no banco", like_latencies)
+
+    with SessionLocal() as db:
+        # Mesmos nomes (atualização pelo upsert), com a descrição trocada.
+        picked = select(Product.name, Product.price, Product.content).order_by(func.random()).limit(changes)
+        changed = [{"name": name, "description": "promoção relâmpago", "price": price, "content": content}
+                   for name, price, content in db.execute(picked)]
+        upsert_products(db, changed)
+        bump_catalog_version(db)
+        db.commit()
+    started = time.perf_counter()
+    await index.refresh()
+    print(f"sincronização incremental ({changes} produtos alterados): "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms, {len(index)} produtos no índice")
+    found, _ = index.search("promocao", 0, changes)
+    assert len(found) == changes, "produtos alterados não apareceram na busca"
+
+    # Produto removido: a contagem diverge e o índice é remontado por inteiro. As buscas
+    # feitas durante a reconstrução continuam vendo o índice completo anterior.
+    with SessionLocal() as db:
+        db.execute(delete(Product).where(Product.id == select(func.min(Product.id)).scalar_subquery()))
+        bump_catalog_version(db)
+        db.commit()
+    expected = len(index.search("", 0, 1000)[0])
+    rebuild = asyncio.create_task(index.refresh())
+    started = time.perf_counter()
+    searches, smallest = 0, expected
+    while not rebuild.done():
+        smallest = min(smallest, len(index.search("", 0, 1000)[0]))
+        searches += 1
+        await asyncio.sleep(0)
+    await rebuild
+    print(f"reconstrução após remover um produto: {time.perf_counter() - started:.2f} s, "
+          f"{searches} buscas durante ela, menor resultado {smallest} de {expected}")
+    assert smallest == expected, "busca viu o índice pela metade durante a reconstrução"
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de busca inline com catálogos grandes.")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--changes", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.queries, args.changes))
@@ -0,0 +1,122 @@
+# benchmarks/bench_signature.py
+#
+# Microbenchmark da validação de assinatura do webhook do Mercado Pago: custo por
+# chamada de `validate_mercadopago_signature` para notificações válidas, inválidas e
+# repetidas, comparado com a implementação anterior (HMAC recriado a cada chamada,
+# parsing com vários split e prints por requisição). Antes confere que assinaturas com
+# timestamp em segundos e em milissegundos são aceitas.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_signature --iterations 20000
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import io
+import logging
+import os
+import time
+import uuid
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import sign_notification
+
+os.environ["WEBHOOK_SECRET"] = "bench-secret"
+
+from fastapi import HTTPException, Request  # noqa: E402
+
+from core.security import remember_notification, validate_mercadopago_signature  # noqa: E402
+
+
+def make_request(payment_id: str, request_id: str, signature: str) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": b'{"type":"payment"}', "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "scheme": "https",
+        "server": ("bench", 443),
+        "path": "/webhook/mercadopago",
+        "query_string": f"data.id={payment_id}&type=payment".encode(),
+        "headers": [(b"x-signature", signature.encode()), (b"x-request-id", request_id.encode())],
+    }
+    return Request(scope, receive)
+
+
+async def legacy_validate(request: Request) -> bytes:
+    """Implementação anterior, reproduzida para comparação."""
+    x_signature = request.headers.get("x-signature")
+    x_request_id = request.headers.get("x-request-id")
+    parts = {p.split("=")[0]: p.split("=")[1] for p in x_signature.split(",")}
+    ts = parts.get("ts")
+    signature_hash = parts.get("v1")
+    query_params = parse_qs(urlparse(str(request.url)).query)
+    payment_id = query_params.get("data.id", [None])[0] or query_params.get("id", [None])[0]
+    manifest = f"id:{payment_id};request-id:{x_request_id};ts:{ts};"
+    expected = hmac.new(b"bench-secret", msg=manifest.encode(), digestmod=hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, signature_hash):
+        print("--- FALHA NA VALIDAÇÃO ---")
+        raise HTTPException(status_code=403)
+    print(f"\n--- SUCESSO NA VALIDAÇÃO ---\nAssinatura para o pagamento {payment_id} validada!\n--- FIM ---\n")
+    return await request.body()
+
+
+async def measure(label: str, validator, requests: list[Request], expected_status: int | None) -> None:
+    sink = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for request in requests:
+            try:
+                await validator(request)
+                status = None
+            except HTTPException as e:
+                status = e.status_code
+            assert status == expected_status, (label, status)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed / len(requests) * 1e6:8.2f} µs/chamada")
+
+
+def build(iterations: int, secret: str = "bench-secret") -> list[Request]:
+    requests = []
+    for index in range(iterations):
+        payment_id, request_id = str(1000 + index), str(uuid.uuid4())
+        requests.append(make_request(payment_id, request_id, sign_notification(secret, payment_id, request_id)))
+    return requests
+
+
+async def check_timestamp_formats() -> None:
+    """O Mercado Pago envia `ts` em milissegundos; os exemplos da documentação usam segundos."""
+    for label, ts in (("segundos", int(time.time())), ("milissegundos", int(time.time() * 1000))):
+        request_id = str(uuid.uuid4())
+        request = make_request("1", request_id, sign_notification("bench-secret", "1", request_id, ts=ts))
+        await validate_mercadopago_signature(request)
+        print(f"timestamp em {label}: aceito")
+
+
+async def main(iterations: int) -> None:
+    await check_timestamp_formats()
+    logging.disable(logging.WARNING)  # os avisos de rejeição distorceriam a medição
+    valid = build(iterations)
+    print(f"{iterations} validações por cenário:")
+    await measure("anterior, assinatura válida", legacy_validate, build(iterations), None)
+    await measure("anterior, assinatura inválida", legacy_validate, build(iterations, "outro"), 403)
+    await measure("nova, assinatura válida", validate_mercadopago_signature, valid, None)
+    await measure("nova, assinatura inválida", validate_mercadopago_signature, build(iterations, "outro"), 403)
+    # As mesmas notificações de novo, depois de gravadas: barradas pelo cache antes do HMAC.
+    for request in valid:
+        remember_notification(request)
+    replays = [make_request(r.query_params["data.id"], r.headers["x-request-id"], r.headers["x-signature"])
+               for r in valid]
+    await measure("nova, notificação repetida", validate_mercadopago_signature, replays, 409)
+    stale = [make_request("1", str(uuid.uuid4()), sign_notification("bench-secret", "1", "x", ts=0))
+             for _ in range(iterations)]
+    await measure("nova, timestamp expirado", validate_mercadopago_signature, stale, 403)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark da validação de assinatura do webhook.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,108 @@
+# benchmarks/bench_update_concurrency.py
+#
+# Compara o processamento sequencial de atualizações (padrão do PTB) com o
+# PerUserUpdateProcessor: vários usuários tocam "Comprar" algumas vezes seguidas
+# e o handler espera a geração do PIX (simulada com um sleep). Confere que os
+# toques de um mesmo usuário rodam em ordem e mostra as métricas de saturação.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_update_concurrency --users 50 --taps 3 --latency 0.2
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from telegram import Update
+from telegram.ext import Application, CallbackQueryHandler
+
+from benchmarks.common import FakeBot, percentile
+from bot.updates import PerUserUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int, tap: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": f"buy_{tap}",
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": user_id, "type": "private"},
+                "text": "Catálogo",
+            },
+        },
+    }
+
+
+async def run(concurrent_updates, users: int, taps: int, latency: float) -> tuple[float, list[float], dict, object]:
+    order: dict[int, list[int]] = defaultdict(list)
+    latencies: list[float] = []
+    received_at: dict[int, float] = {}
+    done = asyncio.Event()
+    total = users * taps
+
+    async def buy(update: Update, context) -> None:
+        await asyncio.sleep(latency)  # geração do PIX
+        order[update.effective_user.id].append(int(update.callback_query.data.removeprefix("buy_")))
+        latencies.append(time.perf_counter() - received_at[update.update_id])
+        if len(latencies) == total:
+            done.set()
+
+    application = Application.builder().bot(FakeBot()).concurrent_updates(concurrent_updates).build()
+    application.add_handler(CallbackQueryHandler(buy))
+
+    async with application:
+        await application.start()
+        started = time.perf_counter()
+        update_id = 0
+        # Toques intercalados: o 1º de cada usuário, depois o 2º de cada um, etc.
+        for tap in range(taps):
+            for user_id in range(1, users + 1):
+                update_id += 1
+                received_at[update_id] = time.perf_counter()
+                await application.update_queue.put(
+                    Update.de_json(make_update(update_id, user_id, tap), application.bot)
+                )
+        await done.wait()
+        elapsed = time.perf_counter() - started
+        await application.stop()
+
+    return elapsed, latencies, order, application.update_processor
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    print(f"{name}: {len(latencies)} atualizações em {elapsed:.2f} s | "
+          f"p50={percentile(latencies, 50) * 1000:.0f} ms "
+          f"p99={percentile(latencies, 99) * 1000:.0f} ms")
+
+
+async def main(users: int, taps: int, latency: float, cap: int, sequential_users: int) -> None:
+    # O sequencial leva users * taps * latency segundos; por isso roda com menos usuários.
+    elapsed, latencies, _, _ = await run(False, sequential_users, taps, latency)
+    report(f"Sequencial ({sequential_users} usuários)", elapsed, latencies)
+
+    processor = PerUserUpdateProcessor(cap)
+    elapsed, latencies, order, processor = await run(processor, users, taps, latency)
+    report(f"PerUserUpdateProcessor(cap={cap}, {users} usuários)", elapsed, latencies)
+    print(f"  pico={processor.peak_concurrent_updates} vagas, saturado {processor.saturated_total}x, "
+          f"{processor.serialized_total} toques esperaram o anterior do mesmo usuário")
+
+    assert all(taps_seen == list(range(taps)) for taps_seen in order.values()), "ordem por usuário violada"
+    assert len(order) == users
+    print("OK: toques de cada usuário processados em ordem")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processamento concorrente de atualizações com ordem por usuário.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--taps", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--cap", type=int, default=32)
+    parser.add_argument("--sequential-users", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.taps, args.latency, args.cap, args.sequential_users))
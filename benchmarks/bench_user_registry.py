@@ -0,0 +1,114 @@
+# benchmarks/bench_user_registry.py
+#
+# Simula um broadcast de marketing: milhares de /start chegando ao mesmo tempo,
+# a maioria de usuários que já existem. Compara o caminho antigo (SELECT e, se
+# preciso, INSERT + commit a cada /start) com o UserRegistry (LRU de ids
+# conhecidos + upsert em lote). Confere que a tabela termina igual.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_user_registry --starts 2000 --returning 0.9
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_user_registry_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from benchmarks.common import percentile  # noqa: E402
+from bot.users import UserRegistry  # noqa: E402
+from database.database import AsyncSessionLocal, SessionLocal, async_engine, create_db_and_tables  # noqa: E402
+from database.models import User  # noqa: E402
+
+
+def reset_users(existing: int) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(User))
+        db.add_all(User(id=user_id, full_name=f"Bench {user_id}") for user_id in range(1, existing + 1))
+        db.commit()
+
+
+def table_snapshot() -> dict[int, str]:
+    with SessionLocal() as db:
+        return dict(db.execute(select(User.id, User.full_name)).all())
+
+
+async def old_start(user_id: int, full_name: str) -> None:
+    # Caminho anterior do handler /start.
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if not user:
+            db.add(User(id=user_id, full_name=full_name))
+            await db.commit()
+
+
+async def run(name: str, handle, starts: list[tuple[int, str]], concurrency: int, finish=None) -> None:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(user_id: int, full_name: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await handle(user_id, full_name)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_id, full_name) for user_id, full_name in starts))
+    if finish is not None:
+        await finish()
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {len(starts)} /start em {elapsed:.2f} s "
+          f"({len(starts) / elapsed:.0f}/s) | p50={percentile(latencies, 50) * 1000:.2f} ms "
+          f"p99={percentile(latencies, 99) * 1000:.2f} ms")
+
+
+async def main(starts_count: int, returning: float, existing: int, concurrency: int) -> None:
+    create_db_and_tables()
+    rng = random.Random(42)
+    starts = []
+    for _ in range(starts_count):
+        if rng.random() < returning:
+            user_id = rng.randint(1, existing)
+        else:
+            user_id = existing + rng.randint(1, starts_count)
+        starts.append((user_id, f"Bench {user_id}"))
+    # Alguns usuários conhecidos mudaram de nome (só o registro atualiza nomes).
+    renamed = {user_id for user_id, _ in starts[:50] if user_id <= existing}
+    starts += [(user_id, f"Renomeado {user_id}") for user_id in renamed]
+
+    reset_users(existing)
+    await run("Antigo (SELECT + INSERT por /start)", old_start, starts, concurrency)
+    old_table = table_snapshot()
+
+    reset_users(existing)
+    registry = UserRegistry()
+    # Simula um processo recém-iniciado que já viu os usuários antigos uma vez.
+    registry._known.update({user_id: f"Bench {user_id}" for user_id in range(1, existing + 1)})
+    registry.start()
+
+    async def new_start(user_id: int, full_name: str) -> None:
+        registry.register(user_id, full_name)
+
+    await run("UserRegistry (LRU + upsert em lote)", new_start, starts, concurrency, finish=registry.stop)
+    new_table = table_snapshot()
+    await async_engine.dispose()
+
+    print(f"  {registry.flushed_total} usuários gravados pelo registro, {len(renamed)} renomeados")
+    expected = {**old_table, **{user_id: f"Renomeado {user_id}" for user_id in renamed}}
+    assert new_table == expected, "tabela users diferente do esperado"
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registro de usuários do /start com escrita em lote.")
+    parser.add_argument("--starts", type=int, default=2000)
+    parser.add_argument("--returning", type=float, default=0.9)
+    parser.add_argument("--existing", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.starts, args.returning, args.existing, args.concurrency))
@@ -0,0 +1,143 @@
+# benchmarks/bench_web_workers.py
+#
+# Teste de carga local da camada web sem estado (APP_ROLE=web): sobe
+# `uvicorn web.server:api --workers N` para cada N pedido, dispara notificações
+# assinadas do Mercado Pago contra /webhook/mercadopago e mede a vazão. Os
+# workers processam a caixa de entrada contra o Mercado Pago falso e enviam pelo
+# Telegram falso, ambos rodando neste processo.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_web_workers --workers 1,2,4 --requests 2000
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import free_port, percentile, sign_notification, start_server, stop_server
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_web_workers_")
+_mp_port = free_port()
+_tg_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{_tg_port}"
+os.environ["WEBHOOK_SECRET"] = "bench-secret"
+os.environ["APP_ROLE"] = "web"
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_mercadopago import FakeMercadoPago  # noqa: E402
+from benchmarks.fake_telegram import FakeTelegram  # noqa: E402
+from database.database import create_db_and_tables  # noqa: E402
+
+# Timeout das requisições e keep-alive do uvicorn (segundos): com mais workers que CPUs
+# a latência passa dos 5 s padrão, e o keep-alive vencido fecha conexões em reuso.
+TIMEOUT = 30
+
+
+async def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"http://127.0.0.1:{port}/openapi.json")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn não respondeu a tempo")
+
+
+async def load(port: int, payment_ids: list[str], concurrency: int) -> tuple[float, list[float], int]:
+    """Envia as notificações; devolve (duração, latências, respostas 5xx)."""
+    latencies: list[float] = []
+    server_errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=TIMEOUT) as client:
+
+        async def send(payment_id: str) -> None:
+            nonlocal server_errors
+            request_id = str(uuid.uuid4())
+            headers = {
+                "x-request-id": request_id,
+                "x-signature": sign_notification("bench-secret", payment_id, request_id),
+            }
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    f"/webhook/mercadopago?data.id={payment_id}&type=payment",
+                    json={"type": "payment", "data": {"id": payment_id}},
+                    headers=headers,
+                )
+                latencies.append(time.perf_counter() - started)
+            # 5xx (ex.: SQLite ocupado além do busy_timeout com a máquina saturada) é
+            # reenviado pelo Mercado Pago: conta como erro em vez de abortar a medição.
+            if response.is_server_error:
+                server_errors += 1
+            else:
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(payment_id) for payment_id in payment_ids))
+        return time.perf_counter() - started, latencies, server_errors
+
+
+async def run(workers: int, requests: int, concurrency: int, fake_mp: FakeMercadoPago) -> float:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "web.server:api", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--timeout-keep-alive", str(TIMEOUT)],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_ready(port)
+        await asyncio.sleep(1.0 * workers)  # os demais workers terminam de subir
+        payment_ids = [str(fake_mp.add_payment(str(uuid.uuid4()))["id"]) for _ in range(requests)]
+        elapsed, latencies, server_errors = await load(port, payment_ids, concurrency)
+    finally:
+        process.terminate()
+        # Espera fora do loop: no desligamento os workers ainda falam com os servidores
+        # falsos, que rodam neste mesmo loop.
+        await asyncio.to_thread(process.wait, 30)
+
+    throughput = requests / elapsed
+    print(f"workers={workers}: {throughput:.0f} req/s | "
+          f"p50={percentile(latencies, 50) * 1000:.1f} ms p99={percentile(latencies, 99) * 1000:.1f} ms | "
+          f"{server_errors} respostas 5xx")
+    return throughput
+
+
+async def main(workers_list: list[int], requests: int, concurrency: int) -> None:
+    create_db_and_tables()
+    fake_mp = FakeMercadoPago()
+    fake_tg = FakeTelegram()
+    mp_server = await start_server(fake_mp.app, _mp_port)
+    tg_server = await start_server(fake_tg.app, _tg_port)
+
+    print(f"{os.cpu_count()} CPUs disponíveis; a vazão só escala até o número de CPUs.")
+    results = {}
+    for workers in workers_list:
+        results[workers] = await run(workers, requests, concurrency, fake_mp)
+
+    await stop_server(mp_server)
+    await stop_server(tg_server)
+    base = results[workers_list[0]]
+    print("Escala: " + ", ".join(f"{workers} workers = {value / base:.2f}x" for workers, value in results.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da camada web com vários workers.")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main([int(value) for value in args.workers.split(",")], args.requests, args.concurrency))
@@ -0,0 +1,108 @@
+# benchmarks/bench_webhook_inbox.py
+#
+# Mede a latência do endpoint /webhook/mercadopago com um Mercado Pago lento:
+# o endpoint só grava na caixa de entrada, então o p99 não deve depender da
+# latência do gateway. Também mede o tempo até os workers entregarem tudo.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.bench_webhook_inbox --notifications 200 --gateway-latency 0.3
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks.common import FakeBot, free_port, start_server, stop_server, sign_notification, percentile
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_webhook_inbox_")
+_mp_port = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["MERCADO_PAGO_API_URL"] = f"http://127.0.0.1:{_mp_port}"
+os.environ["WEBHOOK_SECRET"] = "bench-secret"
+os.environ["BOT_RUN_MODE"] = "webhook"
+os.environ["TELEGRAM_WEBHOOK_SECRET"] = "bench-telegram-secret"
+os.environ.pop("TELEGRAM_WEBHOOK_URL", None)
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_mercadopago import FakeMercadoPago  # noqa: E402
+from database.database import SessionLocal, create_db_and_tables  # noqa: E402
+from database.models import User, Product, Order  # noqa: E402
+from bot.bot import setup_bot  # noqa: E402
+from web.server import api, lifespan  # noqa: E402
+
+
+def seed_orders(fake_mp: FakeMercadoPago, count: int) -> list[str]:
+    create_db_and_tables()
+    payment_ids = []
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="Bench", description="Bench", price=Decimal("1.00"), content="ok"))
+        # Um usuário por pedido, como em um pico de vendas real (o limite por chat não interfere).
+        for user_id in range(1, count + 1):
+            db.add(User(id=user_id, full_name=f"Bench {user_id}"))
+            order = Order(id=uuid.uuid4(), user_id=user_id, product_id=1)
+            payment = fake_mp.add_payment(str(order.id), status="approved")
+            order.gateway_payment_id = str(payment["id"])
+            db.add(order)
+            payment_ids.append(str(payment["id"]))
+        db.commit()
+    return payment_ids
+
+
+async def main(notifications: int, gateway_latency: float, gateway_error_rate: float, concurrency: int) -> None:
+    fake_mp = FakeMercadoPago(latency=gateway_latency, error_rate=gateway_error_rate)
+    payment_ids = seed_orders(fake_mp, notifications)
+    mp_server = await start_server(fake_mp.app, _mp_port)
+
+    bot = FakeBot()
+    api.state.ptb_app = setup_bot(bot=bot)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with lifespan(api):
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def send(payment_id: str) -> None:
+                request_id = str(uuid.uuid4())
+                headers = {
+                    "x-request-id": request_id,
+                    "x-signature": sign_notification("bench-secret", payment_id, request_id),
+                }
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        f"/webhook/mercadopago?data.id={payment_id}&type=payment",
+                        json={"type": "payment", "data": {"id": payment_id}},
+                        headers=headers,
+                    )
+                    latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(send(payment_id) for payment_id in payment_ids))
+            accepted = time.perf_counter() - started
+            while bot.delivered < notifications:
+                await asyncio.sleep(0.05)
+            drained = time.perf_counter() - started
+
+    await stop_server(mp_server)
+
+    print(f"{notifications} notificações, gateway com {gateway_latency * 1000:.0f} ms de latência")
+    print(f"  webhook p50={percentile(latencies, 50) * 1000:.1f} ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f} ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"  todas aceitas em {accepted:.2f} s, todas entregues em {drained:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da caixa de entrada do webhook.")
+    parser.add_argument("--notifications", type=int, default=200)
+    parser.add_argument("--gateway-latency", type=float, default=0.3)
+    parser.add_argument("--gateway-error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.notifications, args.gateway_latency, args.gateway_error_rate, args.concurrency))
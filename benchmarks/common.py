@@ -0,0 +1,81 @@
+# benchmarks/common.py
+#
+# Utilitários compartilhados pelos benchmarks.
+
+import asyncio
+import hashlib
+import hmac
+import socket
+import time
+
+import uvicorn
+from telegram import Bot, User as TelegramUser
+
+
+class FakeBot(Bot):
+    """Bot falso: não fala com o Telegram, só registra os chats que receberam mensagens."""
+
+    def __init__(self):
+        super().__init__(token="123456:bench")
+        with self._unfrozen():
+            self._deliveries: list[int] = []
+
+    @property
+    def delivered(self) -> int:
+        return len(self._deliveries)
+
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = TelegramUser(id=123456, first_name="Bench", is_bot=True, username="bench_bot")
+        return self._bot_user
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._deliveries.append(chat_id)
+        return True
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self._deliveries.append(chat_id)
+        return True
+
+    async def answer_callback_query(self, *args, **kwargs):
+        return True
+
+    async def edit_message_text(self, *args, **kwargs):
+        return True
+
+
+def free_port() -> int:
+    """Porta TCP livre em localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(app, port: int, lifespan: str = "off") -> uvicorn.Server:
+    """Sobe um app ASGI com uvicorn no event loop atual e espera ele aceitar conexões."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan=lifespan))
+    server.task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def stop_server(server: uvicorn.Server) -> None:
+    server.should_exit = True
+    await server.task
+
+
+def sign_notification(secret: str, payment_id: str, request_id: str, ts: int | None = None) -> str:
+    """Monta o cabeçalho x-signature no formato usado pelo Mercado Pago."""
+    ts = ts if ts is not None else int(time.time() * 1000)
+    manifest = f"id:{payment_id};request-id:{request_id};ts:{ts};"
+    digest = hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+    return f"ts={ts},v1={digest}"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentil por "nearest rank" (amostras em qualquer ordem)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
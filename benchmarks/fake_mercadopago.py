@@ -0,0 +1,130 @@
+# benchmarks/fake_mercadopago.py
+#
+# Substituto local da API de pagamentos do Mercado Pago, com latência e taxa de
+# erro configuráveis. Aponte MERCADO_PAGO_API_URL para ele.
+
+import asyncio
+import itertools
+import random
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.common import sign_notification
+
+# PNG 1x1 usado como QR Code falso.
+FAKE_QR_PNG = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAAAAAA6fptVAAAACklEQVR4nGNgAAAAAgABSK+kcQAAAABJRU5ErkJggg=="
+
+
+class FakeMercadoPago:
+    """Guarda os pagamentos em memória e expõe os endpoints usados pelo projeto."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, webhook_secret: str | None = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.webhook_secret = webhook_secret
+        self.payments: dict[str, dict] = {}
+        self._notification_urls: dict[str, str] = {}
+        self.requests = 0
+        self._ids = itertools.count(1_000_000)
+        self._idempotency: dict[str, str] = {}
+        self.app = self._build_app()
+
+    def add_payment(self, external_reference: str, status: str = "pending", amount: float = 1.0) -> dict:
+        payment_id = str(next(self._ids))
+        payment = {
+            "id": int(payment_id),
+            "status": status,
+            "transaction_amount": amount,
+            "external_reference": external_reference,
+            "date_created": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "point_of_interaction": {
+                "transaction_data": {
+                    "qr_code": f"00020126PIXFAKE{payment_id}",
+                    "qr_code_base64": FAKE_QR_PNG,
+                }
+            },
+        }
+        if status == "approved":
+            payment["date_approved"] = payment["date_created"]
+        self.payments[payment_id] = payment
+        return payment
+
+    def approve(self, payment_id: str) -> None:
+        payment = self.payments[str(payment_id)]
+        payment["status"] = "approved"
+        payment["date_approved"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+    async def notify(self, payment_id: str, client: httpx.AsyncClient) -> httpx.Response:
+        """
+        Envia a notificação assinada do pagamento para a notification_url informada na
+        criação, como o Mercado Pago faz quando o status muda.
+        """
+        request_id = str(uuid.uuid4())
+        return await client.post(
+            self._notification_urls[str(payment_id)],
+            params={"data.id": payment_id, "type": "payment"},
+            json={"type": "payment", "action": "payment.updated", "data": {"id": str(payment_id)}},
+            headers={
+                "x-request-id": request_id,
+                "x-signature": sign_notification(self.webhook_secret, str(payment_id), request_id),
+            },
+        )
+
+    async def _simulate(self):
+        """Aplica a latência configurada e, às vezes, devolve um erro 503."""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"message": "fake unavailable"}, status_code=503)
+        return None
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/v1/payments")
+        async def create_payment(request: Request):
+            if (error := await self._simulate()) is not None:
+                return error
+            key = request.headers.get("x-idempotency-key")
+            if key and key in self._idempotency:
+                return JSONResponse(self.payments[self._idempotency[key]], status_code=201)
+            data = await request.json()
+            payment = self.add_payment(data.get("external_reference"), amount=data.get("transaction_amount", 0))
+            if data.get("notification_url"):
+                self._notification_urls[str(payment["id"])] = data["notification_url"]
+            if key:
+                self._idempotency[key] = str(payment["id"])
+            return JSONResponse(payment, status_code=201)
+
+        @app.get("/v1/payments/search")
+        async def search_payments(offset: int = 0, limit: int = 30, begin_date: str | None = None,
+                                  end_date: str | None = None):
+            if (error := await self._simulate()) is not None:
+                return error
+            begin = datetime.fromisoformat(begin_date) if begin_date else None
+            end = datetime.fromisoformat(end_date) if end_date else None
+            matches = [
+                payment for payment in self.payments.values()
+                if (begin is None or datetime.fromisoformat(payment["date_created"]) >= begin)
+                and (end is None or datetime.fromisoformat(payment["date_created"]) <= end)
+            ]
+            return {
+                "paging": {"total": len(matches), "limit": limit, "offset": offset},
+                "results": matches[offset:offset + limit],
+            }
+
+        @app.get("/v1/payments/{payment_id}")
+        async def get_payment(payment_id: str):
+            if (error := await self._simulate()) is not None:
+                return error
+            payment = self.payments.get(payment_id)
+            if payment is None:
+                return JSONResponse({"message": "not found"}, status_code=404)
+            return payment
+
+        return app
@@ -0,0 +1,100 @@
+# benchmarks/fake_telegram.py
+#
+# Substituto local da Bot API do Telegram: responde aos métodos usados pelo
+# projeto e guarda as mensagens enviadas. Aponte TELEGRAM_API_URL para ele.
+
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+# Campos de texto de um corpo multipart (sem depender do python-multipart).
+_MULTIPART_FIELD = re.compile(rb'; name="([^"]+)"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', re.S)
+
+
+def parse_params(content_type: str, body: bytes) -> dict:
+    """Parâmetros de uma chamada do PTB: JSON, formulário urlencoded ou multipart (com arquivo)."""
+    if not body:
+        return {}
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    if content_type.startswith("multipart/"):
+        return {
+            name.decode(): value.decode(errors="replace")
+            for name, value in _MULTIPART_FIELD.findall(body)
+            if not name.startswith(b"attach")
+        }
+    return dict(parse_qsl(body.decode()))
+
+
+class FakeTelegram:
+    """
+    Guarda em memória as chamadas recebidas, por método, e as mensagens enviadas a
+    cada chat. `latency` atrasa cada chamada; `error_rate` devolve um 502 às vezes;
+    `upload_rate` (bytes/s, 0 = sem limite) simula o tempo de subir o corpo da chamada.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, upload_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.upload_rate = upload_rate
+        self.calls: dict[str, int] = {}
+        self.bytes_received: dict[str, int] = {}
+        self._file_ids = itertools.count(1)
+        self.sent: list[tuple[int, str]] = []
+        self._inboxes: dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._message_ids = itertools.count(1)
+        self.app = self._build_app()
+
+    async def next_message(self, chat_id: int, timeout: float = 60.0) -> tuple[str, str]:
+        """Espera a próxima mensagem enviada ao chat; devolve (método, texto ou legenda)."""
+        return await asyncio.wait_for(self._inboxes[chat_id].get(), timeout)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = int(params.get("chat_id", 0))
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text") or params.get("caption") or "",
+        }
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/bot{token}/{method}")
+        async def call(token: str, method: str, request: Request):
+            body = await request.body()
+            params = parse_params(request.headers.get("content-type", ""), body)
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.bytes_received[method] = self.bytes_received.get(method, 0) + len(body)
+            delay = self.latency + (len(body) / self.upload_rate if self.upload_rate else 0.0)
+            if delay:
+                await asyncio.sleep(delay)
+            if method != "getMe" and self.error_rate and random.random() < self.error_rate:
+                return JSONResponse({"ok": False, "error_code": 502, "description": "Bad Gateway"}, status_code=502)
+
+            if method == "getMe":
+                result = BOT_USER
+            elif method in ("sendMessage", "sendPhoto", "sendDocument"):
+                result = self._message(params)
+                if method == "sendDocument":
+                    # Um file_id recebido é devolvido como veio; um upload ganha um novo.
+                    file_id = params.get("document") or f"FILE{next(self._file_ids)}"
+                    result["document"] = {"file_id": file_id, "file_unique_id": file_id}
+                self.sent.append((result["chat"]["id"], method))
+                self._inboxes[result["chat"]["id"]].put_nowait((method, result["text"]))
+            else:
+                result = True
+            return {"ok": True, "result": result}
+
+        return app
@@ -1,29 +1,158 @@
 # bot/bot.py
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from telegram import Bot, Update
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     filters,
-    CallbackQueryHandler
+    CallbackQueryHandler,
+    InlineQueryHandler,
 )
-from core.config import TELEGRAM_TOKEN
-from bot.handlers import start, show_products, button_handler
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
+from core.config import (
+    TELEGRAM_TOKEN,
+    TELEGRAM_API_URL,
+    ORDER_SWEEP_INTERVAL,
+    ORDER_ARCHIVE_AFTER_DAYS,
+    ORDER_ARCHIVE_INTERVAL,
+    BOT_RUN_MODE,
+    BOT_CONCURRENT_UPDATES,
+    TELEGRAM_WEBHOOK_URL,
+    TELEGRAM_WEBHOOK_SECRET,
+    APP_ROLE,
+    SERVER_HOST,
+    METRICS_PORT,
 )
-logging.getLogger("httpx").setLevel(logging.WARNING) # Silencia logs excessivos do httpx
+from bot.dispatcher import TelegramDispatcher
+from bot.handlers import start, show_products, show_orders, button_handler, inline_query
+from bot.search import product_index
+from bot.jobs import sweep_orders, archive_job
+from bot.updates import PerUserUpdateProcessor
+from bot.users import user_registry
+from core.metrics import BOT_UPDATE_SATURATION, TELEGRAM_QUEUE_DEPTH, start_metrics_server
+from database.database import async_engine, create_db_and_tables
+from payments.mercadopago import mp_client
+
 logger = logging.getLogger(__name__)
 
-def setup_bot() -> Application:
-    """Configura e retorna a aplicação do bot para ser executada posteriormente."""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+async def post_init(application: Application) -> None:
+    """
+    Cria as tabelas e aplica as migrações pendentes, depois inicia o dispatcher de envio,
+    o registro de usuários e o índice de busca usados pelos handlers.
+    """
+    # Antes de tudo que lê o banco (ex.: o índice de busca lê catalog_state).
+    await asyncio.to_thread(create_db_and_tables)
+    dispatcher = TelegramDispatcher(application.bot)
+    dispatcher.start()
+    application.bot_data["dispatcher"] = dispatcher
+    user_registry.start()
+    await product_index.start()
+    TELEGRAM_QUEUE_DEPTH.set_function(lambda: dispatcher.queue_depth)
+    if isinstance(application.update_processor, PerUserUpdateProcessor):
+        BOT_UPDATE_SATURATION.set_function(lambda: application.update_processor.saturation)
+    if APP_ROLE == "bot" and METRICS_PORT:
+        # Sem o FastAPI neste processo: as métricas do bot (handlers, saturação, fila de
+        # envio, disjuntor da criação de cobranças) saem por um servidor próprio.
+        application.bot_data["metrics_server"] = await start_metrics_server(SERVER_HOST, METRICS_PORT)
+        logger.info("Métricas do bot em http://%s:%s/metrics.", SERVER_HOST, METRICS_PORT)
+
+async def post_shutdown(application: Application) -> None:
+    """
+    Fecha o servidor de métricas (APP_ROLE=bot), grava os usuários pendentes, para o
+    dispatcher e libera os pools de conexões (Mercado Pago e banco) ao encerrar o bot.
+    """
+    metrics_server = application.bot_data.get("metrics_server")
+    if metrics_server is not None:
+        metrics_server.close()
+    await user_registry.stop()
+    await product_index.stop()
+    await application.bot_data["dispatcher"].stop()
+    await mp_client.aclose()
+    await async_engine.dispose()
+
+def setup_bot(bot: Bot | None = None) -> Application:
+    """
+    Configura e retorna a aplicação do bot para ser executada posteriormente.
+    Um `bot` já construído pode ser passado no lugar do token (ex.: em benchmarks).
+    """
+    builder = Application.builder()
+    if bot is not None:
+        builder = builder.bot(bot)
+    else:
+        builder = (
+            builder.token(TELEGRAM_TOKEN)
+            .base_url(f"{TELEGRAM_API_URL}/bot")
+            .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+        )
+    application = (
+        builder
+        .concurrent_updates(PerUserUpdateProcessor(BOT_CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.TEXT & filters.Regex('^🛍️ Ver Produtos$'), show_products))
+    application.add_handler(CommandHandler("pedidos", show_orders))
+    application.add_handler(MessageHandler(filters.TEXT & filters.Regex('^📦 Meus Pedidos$'), show_orders))
     application.add_handler(CallbackQueryHandler(button_handler))
+    # Busca inline (@bot termo); o modo inline precisa estar ativado no BotFather (/setinline).
+    application.add_handler(InlineQueryHandler(inline_query))
+
+    # Expiração de pedidos PENDING vencidos e reconciliação com o Mercado Pago.
+    application.job_queue.run_repeating(sweep_orders, interval=ORDER_SWEEP_INTERVAL, first=ORDER_SWEEP_INTERVAL)
+    # Arquivamento dos pedidos antigos em estado final (ORDER_ARCHIVE_AFTER_DAYS=0 desativa).
+    if ORDER_ARCHIVE_AFTER_DAYS > 0:
+        application.job_queue.run_repeating(archive_job, interval=ORDER_ARCHIVE_INTERVAL, first=ORDER_ARCHIVE_INTERVAL)
+
+    return application
+
+@asynccontextmanager
+async def run_bot(application: Application, mode: str = BOT_RUN_MODE) -> AsyncIterator[Application]:
+    """
+    Inicia a aplicação do bot no event loop atual (o do FastAPI) e a encerra na saída,
+    na mesma ordem que o `run_polling` do PTB usa.
+
+    No modo "webhook" as atualizações chegam pelo endpoint /webhook/telegram e são
+    colocadas em `application.update_queue`; no modo "polling" o Updater busca as
+    atualizações, como fallback para desenvolvimento.
+    """
+    if mode not in ("webhook", "polling"):
+        raise ValueError(f"BOT_RUN_MODE inválido: {mode!r} (use 'webhook' ou 'polling').")
+    if mode == "webhook" and not TELEGRAM_WEBHOOK_SECRET:
+        # Sem segredo, /webhook/telegram aceitaria atualizações forjadas de qualquer origem.
+        raise ValueError("BOT_RUN_MODE=webhook exige TELEGRAM_WEBHOOK_SECRET configurado.")
 
-    return application
\ No newline at end of file
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        if mode == "polling":
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            logger.info("Bot recebendo atualizações por polling.")
+        elif TELEGRAM_WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=TELEGRAM_WEBHOOK_URL,
+                secret_token=TELEGRAM_WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info("Webhook do Telegram registrado em %s.", TELEGRAM_WEBHOOK_URL)
+        else:
+            logger.warning("Modo webhook sem TELEGRAM_WEBHOOK_URL: o webhook não foi registrado.")
+        await application.start()
+        yield application
+    finally:
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -0,0 +1,169 @@
+# bot/catalog.py
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from cachetools import LRUCache
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from core.config import CATALOG_CACHE_TTL, CATALOG_PAGE_SIZE
+from database.catalog import get_catalog_version, fetch_products_after, fetch_products_before
+from database.database import AsyncSessionLocal
+from database.models import Product
+
+# Compilado uma única vez, em vez de a cada mensagem.
+_MARKDOWN_V2_SPECIAL = re.compile(f'([{re.escape(r"_*[]()~`>#+-=|{}.!")}])')
+
+# Descrições muito longas são cortadas na listagem para a página caber em uma mensagem.
+MAX_DESCRIPTION_LENGTH = 300
+
+# Prefixos dos callbacks de navegação do catálogo.
+CATALOG_NEXT_PREFIX = "cat_next_"
+CATALOG_PREV_PREFIX = "cat_prev_"
+
+def escape_markdown_v2(text: str) -> str:
+    """Função auxiliar para escapar caracteres especiais do MarkdownV2."""
+    return _MARKDOWN_V2_SPECIAL.sub(r'\\\1', text)
+
+@dataclass(frozen=True)
+class CachedProduct:
+    """Produto do catálogo com o texto e o botão de compra já renderizados."""
+    id: int
+    name: str
+    description: str
+    price: Decimal
+    text: str
+    button: InlineKeyboardButton
+
+    @classmethod
+    def from_model(cls, product: Product) -> "CachedProduct":
+        description = product.description
+        if len(description) > MAX_DESCRIPTION_LENGTH:
+            description = description[:MAX_DESCRIPTION_LENGTH].rstrip() + "…"
+        return cls(
+            id=product.id,
+            name=product.name,
+            description=product.description,
+            price=product.price,
+            text=(
+                f"*{escape_markdown_v2(product.name)}* — R$ {escape_markdown_v2(str(product.price))}\n"
+                f"{escape_markdown_v2(description)}"
+            ),
+            button=InlineKeyboardButton(
+                f"Comprar {product.name} por R$ {product.price}", callback_data=f"buy_{product.id}"
+            ),
+        )
+
+@dataclass(frozen=True)
+class CatalogPage:
+    """Uma página do catálogo pronta para ser enviada ou editada (MarkdownV2)."""
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
+    @classmethod
+    def render(cls, products: list[CachedProduct], has_prev: bool, has_next: bool) -> "CatalogPage":
+        text = "🛍️ *Nossos produtos*\n\n" + "\n\n".join(product.text for product in products)
+        keyboard = [[product.button] for product in products]
+        navigation = []
+        if has_prev:
+            navigation.append(InlineKeyboardButton("⬅️ Anterior", callback_data=f"{CATALOG_PREV_PREFIX}{products[0].id}"))
+        if has_next:
+            navigation.append(InlineKeyboardButton("Próxima ➡️", callback_data=f"{CATALOG_NEXT_PREFIX}{products[-1].id}"))
+        if navigation:
+            keyboard.append(navigation)
+        return cls(text=text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+class CatalogCache:
+    """
+    Cache do catálogo de produtos compartilhado por todo o processo.
+
+    Guarda as páginas já renderizadas (buscadas por keyset, sem carregar a tabela
+    inteira) e os produtos individuais usados na compra. Depois de `ttl` segundos o
+    cache consulta apenas a versão do catálogo (catalog_state) e só descarta o
+    conteúdo se ela mudou. `invalidate()` força a recarga na próxima leitura.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, page_size: int = CATALOG_PAGE_SIZE):
+        self._ttl = ttl
+        self._page_size = page_size
+        self._pages: LRUCache = LRUCache(maxsize=1024)
+        self._products: LRUCache = LRUCache(maxsize=4096)
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._version = None
+
+    async def page_after(self, after_id: int = 0) -> CatalogPage | None:
+        """Página que começa depois do produto `after_id` (0 = primeira página)."""
+        return await self._page(("after", after_id))
+
+    async def page_before(self, before_id: int) -> CatalogPage | None:
+        """Página que termina antes do produto `before_id`."""
+        page = await self._page(("before", before_id))
+        # Se os produtos anteriores sumiram, volta para o início do catálogo.
+        return page or await self.page_after(0)
+
+    async def get(self, product_id: int) -> CachedProduct | None:
+        await self._ensure_fresh()
+        product = self._products.get(product_id)
+        if product is None:
+            async with AsyncSessionLocal() as db:
+                model = await db.get(Product, product_id)
+            if model is None:
+                return None
+            product = self._products[product_id] = CachedProduct.from_model(model)
+        return product
+
+    async def _page(self, key: tuple[str, int]) -> CatalogPage | None:
+        await self._ensure_fresh()
+        if key in self._pages:
+            return self._pages[key]
+
+        direction, cursor = key
+        # Busca um item a mais para saber se existe página seguinte/anterior.
+        async with AsyncSessionLocal() as db:
+            if direction == "after":
+                models = await fetch_products_after(db, cursor, self._page_size + 1)
+                has_more = len(models) > self._page_size
+                models = models[:self._page_size]
+                has_prev, has_next = cursor > 0, has_more
+            else:
+                models = await fetch_products_before(db, cursor, self._page_size + 1)
+                has_more = len(models) > self._page_size
+                models = models[-self._page_size:]
+                has_prev, has_next = has_more, True
+
+        if not models:
+            page = None
+        else:
+            products = [CachedProduct.from_model(model) for model in models]
+            for product in products:
+                self._products[product.id] = product
+            page = CatalogPage.render(products, has_prev=has_prev, has_next=has_next)
+        self._pages[key] = page
+        return page
+
+    def _is_fresh(self) -> bool:
+        return self._version is not None and time.monotonic() - self._checked_at < self._ttl
+
+    async def _ensure_fresh(self) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            # Outra tarefa pode ter conferido a versão enquanto esperávamos o lock.
+            if self._is_fresh():
+                return
+            async with AsyncSessionLocal() as db:
+                version = await get_catalog_version(db)
+            if version != self._version:
+                self._pages.clear()
+                self._products.clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+
+# Instância única usada pelos handlers.
+catalog_cache = CatalogCache()
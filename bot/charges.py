@@ -0,0 +1,72 @@
+# bot/charges.py
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from cachetools import TTLCache
+
+from core.config import PIX_EXPIRATION_MINUTES
+from database.database import AsyncSessionLocal, as_utc, utcnow
+from database.models import Order, OrderStatus
+from database.orders import find_open_order, get_order_status
+
+# Uma cobrança só é reaproveitada se ainda valer por pelo menos este tempo;
+# perto de vencer é melhor gerar outra do que mandar o usuário pagar uma que vai expirar.
+REUSE_MIN_REMAINING = timedelta(minutes=2)
+
+@dataclass(frozen=True)
+class PixCharge:
+    """Cobrança PIX em aberto de um pedido, pronta para ser reenviada ao usuário."""
+    order_id: uuid.UUID
+    qr_code: str
+    qr_code_base64: str
+    expires_at: datetime
+
+    @classmethod
+    def from_order(cls, order: Order) -> "PixCharge":
+        return cls(
+            order_id=order.id,
+            qr_code=order.pix_qr_code,
+            qr_code_base64=order.pix_qr_code_base64,
+            expires_at=as_utc(order.expires_at),
+        )
+
+class OpenChargeCache:
+    """
+    Cobranças PIX em aberto por (usuário, produto).
+
+    Um clique repetido em "Comprar" recebe a mesma cobrança, vinda deste cache ou da
+    tabela orders, sem nova chamada ao Mercado Pago. Num acerto do cache o status do
+    pedido é conferido pela chave primária: o pagamento pode ter sido confirmado por
+    outro processo (webhook, reconciliação).
+    """
+
+    def __init__(self, ttl: float = PIX_EXPIRATION_MINUTES * 60, maxsize: int = 10_000):
+        self._charges: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def remember(self, user_id: int, product_id: int, charge: PixCharge) -> None:
+        self._charges[(user_id, product_id)] = charge
+
+    def forget(self, user_id: int, product_id: int) -> None:
+        self._charges.pop((user_id, product_id), None)
+
+    async def get(self, user_id: int, product_id: int) -> PixCharge | None:
+        """Cobrança ainda válida do usuário para o produto, ou None se for preciso gerar outra."""
+        key = (user_id, product_id)
+        valid_until = utcnow() + REUSE_MIN_REMAINING
+        charge = self._charges.get(key)
+
+        async with AsyncSessionLocal() as db:
+            if charge is not None:
+                if charge.expires_at > valid_until and \
+                        await get_order_status(db, charge.order_id) == OrderStatus.PENDING:
+                    return charge
+                self._charges.pop(key, None)
+
+            order = await find_open_order(db, user_id, product_id, valid_until)
+        if order is None:
+            return None
+        charge = self._charges[key] = PixCharge.from_order(order)
+        return charge
+
+open_charges = OpenChargeCache()
@@ -0,0 +1,138 @@
+# bot/delivery.py
+
+import logging
+import uuid
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from telegram.error import BadRequest
+
+from bot.charges import open_charges
+from bot.history import order_history
+from bot.dispatcher import TelegramDispatcher, PRIORITY_DELIVERY
+from core.config import PRODUCT_FILES_DIR
+from core.metrics import PAYMENT_DELIVERY_LAG_SECONDS, PRODUCT_DELIVERIES
+from database.catalog import save_product_file_id
+from database.database import AsyncSessionLocal, utcnow
+from database.models import Order, Product
+from database.orders import mark_order_paid
+
+logger = logging.getLogger(__name__)
+
+def product_file(product: Product) -> Path | None:
+    """
+    Arquivo local do produto, se `content` apontar para um dentro de PRODUCT_FILES_DIR
+    (senão o conteúdo é texto/link). Caminhos que saem da pasta (absolutos ou com "..")
+    são recusados: o catálogo é importado de arquivos e não pode expor o servidor.
+    """
+    base = Path(PRODUCT_FILES_DIR).resolve()
+    path = (base / product.content).resolve()
+    if not path.is_relative_to(base):
+        if path.is_file():
+            logger.error("Conteúdo do produto %s aponta para fora de %s; não será enviado como arquivo.",
+                         product.id, base)
+        return None
+    return path if path.is_file() else None
+
+async def _send_product_file(order: Order, product: Product, dispatcher: TelegramDispatcher, path: Path | None):
+    """
+    Envia o arquivo do produto pelo file_id guardado ou, na primeira vez, fazendo o
+    upload de `path` e guardando o file_id devolvido pelo Telegram.
+    """
+    send = partial(
+        dispatcher.send_document,
+        order.user_id,
+        caption=f"Pagamento aprovado!\n\nSeu conteúdo '{product.name}' segue em anexo.",
+        priority=PRIORITY_DELIVERY,
+        persist=True,
+        order_id=order.id,
+    )
+
+    if product.telegram_file_id:
+        try:
+            result = await send(document=product.telegram_file_id)
+            PRODUCT_DELIVERIES.inc(kind="file_cached")
+            return result
+        except BadRequest as e:
+            if "file" not in str(e).lower() or path is None:
+                raise
+            # file_id recusado (ex.: token do bot trocado): volta a enviar o arquivo.
+            logger.warning("file_id do produto %s recusado pelo Telegram; enviando o arquivo de novo.",
+                           product.id, extra={"order_id": order.id})
+
+    result = await send(document=str(path))
+    PRODUCT_DELIVERIES.inc(kind="file_upload")
+    file_id = result.document.file_id if result is not None and result.document else None
+    if file_id and file_id != product.telegram_file_id:
+        async with AsyncSessionLocal() as db:
+            await save_product_file_id(db, product.id, file_id)
+    return result
+
+async def deliver_product(order: Order, product: Product, dispatcher: TelegramDispatcher) -> bool:
+    """
+    Função assíncrona para enviar o conteúdo digital ao usuário via Telegram.
+    A entrega tem prioridade máxima no dispatcher e, se falhar, fica guardada para nova tentativa.
+    Produtos com arquivo são enviados como documento (upload só na primeira venda).
+    Retorna True se a mensagem foi entregue agora.
+    """
+    try:
+        path = product_file(product)
+        if product.telegram_file_id or path is not None:
+            result = await _send_product_file(order, product, dispatcher, path)
+        else:
+            result = await dispatcher.send_message(
+                order.user_id,
+                text=(
+                    f"Pagamento aprovado!\n\n"
+                    f"Seu conteúdo '{product.name}' está liberado:\n{product.content}"
+                ),
+                priority=PRIORITY_DELIVERY,
+                persist=True,
+                order_id=order.id
+            )
+            PRODUCT_DELIVERIES.inc(kind="text")
+        if result is None:
+            logger.warning("Entrega do pedido %s adiada; será reenviada automaticamente.", order.id,
+                           extra={"order_id": order.id, "user_id": order.user_id})
+            return False
+        logger.info("Produto entregue com sucesso para o pedido %s.", order.id,
+                    extra={"order_id": order.id, "user_id": order.user_id, "sampled": True})
+        return True
+    except Exception:
+        logger.exception("Erro ao entregar o produto para o pedido %s.", order.id,
+                         extra={"order_id": order.id, "user_id": order.user_id})
+        return False
+
+async def fulfill_order(
+    order_uuid: uuid.UUID,
+    dispatcher: TelegramDispatcher,
+    approved_at: datetime | None = None,
+) -> bool:
+    """
+    Marca o pedido como pago (transição atômica) e entrega o produto.
+    Usada pelo webhook e pela reconciliação; retorna True se esta chamada entregou o pedido.
+    `approved_at` (date_approved do Mercado Pago) alimenta a métrica de atraso da entrega.
+    """
+    async with AsyncSessionLocal() as db:
+        # Transição atômica: só quem de fato mudou o pedido de PENDING para PAID entrega.
+        order = await mark_order_paid(db, order_uuid)
+        if not order:
+            logger.info("Pedido %s não encontrado ou já processado.", order_uuid, extra={"order_id": order_uuid})
+            return False
+
+        logger.info("Pedido %s atualizado para PAGO.", order.id,
+                    extra={"order_id": order.id, "user_id": order.user_id, "sampled": True})
+        open_charges.forget(order.user_id, order.product_id)
+        order_history.invalidate(order.user_id)
+
+        product = await db.get(Product, order.product_id)
+
+    # A sessão é fechada antes da entrega para não segurar a conexão durante o envio.
+    if product:
+        if await deliver_product(order, product, dispatcher) and approved_at is not None:
+            PAYMENT_DELIVERY_LAG_SECONDS.observe(max(0.0, (utcnow() - approved_at).total_seconds()))
+    else:
+        logger.error("Produto não encontrado para o pedido pago %s.", order.id,
+                     extra={"order_id": order.id, "user_id": order.user_id})
+    return True
@@ -0,0 +1,354 @@
+# bot/dispatcher.py
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from cachetools import TTLCache
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from core.config import (
+    TELEGRAM_TOKEN,
+    TELEGRAM_API_URL,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_SEND_CONCURRENCY,
+    TELEGRAM_SEND_MAX_ATTEMPTS,
+    OUTBOX_RETRY_INTERVAL,
+)
+from core.metrics import TELEGRAM_SEND_SECONDS
+from database.database import AsyncSessionLocal
+from database.outbox import save_failed_message, take_due_messages
+
+logger = logging.getLogger(__name__)
+
+# Faixas de prioridade: números menores saem da fila primeiro.
+PRIORITY_DELIVERY = 0   # entrega de produto pago
+PRIORITY_PAYMENT = 1    # QR Code / código PIX
+PRIORITY_DEFAULT = 2    # catálogo e demais mensagens
+
+# Janela (segundos) usada para calcular a taxa de envio.
+SEND_RATE_WINDOW = 60.0
+
+def _seconds(value: int | float | timedelta) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+def build_bot_client(pool_size: int = TELEGRAM_SEND_CONCURRENCY) -> Bot:
+    """
+    Cliente do Bot API só para envios, sem Application: usado pela camada web, que
+    não recebe atualizações. O pool de conexões acompanha a concorrência do dispatcher.
+    """
+    return Bot(
+        TELEGRAM_TOKEN,
+        base_url=f"{TELEGRAM_API_URL}/bot",
+        base_file_url=f"{TELEGRAM_API_URL}/file/bot",
+        request=HTTPXRequest(connection_pool_size=pool_size),
+    )
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas por segundo, acumulando até `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Segundos até haver uma ficha disponível (0 se já houver)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+@dataclass(order=True)
+class OutgoingMessage:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    method: str = field(compare=False)
+    kwargs: dict = field(compare=False)
+    persist: bool = field(compare=False, default=False)
+    order_id: uuid.UUID | None = field(compare=False, default=None)
+    attempts: int = field(compare=False, default=0)
+    future: asyncio.Future | None = field(compare=False, default=None)
+
+class TelegramDispatcher:
+    """
+    Ponto central de envio para o Bot API.
+
+    As mensagens entram em uma fila com prioridade e saem respeitando um limite
+    global (token bucket) e um limite por chat. Um 429 (RetryAfter) pausa todos os
+    envios pelo tempo pedido pelo Telegram. Mensagens marcadas com `persist=True`
+    (entregas de produto) que esgotam as tentativas são gravadas em outbound_messages
+    e reenviadas depois.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        chat_burst: int = TELEGRAM_CHAT_BURST,
+        concurrency: int = TELEGRAM_SEND_CONCURRENCY,
+        max_attempts: int = TELEGRAM_SEND_MAX_ATTEMPTS,
+        retry_interval: float = OUTBOX_RETRY_INTERVAL,
+    ):
+        self._bot = bot
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        # Baldes por chat expiram sozinhos quando o chat fica inativo.
+        self._chats: TTLCache = TTLCache(maxsize=100_000, ttl=max(60.0, chat_burst / chat_rate))
+        self._max_attempts = max_attempts
+        self._retry_interval = retry_interval
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._inflight = asyncio.Semaphore(concurrency)
+        # Mensagens adiadas (limite do chat ou backoff), com o timer que as recoloca na fila.
+        self._deferred: dict[int, tuple[OutgoingMessage, asyncio.TimerHandle]] = {}
+        # Mensagem já retirada da fila por `_run` e ainda não entregue a `_send`
+        # (esperando o fim de uma pausa 429, o balde global ou uma vaga de envio).
+        self._holding: OutgoingMessage | None = None
+        self._paused_until = 0.0
+        self._sent_at: deque = deque()
+        self.sent_total = 0
+        self.failed_total = 0
+        self._tasks: list[asyncio.Task] = []
+        self._sending: set[asyncio.Task] = set()
+
+    # --- Métricas ---
+
+    @property
+    def queue_depth(self) -> int:
+        """Mensagens aguardando envio (na fila ou adiadas pelo limite do chat ou por backoff)."""
+        return self._queue.qsize() + len(self._deferred)
+
+    @property
+    def send_rate(self) -> float:
+        """Mensagens enviadas por segundo na última janela de SEND_RATE_WINDOW segundos."""
+        self._trim_sent(time.monotonic())
+        return len(self._sent_at) / SEND_RATE_WINDOW
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run(), name="telegram-dispatcher"),
+            asyncio.create_task(self._retry_persisted(), name="telegram-dispatcher-retry"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        # Espera os envios que já estavam em andamento (que ainda podem adiar ou
+        # recolocar mensagens na fila).
+        await asyncio.gather(*self._sending, return_exceptions=True)
+
+        # Tudo o que não foi enviado: a mensagem retida por `_run`, as adiadas e a fila.
+        pending = [self._holding] if self._holding is not None else []
+        self._holding = None
+        for message, timer in self._deferred.values():
+            timer.cancel()
+            pending.append(message)
+        self._deferred.clear()
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+
+        # As que precisam ser entregues vão para o banco; quem espera o envio é liberado.
+        for message in pending:
+            if message.persist:
+                await self._persist(message, "Dispatcher encerrado antes do envio.")
+                if message.future is not None and not message.future.done():
+                    message.future.set_result(None)
+            elif message.future is not None and not message.future.done():
+                message.future.set_exception(RuntimeError("Dispatcher encerrado antes do envio."))
+
+    # --- Envio ---
+
+    async def send(
+        self,
+        chat_id: int,
+        method: str,
+        priority: int = PRIORITY_DEFAULT,
+        wait: bool = True,
+        persist: bool = False,
+        order_id: uuid.UUID | None = None,
+        **kwargs,
+    ):
+        """
+        Enfileira uma chamada `bot.<method>(chat_id=..., **kwargs)`.
+
+        Com `wait=True` aguarda o envio e devolve o retorno do Bot API (ou None se a
+        mensagem foi guardada para nova tentativa); erros definitivos são propagados.
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        message = OutgoingMessage(
+            priority=priority,
+            seq=next(self._seq),
+            chat_id=chat_id,
+            method=method,
+            kwargs=kwargs,
+            persist=persist,
+            order_id=order_id,
+            future=future,
+        )
+        self._queue.put_nowait(message)
+        if future is not None:
+            return await future
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        return await self.send(chat_id, "send_message", text=text, **kwargs)
+
+    async def send_photo(self, chat_id: int, photo, **kwargs):
+        return await self.send(chat_id, "send_photo", photo=photo, **kwargs)
+
+    async def send_document(self, chat_id: int, document: str, **kwargs):
+        """`document` é um file_id ou o caminho de um arquivo local (texto, para caber no outbox)."""
+        return await self.send(chat_id, "send_document", document=document, **kwargs)
+
+    async def _run(self) -> None:
+        while True:
+            message = self._holding = await self._queue.get()
+            now = time.monotonic()
+
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                now = time.monotonic()
+
+            # Chat no limite: adia só esta mensagem, sem segurar as dos outros chats.
+            chat = self._chats.get(message.chat_id)
+            if chat is None:
+                chat = self._chats[message.chat_id] = TokenBucket(self._chat_rate, self._chat_burst)
+            chat_delay = chat.delay(now)
+            if chat_delay > 0:
+                self._holding = None
+                self._defer(message, chat_delay)
+                continue
+
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                self._global.delay(time.monotonic())
+
+            chat.take()
+            self._global.take()
+            await self._inflight.acquire()
+            self._holding = None
+            task = asyncio.create_task(self._send(message))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    def _defer(self, message: OutgoingMessage, delay: float) -> None:
+        def requeue():
+            del self._deferred[message.seq]
+            self._queue.put_nowait(message)
+
+        self._deferred[message.seq] = (message, asyncio.get_running_loop().call_later(delay, requeue))
+
+    async def _call(self, message: OutgoingMessage):
+        """Chamada ao Bot API, com a duração registrada por método e resultado."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await getattr(self._bot, message.method)(chat_id=message.chat_id, **message.kwargs)
+            outcome = "ok"
+            return result
+        except RetryAfter:
+            outcome = "rate_limited"
+            raise
+        finally:
+            TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - started, method=message.method, outcome=outcome)
+
+    async def _send(self, message: OutgoingMessage) -> None:
+        try:
+            result = await self._call(message)
+        except RetryAfter as e:
+            # Limite global do Telegram: pausa todos os envios e recoloca a mensagem.
+            retry_after = _seconds(e.retry_after)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning("Telegram pediu para aguardar %.1f s (429). Envios pausados.", retry_after)
+            self._queue.put_nowait(message)
+        except (BadRequest, Forbidden) as e:
+            # Erros definitivos (mensagem inválida, usuário bloqueou o bot): não adianta repetir.
+            await self._fail(message, e, retryable=False)
+        except (NetworkError, TelegramError) as e:
+            message.attempts += 1
+            if message.attempts < self._max_attempts:
+                self._defer(message, min(2 ** message.attempts, 30))
+            else:
+                await self._fail(message, e, retryable=True)
+        except Exception as e:
+            await self._fail(message, e, retryable=False)
+        else:
+            now = time.monotonic()
+            self.sent_total += 1
+            self._sent_at.append(now)
+            self._trim_sent(now)
+            if message.future is not None and not message.future.done():
+                message.future.set_result(result)
+        finally:
+            self._inflight.release()
+
+    async def _fail(self, message: OutgoingMessage, error: Exception, retryable: bool) -> None:
+        self.failed_total += 1
+        if retryable and message.persist:
+            await self._persist(message, repr(error))
+            logger.warning("Envio para o chat %s falhou e foi guardado para nova tentativa: %r",
+                           message.chat_id, error)
+            if message.future is not None and not message.future.done():
+                message.future.set_result(None)
+            return
+
+        logger.error("Envio para o chat %s falhou definitivamente: %r", message.chat_id, error)
+        if message.future is not None and not message.future.done():
+            message.future.set_exception(error)
+
+    async def _persist(self, message: OutgoingMessage, error: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await save_failed_message(
+                    db, message.chat_id, message.method, message.kwargs,
+                    message.order_id, message.attempts, error,
+                )
+        except Exception:
+            logger.exception("Não foi possível guardar a mensagem para o chat %s.", message.chat_id)
+
+    async def _retry_persisted(self) -> None:
+        """Relê periodicamente as entregas que falharam e as coloca de volta na fila."""
+        while True:
+            await asyncio.sleep(self._retry_interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    due = await take_due_messages(db, limit=100)
+            except Exception:
+                logger.exception("Falha ao ler as mensagens pendentes de reenvio.")
+                continue
+
+            for row in due:
+                self._queue.put_nowait(OutgoingMessage(
+                    priority=PRIORITY_DELIVERY,
+                    seq=next(self._seq),
+                    chat_id=row.chat_id,
+                    method=row.method,
+                    kwargs=json.loads(row.payload),
+                    persist=True,
+                    order_id=row.order_id,
+                    attempts=row.attempts,
+                ))
+
+    def _trim_sent(self, now: float) -> None:
+        while self._sent_at and now - self._sent_at[0] > SEND_RATE_WINDOW:
+            self._sent_at.popleft()
@@ -1,134 +1,267 @@
 # bot/handlers.py
 
 import base64
-import re
+import logging
+import uuid
+from datetime import timedelta
 from telegram import (
     Update,
     ReplyKeyboardMarkup,
     InlineKeyboardButton,
-    InlineKeyboardMarkup
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
 )
 from telegram.ext import ContextTypes
-from sqlalchemy.orm import Session
-import mercadopago
-from database.database import SessionLocal
-from database.models import User, Product, Order
-from payments.mercadopago import create_pix_payment
+from bot.catalog import catalog_cache, CATALOG_NEXT_PREFIX, CATALOG_PREV_PREFIX, MAX_DESCRIPTION_LENGTH
+from bot.charges import PixCharge, open_charges
+from bot.delivery import deliver_product
+from bot.dispatcher import TelegramDispatcher, PRIORITY_PAYMENT
+from bot.history import order_history, ORDERS_PAGE_PREFIX, ORDERS_RESEND_PREFIX
+from bot.search import product_index
+from bot.users import user_registry
+from core.config import PIX_EXPIRATION_MINUTES, INLINE_RESULTS_LIMIT, INLINE_CACHE_TIME
+from core.metrics import BOT_HANDLER_SECONDS, ORDER_TRANSITIONS, timed
+from database.database import AsyncSessionLocal, utcnow
+from database.models import Order
+from database.orders import get_paid_order_with_product, mark_order_failed
+from payments.mercadopago import create_pix_payment, mp_client
 
-def escape_markdown_v2(text: str) -> str:
-    """Função auxiliar para escapar caracteres especiais do MarkdownV2."""
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', text)
+logger = logging.getLogger(__name__)
 
+# Parâmetro do /start vindo do botão "Comprar" de um resultado da busca inline.
+BUY_DEEP_LINK_PREFIX = "buy_"
+
+def get_dispatcher(context: ContextTypes.DEFAULT_TYPE) -> TelegramDispatcher:
+    """Dispatcher de envio criado no post_init do bot."""
+    return context.bot_data["dispatcher"]
+
+@timed(BOT_HANDLER_SECONDS, handler="start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler para o comando /start."""
     if not update.message or not update.message.from_user:
         return
 
     user_info = update.message.from_user
-    db: Session = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == user_info.id).first()
-        if not user:
-            new_user = User(id=user_info.id, full_name=user_info.full_name)
-            db.add(new_user)
-            db.commit()
-            print(f"Novo usuário registrado: {user_info.full_name} ({user_info.id})")
-        else:
-            print(f"Usuário já conhecido: {user_info.full_name} ({user.id})")
-    finally:
-        db.close()
+    # Usuários conhecidos não tocam o banco; novos (ou que mudaram de nome) são gravados em lote.
+    if user_registry.register(user_info.id, user_info.full_name):
+        logger.info("Usuário %s enfileirado para registro.", user_info.id,
+                    extra={"user_id": user_info.id, "sampled": True})
 
-    keyboard = [["🛍️ Ver Produtos"], ["📞 Suporte", "💬 Sobre Nós"]]
+    keyboard = [["🛍️ Ver Produtos", "📦 Meus Pedidos"], ["📞 Suporte", "💬 Sobre Nós"]]
     reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     welcome_message = (
         f"Olá, {user_info.first_name}! 👋\n\n"
         "Bem-vindo(a) à nossa loja de conteúdo digital.\n\n"
         "Use o menu abaixo para navegar."
     )
-    await update.message.reply_text(welcome_message, reply_markup=reply_markup)
+    await get_dispatcher(context).send_message(
+        update.message.chat_id, welcome_message, reply_markup=reply_markup
+    )
+
+    # Vindo da busca inline (t.me/<bot>?start=buy_<id>): mostra o produto com o botão de compra.
+    if context.args and context.args[0].startswith(BUY_DEEP_LINK_PREFIX):
+        product_id = context.args[0][len(BUY_DEEP_LINK_PREFIX):]
+        product = await catalog_cache.get(int(product_id)) if product_id.isdigit() else None
+        if product:
+            await get_dispatcher(context).send_message(
+                update.message.chat_id,
+                text=product.text,
+                reply_markup=InlineKeyboardMarkup([[product.button]]),
+                parse_mode='MarkdownV2'
+            )
 
 
+@timed(BOT_HANDLER_SECONDS, handler="show_products")
 async def show_products(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler para o botão 'Ver Produtos'."""
-    db: Session = SessionLocal()
-    try:
-        products = db.query(Product).all()
-        if not products:
-            await update.message.reply_text("😕 Desculpe, não há produtos disponíveis no momento.")
-            return
+    """Handler para o botão 'Ver Produtos'. Envia a primeira página do catálogo."""
+    # A página já vem renderizada do cache de catálogo; a navegação edita esta mesma mensagem.
+    page = await catalog_cache.page_after(0)
+    if not page:
+        await get_dispatcher(context).send_message(
+            update.message.chat_id, "😕 Desculpe, não há produtos disponíveis no momento."
+        )
+        return
 
-        await update.message.reply_text("Aqui estão nossos produtos disponíveis:")
-        for product in products:
-            keyboard = [[
-                InlineKeyboardButton(f"Comprar por R$ {product.price}", callback_data=f"buy_{product.id}")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            safe_name = escape_markdown_v2(product.name)
-            safe_description = escape_markdown_v2(product.description)
-            
-            product_message = (
-                f"*{safe_name}*\n\n"
-                f"{safe_description}"
-            )
-            await update.message.reply_text(
-                text=product_message,
-                reply_markup=reply_markup,
-                parse_mode='MarkdownV2'
-            )
-    finally:
-        db.close()
+    await get_dispatcher(context).send_message(
+        update.message.chat_id,
+        text=page.text,
+        reply_markup=page.reply_markup,
+        parse_mode='MarkdownV2'
+    )
+
+@timed(BOT_HANDLER_SECONDS, handler="show_orders")
+async def show_orders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler do /pedidos e do botão 'Meus Pedidos'. Envia a página mais recente do histórico."""
+    if not update.message or not update.message.from_user:
+        return
+
+    page = await order_history.page(update.message.from_user.id)
+    await get_dispatcher(context).send_message(
+        update.message.chat_id,
+        text=page.text,
+        reply_markup=page.reply_markup,
+        parse_mode='MarkdownV2'
+    )
 
+@timed(BOT_HANDLER_SECONDS, handler="inline_query")
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Busca inline (@bot termo), respondida pelo índice em memória, sem consultar o banco.
+    O botão de cada resultado abre a conversa com o bot já no produto (deep link).
+    """
+    query = update.inline_query
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    products, next_offset = product_index.search(query.query, offset, INLINE_RESULTS_LIMIT)
+
+    results = []
+    for product in products:
+        description = product.description
+        if len(description) > MAX_DESCRIPTION_LENGTH:
+            description = description[:MAX_DESCRIPTION_LENGTH].rstrip() + "…"
+        buy_url = f"https://t.me/{context.bot.username}?start={BUY_DEEP_LINK_PREFIX}{product.id}"
+        results.append(InlineQueryResultArticle(
+            id=str(product.id),
+            title=product.name,
+            description=f"R$ {product.price} — {description}",
+            input_message_content=InputTextMessageContent(f"{product.name} — R$ {product.price}\n\n{description}"),
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🛒 Comprar", url=buy_url)]]),
+        ))
+
+    await query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        next_offset=str(next_offset) if next_offset is not None else "",
+    )
+
+@timed(BOT_HANDLER_SECONDS, handler="button")
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler para todos os botões de callback."""
     query = update.callback_query
     await query.answer()
     
     data = query.data
-    if data and data.startswith("buy_"):
+    if data and data.startswith((CATALOG_NEXT_PREFIX, CATALOG_PREV_PREFIX)):
+        cursor = int(data.rsplit("_", 1)[1])
+        if data.startswith(CATALOG_NEXT_PREFIX):
+            page = await catalog_cache.page_after(cursor)
+        else:
+            page = await catalog_cache.page_before(cursor)
+
+        if not page:
+            await query.edit_message_text(text="😕 Desculpe, não há produtos disponíveis no momento.")
+            return
+
+        await query.edit_message_text(
+            text=page.text,
+            reply_markup=page.reply_markup,
+            parse_mode='MarkdownV2'
+        )
+
+    elif data and data.startswith(ORDERS_PAGE_PREFIX):
+        cursor = data[len(ORDERS_PAGE_PREFIX):]
+        page = await order_history.page(query.from_user.id, uuid.UUID(cursor) if cursor else None)
+        await query.edit_message_text(
+            text=page.text,
+            reply_markup=page.reply_markup,
+            parse_mode='MarkdownV2'
+        )
+
+    elif data and data.startswith(ORDERS_RESEND_PREFIX):
+        # Reenvio do conteúdo de um pedido pago; só o dono do pedido pode pedir.
+        async with AsyncSessionLocal() as db:
+            found = await get_paid_order_with_product(
+                db, uuid.UUID(data[len(ORDERS_RESEND_PREFIX):]), query.from_user.id
+            )
+        if found is None:
+            await get_dispatcher(context).send_message(query.from_user.id, "Pedido não encontrado.")
+            return
+        order, product = found
+        await deliver_product(order, product, get_dispatcher(context))
+
+    elif data and data.startswith("buy_"):
         product_id = int(data.split("_")[1])
         user_id = query.from_user.id
-        
-        db: Session = SessionLocal()
-        try:
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                await query.edit_message_text(text="Produto não encontrado.")
-                return
-
-            new_order = Order(user_id=user_id, product_id=product_id)
+        # O botão fica na mensagem paginada do catálogo: os avisos vão em mensagens novas
+        # para não substituir a página e os botões de navegação.
+        dispatcher = get_dispatcher(context)
+
+        product = await catalog_cache.get(product_id)
+        if not product:
+            await dispatcher.send_message(user_id, "Produto não encontrado.")
+            return
+
+        # Clique repetido: reenvia a cobrança em aberto, sem nova chamada ao Mercado Pago.
+        charge = await open_charges.get(user_id, product_id)
+        if charge:
+            await dispatcher.send_message(
+                user_id, f"Você já tem um pagamento em aberto para {product.name}.", priority=PRIORITY_PAYMENT
+            )
+            await send_pix_charge(dispatcher, user_id, charge)
+            return
+
+        # Mercado Pago degradado (disjuntor aberto) ou saturado: recusa já, sem criar o
+        # pedido nem esperar o timeout do gateway.
+        if not mp_client.available():
+            await dispatcher.send_message(
+                user_id, "😕 O sistema de pagamentos está instável no momento. Tente novamente em alguns minutos."
+            )
+            return
+
+        # O pedido referencia o usuário (FK): registra-o (ele pode nunca ter passado pelo
+        # /start neste processo, ou o lote dele pode ter se perdido) e grava o buffer antes.
+        user_registry.register(user_id, query.from_user.full_name)
+        await user_registry.ensure(user_id)
+        async with AsyncSessionLocal() as db:
+            new_order = Order(
+                user_id=user_id,
+                product_id=product_id,
+                expires_at=utcnow() + timedelta(minutes=PIX_EXPIRATION_MINUTES),
+            )
             db.add(new_order)
-            db.commit()
-            db.refresh(new_order)
+            await db.commit()
+            ORDER_TRANSITIONS.inc(from_status="NEW", to_status="PENDING")
+            order_history.invalidate(user_id)
             
-            # --- AQUI ESTÁ A CORREÇÃO ---
-            # Removemos a formatação Markdown desta mensagem para evitar erros.
-            await query.edit_message_text(text=f"Gerando pagamento para {product.name}...")
+            # Sem formatação Markdown nesta mensagem, para evitar erros. Não espera o
+            # envio: a mesma prioridade garante que ela sai antes do QR Code.
+            await dispatcher.send_message(
+                user_id, f"Gerando pagamento para {product.name}...", priority=PRIORITY_PAYMENT, wait=False
+            )
 
-            payment_info = create_pix_payment(new_order, product)
+            payment_info = await create_pix_payment(new_order, product)
 
             if payment_info:
-                qr_code_base64 = payment_info['point_of_interaction']['transaction_data']['qr_code_base64']
-                pix_code = payment_info['point_of_interaction']['transaction_data']['qr_code']
-                gateway_payment_id = str(payment_info['id'])
-
-                new_order.gateway_payment_id = gateway_payment_id
-                db.commit()
-
-                qr_code_bytes = base64.b64decode(qr_code_base64)
-                
-                await context.bot.send_photo(
-                    chat_id=user_id,
-                    photo=qr_code_bytes,
-                    caption="✅ Pagamento PIX gerado! Escaneie o QR Code ou use o código abaixo."
-                )
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=f"`{pix_code}`",
-                    parse_mode='MarkdownV2'
-                )
+                transaction_data = payment_info['point_of_interaction']['transaction_data']
+                new_order.gateway_payment_id = str(payment_info['id'])
+                new_order.pix_qr_code = transaction_data['qr_code']
+                new_order.pix_qr_code_base64 = transaction_data['qr_code_base64']
+                await db.commit()
+
+                charge = PixCharge.from_order(new_order)
+                open_charges.remember(user_id, product_id, charge)
+                await send_pix_charge(dispatcher, user_id, charge)
             else:
-                await query.edit_message_text(text="😕 Desculpe, ocorreu um erro ao gerar o pagamento. Tente novamente mais tarde.")
-        finally:
-            db.close()
\ No newline at end of file
+                # Sem cobrança o pedido nunca será pago: encerra em vez de deixá-lo PENDING.
+                await mark_order_failed(db, new_order.id)
+                order_history.invalidate(user_id)
+                await dispatcher.send_message(
+                    user_id, "😕 Desculpe, ocorreu um erro ao gerar o pagamento. Tente novamente mais tarde.",
+                    priority=PRIORITY_PAYMENT
+                )
+
+async def send_pix_charge(dispatcher: TelegramDispatcher, user_id: int, charge: PixCharge) -> None:
+    """Envia o QR Code e o código copia-e-cola de uma cobrança PIX."""
+    # Cada envio é aguardado para o QR Code chegar antes do código PIX.
+    await dispatcher.send_photo(
+        user_id,
+        photo=base64.b64decode(charge.qr_code_base64),
+        caption="✅ Pagamento PIX gerado! Escaneie o QR Code ou use o código abaixo.",
+        priority=PRIORITY_PAYMENT
+    )
+    await dispatcher.send_message(
+        user_id,
+        text=f"`{charge.qr_code}`",
+        parse_mode='MarkdownV2',
+        priority=PRIORITY_PAYMENT
+    )
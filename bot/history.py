@@ -0,0 +1,101 @@
+# bot/history.py
+
+import uuid
+from dataclasses import dataclass
+from cachetools import TTLCache
+from sqlalchemy.engine import Row
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.catalog import escape_markdown_v2
+from core.config import ORDER_HISTORY_CACHE_TTL, ORDER_HISTORY_PAGE_SIZE
+from database.database import AsyncSessionLocal, as_utc
+from database.models import OrderStatus
+from database.orders import fetch_order_history
+
+# Prefixos dos callbacks do histórico: página a partir de um pedido (sem id = primeira
+# página) e reenvio do conteúdo de um pedido pago.
+ORDERS_PAGE_PREFIX = "orders_page_"
+ORDERS_RESEND_PREFIX = "resend_"
+
+STATUS_LABELS = {
+    OrderStatus.PENDING: "⏳ Aguardando pagamento",
+    OrderStatus.PAID: "✅ Pago",
+    OrderStatus.EXPIRED: "⌛ Expirado",
+    OrderStatus.FAILED: "❌ Não aprovado",
+}
+
+@dataclass(frozen=True)
+class OrderHistoryPage:
+    """Uma página do histórico de pedidos pronta para ser enviada ou editada (MarkdownV2)."""
+    text: str
+    reply_markup: InlineKeyboardMarkup | None
+
+    @classmethod
+    def render(cls, rows: list[Row], has_prev: bool, has_next: bool) -> "OrderHistoryPage":
+        if not rows:
+            return cls(text="📦 Você ainda não fez nenhum pedido\\.", reply_markup=None)
+
+        entries = []
+        keyboard = []
+        for row in rows:
+            created_at = as_utc(row.created_at).strftime("%d/%m/%Y %H:%M")
+            entries.append(
+                f"*{escape_markdown_v2(row.name)}* — R$ {escape_markdown_v2(str(row.price))}\n"
+                f"{STATUS_LABELS[row.status]} · {escape_markdown_v2(created_at)} \\(UTC\\)"
+            )
+            if row.status == OrderStatus.PAID:
+                keyboard.append([InlineKeyboardButton(
+                    f"📥 Receber de novo: {row.name}", callback_data=f"{ORDERS_RESEND_PREFIX}{row.id.hex}"
+                )])
+
+        navigation = []
+        if has_prev:
+            navigation.append(InlineKeyboardButton("⏮️ Mais recentes", callback_data=ORDERS_PAGE_PREFIX))
+        if has_next:
+            navigation.append(InlineKeyboardButton(
+                "Mais antigos ➡️", callback_data=f"{ORDERS_PAGE_PREFIX}{rows[-1].id.hex}"
+            ))
+        if navigation:
+            keyboard.append(navigation)
+        text = "📦 *Seus pedidos*\n\n" + "\n\n".join(entries)
+        return cls(text=text, reply_markup=InlineKeyboardMarkup(keyboard) if keyboard else None)
+
+class OrderHistoryCache:
+    """
+    Páginas do histórico de pedidos já renderizadas, por usuário.
+
+    As páginas de um usuário ficam juntas e vencem após `ttl` segundos. Uma mudança
+    de status de pedido feita neste processo (compra, pagamento, expiração) chama
+    `invalidate()`/`clear()`; as feitas em outro processo aparecem ao fim do TTL.
+    """
+
+    def __init__(self, ttl: float = ORDER_HISTORY_CACHE_TTL, page_size: int = ORDER_HISTORY_PAGE_SIZE,
+                 maxsize: int = 10_000):
+        self._page_size = page_size
+        # user_id -> {id do pedido que antecede a página (None = primeira): página}
+        self._pages: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        self._pages.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+    async def page(self, user_id: int, before_id: uuid.UUID | None = None) -> OrderHistoryPage:
+        """Página com os pedidos mais antigos que `before_id` (None = os mais recentes)."""
+        pages = self._pages.get(user_id)
+        if pages is None:
+            pages = self._pages[user_id] = {}
+        page = pages.get(before_id)
+        if page is None:
+            # Se o usuário for invalidado durante a consulta, `pages` já não está no
+            # cache e a página possivelmente desatualizada é descartada com ele.
+            async with AsyncSessionLocal() as db:
+                rows = await fetch_order_history(db, user_id, before_id, self._page_size + 1)
+            page = pages[before_id] = OrderHistoryPage.render(
+                rows[:self._page_size], has_prev=before_id is not None, has_next=len(rows) > self._page_size
+            )
+        return page
+
+# Instância única usada pelos handlers e pelas rotinas que mudam o status dos pedidos.
+order_history = OrderHistoryCache()
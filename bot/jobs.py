@@ -0,0 +1,116 @@
+# bot/jobs.py
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from telegram.ext import ContextTypes
+
+from bot.delivery import fulfill_order
+from bot.dispatcher import TelegramDispatcher
+from bot.history import order_history
+from core.config import (
+    PIX_EXPIRATION_MINUTES,
+    ORDER_EXPIRY_GRACE_MINUTES,
+    RECONCILE_LOOKBACK_HOURS,
+    ORDER_ARCHIVE_AFTER_DAYS,
+    ORDER_ARCHIVE_BATCH_SIZE,
+    ORDER_ARCHIVE_BATCH_PAUSE,
+)
+from database.archive import archive_orders_batch
+from database.database import AsyncSessionLocal, utcnow
+from database.orders import expire_stale_orders, get_pending_orders_since, mark_order_failed
+from payments.mercadopago import iter_payments, parse_mp_datetime
+
+logger = logging.getLogger(__name__)
+
+# Status de pagamento do Mercado Pago que encerram um pedido sem pagamento.
+FAILED_PAYMENT_STATUSES = {"rejected", "cancelled", "refunded", "charged_back"}
+
+# Margem na busca para diferenças de relógio entre o nosso banco e o Mercado Pago.
+CLOCK_SKEW_MARGIN = timedelta(minutes=5)
+
+async def reconcile_pending_orders(dispatcher: TelegramDispatcher) -> dict[str, int]:
+    """
+    Confere os pedidos PENDING recentes contra a busca de pagamentos do Mercado Pago,
+    em páginas, e aplica o que o webhook pode ter perdido: aprovados são pagos e
+    entregues, recusados/cancelados viram FAILED.
+    """
+    now = utcnow()
+    async with AsyncSessionLocal() as db:
+        pending, oldest = await get_pending_orders_since(db, now - timedelta(hours=RECONCILE_LOOKBACK_HOURS))
+
+    summary = {"pending": len(pending), "paid": 0, "failed": 0}
+    if not pending:
+        return summary
+
+    async for payment in iter_payments(begin_date=oldest - CLOCK_SKEW_MARGIN, end_date=now + CLOCK_SKEW_MARGIN):
+        order_id = payment.get("external_reference")
+        if order_id not in pending:
+            continue
+
+        payment_status = payment.get("status")
+        if payment_status == "approved":
+            approved_at = parse_mp_datetime(payment.get("date_approved"))
+            if await fulfill_order(uuid.UUID(order_id), dispatcher, approved_at):
+                summary["paid"] += 1
+        elif payment_status in FAILED_PAYMENT_STATUSES:
+            async with AsyncSessionLocal() as db:
+                if await mark_order_failed(db, uuid.UUID(order_id)):
+                    summary["failed"] += 1
+    if summary["failed"]:
+        # Não sabemos de quais usuários eram os pedidos: descarta o histórico em cache.
+        order_history.clear()
+    return summary
+
+async def expire_orders() -> int:
+    """Expira, em um único UPDATE, os pedidos PENDING cuja cobrança PIX já venceu."""
+    cutoff = utcnow() - timedelta(minutes=PIX_EXPIRATION_MINUTES + ORDER_EXPIRY_GRACE_MINUTES)
+    async with AsyncSessionLocal() as db:
+        expired = await expire_stale_orders(db, cutoff)
+    if expired:
+        # A expiração é um UPDATE em massa, sem os usuários afetados: descarta o histórico em cache.
+        order_history.clear()
+    return expired
+
+async def sweep_orders(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Job periódico (JobQueue): primeiro reconcilia com o gateway, para não expirar um
+    pedido pago cujo webhook se perdeu, e depois expira os PENDING vencidos.
+    """
+    try:
+        summary = await reconcile_pending_orders(context.bot_data["dispatcher"])
+        if summary["paid"] or summary["failed"]:
+            logger.info("Reconciliação: %s pendentes, %s pagos, %s com falha.",
+                        summary["pending"], summary["paid"], summary["failed"])
+    except Exception:
+        logger.exception("Falha na reconciliação de pedidos com o Mercado Pago.")
+
+    expired = await expire_orders()
+    if expired:
+        logger.info("%s pedidos PENDING expirados.", expired)
+
+async def archive_orders(batch_size: int = ORDER_ARCHIVE_BATCH_SIZE, pause: float = ORDER_ARCHIVE_BATCH_PAUSE) -> int:
+    """
+    Move para orders_archive os pedidos em estado final com mais de
+    ORDER_ARCHIVE_AFTER_DAYS dias, em lotes de uma transação curta cada. Entre os
+    lotes espera `pause` segundos, para não disputar o banco com compras e webhooks.
+    """
+    cutoff = utcnow() - timedelta(days=ORDER_ARCHIVE_AFTER_DAYS)
+    archived = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            moved = await archive_orders_batch(db, cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+        await asyncio.sleep(pause)
+
+async def archive_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Job periódico (JobQueue) de arquivamento dos pedidos antigos."""
+    try:
+        archived = await archive_orders()
+        if archived:
+            logger.info("%s pedidos movidos para orders_archive.", archived)
+    except Exception:
+        logger.exception("Falha no arquivamento de pedidos.")
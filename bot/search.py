@@ -0,0 +1,240 @@
+# bot/search.py
+
+import asyncio
+import heapq
+import logging
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from core.config import CATALOG_CACHE_TTL
+from database.catalog import count_products, fetch_products_for_search, get_catalog_version, get_database_time
+from database.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# Diacríticos que sobram da decomposição NFKD ("á" -> "a" + "\u0301").
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+
+# Produtos reindexados entre uma cedência do event loop e outra.
+REINDEX_CHUNK_SIZE = 1000
+# Sobreposição da sincronização incremental: uma transação pode gravar um updated_at
+# anterior ao último já visto; reindexar algumas linhas repetidas não tem efeito.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+def tokenize(text: str) -> list[str]:
+    """Palavras em minúsculas e sem acentos ("Fotografia Básica" -> ["fotografia", "basica"])."""
+    text = text.casefold()
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return _WORD.findall(text)
+
+@dataclass(frozen=True, slots=True)
+class IndexedProduct:
+    id: int
+    name: str
+    description: str
+    price: Decimal
+    name_tokens: frozenset[str]
+    all_tokens: frozenset[str]
+
+class _Postings:
+    """Token -> ids dos produtos, com a lista ordenada de tokens para a busca por prefixo."""
+
+    def __init__(self):
+        self._ids: dict[str, set[int]] = {}
+        self._tokens: list[str] = []
+
+    def add(self, tokens: frozenset[str], product_id: int) -> None:
+        for token in tokens:
+            ids = self._ids.get(token)
+            if ids is None:
+                ids = self._ids[token] = set()
+                insort(self._tokens, token)
+            ids.add(product_id)
+
+    def discard(self, tokens: frozenset[str], product_id: int) -> None:
+        for token in tokens:
+            ids = self._ids.get(token)
+            if ids is None:
+                continue
+            ids.discard(product_id)
+            if not ids:
+                del self._ids[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def prefix(self, prefix: str) -> set[int]:
+        """Ids dos produtos com algum token que começa com `prefix`."""
+        tokens = self._tokens
+        index = bisect_left(tokens, prefix)
+        if index < len(tokens) and tokens[index] == prefix and (
+                index + 1 == len(tokens) or not tokens[index + 1].startswith(prefix)):
+            return self._ids[prefix]
+        result: set[int] = set()
+        while index < len(tokens) and tokens[index].startswith(prefix):
+            result |= self._ids[tokens[index]]
+            index += 1
+        return result
+
+def _match(postings: _Postings, terms: list[str]) -> set[int]:
+    """Produtos em que cada termo é prefixo de algum token (E entre os termos)."""
+    sets = sorted((postings.prefix(term) for term in terms), key=len)
+    result = set(sets[0])
+    for ids in sets[1:]:
+        result &= ids
+        if not result:
+            break
+    return result
+
+class _IndexContents:
+    """Produtos indexados e as listas de tokens; substituído por inteiro numa reconstrução."""
+
+    def __init__(self):
+        self.products: dict[int, IndexedProduct] = {}
+        self.sort_keys: dict[int, tuple[str, int]] = {}
+        self.names = _Postings()
+        self.all = _Postings()
+
+    def upsert(self, product_id: int, name: str, description: str, price: Decimal) -> None:
+        self.remove(product_id)
+        name_tokens = frozenset(tokenize(name))
+        product = IndexedProduct(
+            id=product_id,
+            name=name,
+            description=description,
+            price=price,
+            name_tokens=name_tokens,
+            all_tokens=name_tokens | frozenset(tokenize(description)),
+        )
+        self.products[product_id] = product
+        self.sort_keys[product_id] = (name.casefold(), product_id)
+        self.names.add(name_tokens, product_id)
+        self.all.add(product.all_tokens, product_id)
+
+    def remove(self, product_id: int) -> None:
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        del self.sort_keys[product_id]
+        self.names.discard(product.name_tokens, product_id)
+        self.all.discard(product.all_tokens, product_id)
+
+class ProductSearchIndex:
+    """
+    Índice em memória de nome e descrição dos produtos para a busca inline.
+
+    Cada palavra da busca casa como prefixo de uma palavra do produto; produtos que
+    casam pelo nome vêm antes dos que só casam pela descrição, em ordem alfabética.
+    O índice é montado na inicialização e, a cada `interval` segundos, uma tarefa de
+    fundo confere a versão do catálogo e reindexa só os produtos alterados: a busca
+    nunca consulta o banco. Uma reconstrução completa é montada à parte e trocada de
+    uma vez, para a busca não ver um índice pela metade.
+    """
+
+    def __init__(self, interval: float = CATALOG_CACHE_TTL):
+        self._interval = interval
+        self._contents = _IndexContents()
+        self._version: int | None = None
+        self._synced_until: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._contents.products)
+
+    # --- Atualização ---
+
+    def upsert(self, product_id: int, name: str, description: str, price: Decimal) -> None:
+        self._contents.upsert(product_id, name, description, price)
+
+    def remove(self, product_id: int) -> None:
+        self._contents.remove(product_id)
+
+    # --- Busca ---
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> tuple[list[IndexedProduct], int | None]:
+        """
+        Resultados `offset`..`offset + limit` da busca e o offset da próxima página
+        (None se não houver mais).
+        """
+        contents = self._contents
+        sort_key = contents.sort_keys.__getitem__
+        terms = tokenize(query)
+        wanted = offset + limit + 1  # um a mais para saber se há próxima página
+        if not terms:
+            ranked = heapq.nsmallest(wanted, contents.products, key=sort_key)
+        else:
+            by_name = _match(contents.names, terms)
+            ranked = heapq.nsmallest(wanted, by_name, key=sort_key)
+            if len(ranked) < wanted:
+                by_description = _match(contents.all, terms) - by_name
+                ranked += heapq.nsmallest(wanted - len(ranked), by_description, key=sort_key)
+
+        page = [contents.products[product_id] for product_id in ranked[offset:offset + limit]]
+        next_offset = offset + limit if len(ranked) > offset + limit else None
+        return page, next_offset
+
+    # --- Sincronização com o banco ---
+
+    async def start(self) -> None:
+        """Monta o índice completo e inicia a sincronização periódica."""
+        await self.refresh()
+        self._task = asyncio.create_task(self._run(), name="product-search-index")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> None:
+        """Reindexa os produtos alterados desde a última sincronização, se o catálogo mudou."""
+        async with AsyncSessionLocal() as db:
+            version = await get_catalog_version(db)
+            if version == self._version:
+                return
+            synced_until = await get_database_time(db)
+            since = self._synced_until - SYNC_OVERLAP if self._synced_until is not None else None
+            rows = await fetch_products_for_search(db, since)
+            total = await count_products(db)
+
+        if since is None:
+            self._contents = await self._build(rows)
+        else:
+            await self._apply(self._contents, rows)
+        if len(self) != total:
+            # Produtos removidos não aparecem na busca incremental: remonta o índice.
+            async with AsyncSessionLocal() as db:
+                rows = await fetch_products_for_search(db)
+            self._contents = await self._build(rows)
+
+        self._version = version
+        self._synced_until = synced_until
+        logger.info("Índice de busca sincronizado: %s produtos reindexados, %s no total.", len(rows), len(self))
+
+    async def _build(self, rows) -> _IndexContents:
+        """Índice novo com `rows`, montado sem tocar no que a busca está usando."""
+        contents = _IndexContents()
+        await self._apply(contents, rows)
+        return contents
+
+    async def _apply(self, contents: _IndexContents, rows) -> None:
+        for index, row in enumerate(rows, start=1):
+            contents.upsert(row.id, row.name, row.description, row.price)
+            if index % REINDEX_CHUNK_SIZE == 0:
+                # Catálogos grandes: deixa o loop atender outras atualizações no meio.
+                await asyncio.sleep(0)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Falha ao sincronizar o índice de busca de produtos.")
+
+# Instância única usada pelos handlers.
+product_index = ProductSearchIndex()
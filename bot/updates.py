@@ -0,0 +1,99 @@
+# bot/updates.py
+
+import asyncio
+from typing import Any, Awaitable
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Limite passado ao BaseUpdateProcessor, na prática infinito (ver PerUserUpdateProcessor).
+_UNBOUNDED = 2 ** 31
+
+class _UserLock:
+    """Lock de um usuário e quantas atualizações dele estão usando ou aguardando o lock."""
+
+    __slots__ = ("lock", "holders")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.holders = 0
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processa até `max_concurrent_updates` atualizações em paralelo, mas as de um mesmo
+    usuário em ordem de chegada: dois toques seguidos em "Comprar" rodam um depois do
+    outro, enquanto usuários diferentes seguem em paralelo.
+
+    A vaga só é ocupada depois de obter o lock do usuário: atualizações esperando a vez
+    do próprio usuário não tiram vagas dos outros. Por isso o semáforo do PTB (tomado
+    antes de `do_process_update`) fica sem limite (`max_concurrent_updates` não é o
+    limite real), e as vagas são as de `_slots`.
+    `saturation` e `saturated_total` mostram se o limite está pequeno para a carga.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(_UNBOUNDED)
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._running = 0
+        self._users: dict[int, _UserLock] = {}
+        self.peak_concurrent_updates = 0
+        self.processed_total = 0
+        self.saturated_total = 0
+        self.serialized_total = 0
+
+    # --- Métricas ---
+
+    @property
+    def saturation(self) -> float:
+        """Fração das vagas em uso agora (1.0 = novas atualizações estão esperando)."""
+        return self._running / self._limit
+
+    # --- BaseUpdateProcessor ---
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._users.clear()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            user_id = _user_id(update)
+            if user_id is None:
+                await self._run(coroutine)
+                return
+
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserLock()
+            user.holders += 1
+            try:
+                if user.lock.locked():
+                    self.serialized_total += 1
+                async with user.lock:
+                    await self._run(coroutine)
+            finally:
+                user.holders -= 1
+                if user.holders == 0:
+                    del self._users[user_id]
+        finally:
+            self.processed_total += 1
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self._running += 1
+            self.peak_concurrent_updates = max(self.peak_concurrent_updates, self._running)
+            if self._running >= self._limit:
+                # Esta atualização ocupou a última vaga: as próximas vão esperar.
+                self.saturated_total += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+
+def _user_id(update: object) -> int | None:
+    if isinstance(update, Update) and update.effective_user:
+        return update.effective_user.id
+    return None
@@ -0,0 +1,104 @@
+# bot/users.py
+
+import asyncio
+import logging
+from cachetools import LRUCache
+
+from core.config import USER_CACHE_SIZE, USER_FLUSH_INTERVAL, USER_FLUSH_BATCH_SIZE
+from database.database import AsyncSessionLocal
+from database.users import upsert_users
+
+logger = logging.getLogger(__name__)
+
+class UserRegistry:
+    """
+    Registro de usuários com escrita adiada (write-behind) na frente da tabela users.
+
+    Os ids já gravados ficam em um LRU (id -> full_name): um /start de usuário conhecido
+    não toca o banco. Usuários novos, ou que mudaram de nome, entram em um buffer que é
+    gravado em lote a cada `flush_interval` segundos, ou antes se chegar a `batch_size`.
+    """
+
+    def __init__(
+        self,
+        max_known: int = USER_CACHE_SIZE,
+        flush_interval: float = USER_FLUSH_INTERVAL,
+        batch_size: int = USER_FLUSH_BATCH_SIZE,
+    ):
+        self._known: LRUCache = LRUCache(maxsize=max_known)
+        self._pending: dict[int, str] = {}
+        self._flushing: dict[int, str] = {}
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.flushed_total = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="user-registry")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    # --- Registro ---
+
+    def register(self, user_id: int, full_name: str) -> bool:
+        """
+        Marca o usuário para gravação se ele é novo ou mudou de nome.
+        Retorna True se algo foi colocado no buffer.
+        """
+        if self._known.get(user_id) == full_name:
+            return False
+        self._pending[user_id] = full_name
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+        return True
+
+    async def ensure(self, user_id: int) -> None:
+        """Garante que o usuário já está gravado (ex.: antes de criar um pedido, por causa da FK)."""
+        if user_id in self._pending or user_id in self._flushing:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Grava o buffer atual em um único upsert."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                async with AsyncSessionLocal() as db:
+                    await upsert_users(db, self._flushing)
+            except Exception:
+                # Devolve o lote ao buffer sem sobrescrever nomes mais recentes.
+                self._pending = {**self._flushing, **self._pending}
+                raise
+            else:
+                self._known.update(self._flushing)
+                self.flushed_total += len(self._flushing)
+            finally:
+                self._flushing = {}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Falha ao gravar o lote de usuários; nova tentativa no próximo ciclo.")
+
+user_registry = UserRegistry()
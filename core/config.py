@@ -9,10 +9,141 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 MERCADO_PAGO_ACCESS_TOKEN = os.getenv("MERCADO_PAGO_ACCESS_TOKEN")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 
+# Banco de dados. SQLite: modo de journal, nível de sincronia e quanto tempo (ms) uma
+# conexão espera pelo lock de escrita antes de falhar. Postgres: tamanho do pool,
+# conexões extras em picos, espera por uma conexão livre (segundos), reciclagem das
+# conexões (segundos), teste da conexão antes do uso e cache de prepared statements
+# do asyncpg por conexão.
+DB_SQLITE_JOURNAL_MODE = os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL")
+DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Cliente HTTP do Mercado Pago: URL base, tamanho do pool de conexões,
+# timeout por chamada (segundos) e número máximo de novas tentativas.
+MERCADO_PAGO_API_URL = os.getenv("MERCADO_PAGO_API_URL", "https://api.mercadopago.com")
+MP_HTTP_POOL_SIZE = int(os.getenv("MP_HTTP_POOL_SIZE", "20"))
+MP_HTTP_TIMEOUT = float(os.getenv("MP_HTTP_TIMEOUT", "10"))
+MP_HTTP_MAX_RETRIES = int(os.getenv("MP_HTTP_MAX_RETRIES", "3"))
+# Disjuntor das chamadas ao Mercado Pago (payments/breaker.py): abre quando, na janela
+# de MP_BREAKER_WINDOW_SECONDS com pelo menos MP_BREAKER_MIN_CALLS chamadas, a fração de
+# falhas ou de chamadas acima de MP_BREAKER_SLOW_CALL_SECONDS passa do limite; fica
+# aberto MP_BREAKER_OPEN_SECONDS e fecha depois de MP_BREAKER_HALF_OPEN_CALLS chamadas
+# de teste bem-sucedidas. MP_MAX_IN_FLIGHT limita as chamadas simultâneas (incluindo as
+# que esperam uma conexão do pool); acima disso as novas são recusadas.
+MP_BREAKER_FAILURE_RATE = float(os.getenv("MP_BREAKER_FAILURE_RATE", "0.5"))
+MP_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("MP_BREAKER_SLOW_CALL_SECONDS", "5"))
+MP_BREAKER_SLOW_CALL_RATE = float(os.getenv("MP_BREAKER_SLOW_CALL_RATE", "0.5"))
+MP_BREAKER_WINDOW_SECONDS = float(os.getenv("MP_BREAKER_WINDOW_SECONDS", "30"))
+MP_BREAKER_MIN_CALLS = int(os.getenv("MP_BREAKER_MIN_CALLS", "10"))
+MP_BREAKER_OPEN_SECONDS = float(os.getenv("MP_BREAKER_OPEN_SECONDS", "30"))
+MP_BREAKER_HALF_OPEN_CALLS = int(os.getenv("MP_BREAKER_HALF_OPEN_CALLS", "3"))
+MP_MAX_IN_FLIGHT = int(os.getenv("MP_MAX_IN_FLIGHT", "100"))
+# URL pública (HTTPS) do nosso /webhook/mercadopago, enviada em cada cobrança PIX.
+MERCADO_PAGO_NOTIFICATION_URL = os.getenv(
+    "MERCADO_PAGO_NOTIFICATION_URL", "https://12f0f86180ba.ngrok-free.app/webhook/mercadopago"
+)
+
+# Intervalo (segundos) após o qual o cache de catálogo confere se os produtos mudaram.
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Pasta dos arquivos de produtos entregues como documento (Product.content com um
+# caminho relativo a ela). Caminhos que apontam para fora dela nunca são enviados.
+PRODUCT_FILES_DIR = os.getenv("PRODUCT_FILES_DIR", "product_files")
+# Busca inline (@bot termo): resultados por resposta (máximo do Telegram: 50) e por
+# quanto tempo (segundos) o Telegram pode guardar uma resposta.
+INLINE_RESULTS_LIMIT = int(os.getenv("INLINE_RESULTS_LIMIT", "20"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "30"))
+# Quantidade de produtos exibidos por página do catálogo.
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "5"))
+
+# Workers da caixa de entrada do webhook: quantidade, linhas por lote, intervalo de
+# consulta (segundos), limite de tentativas e tempo de posse de uma linha (segundos).
+INBOX_WORKERS = int(os.getenv("INBOX_WORKERS", "4"))
+INBOX_BATCH_SIZE = int(os.getenv("INBOX_BATCH_SIZE", "10"))
+INBOX_POLL_INTERVAL = float(os.getenv("INBOX_POLL_INTERVAL", "1"))
+INBOX_MAX_ATTEMPTS = int(os.getenv("INBOX_MAX_ATTEMPTS", "8"))
+INBOX_LEASE_SECONDS = float(os.getenv("INBOX_LEASE_SECONDS", "60"))
+
+# URL base da Bot API do Telegram (pode apontar para um servidor local da Bot API).
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Dispatcher de envio do Telegram: limite global (msg/s), limite e rajada por chat,
+# envios simultâneos, tentativas por mensagem e intervalo (segundos) entre as
+# releituras das entregas que falharam.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "8"))
+TELEGRAM_SEND_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_SEND_MAX_ATTEMPTS", "3"))
+OUTBOX_RETRY_INTERVAL = float(os.getenv("OUTBOX_RETRY_INTERVAL", "30"))
+
+# Validade da cobrança PIX (minutos). Pedidos PENDING ficam mais ORDER_EXPIRY_GRACE_MINUTES
+# aguardando um webhook atrasado antes de serem marcados como EXPIRED.
+PIX_EXPIRATION_MINUTES = int(os.getenv("PIX_EXPIRATION_MINUTES", "30"))
+ORDER_EXPIRY_GRACE_MINUTES = int(os.getenv("ORDER_EXPIRY_GRACE_MINUTES", "5"))
+# Intervalo (segundos) da rotina de expiração/reconciliação e quanto tempo para trás
+# (horas) ela procura pagamentos no Mercado Pago.
+ORDER_SWEEP_INTERVAL = float(os.getenv("ORDER_SWEEP_INTERVAL", "300"))
+RECONCILE_LOOKBACK_HOURS = int(os.getenv("RECONCILE_LOOKBACK_HOURS", "24"))
+# Histórico de pedidos (/pedidos): pedidos por página e por quanto tempo (segundos) uma
+# página fica em cache. Mudanças de status feitas em outro processo aparecem depois disso.
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_PAGE_SIZE", "5"))
+ORDER_HISTORY_CACHE_TTL = float(os.getenv("ORDER_HISTORY_CACHE_TTL", "30"))
+# Arquivamento (orders -> orders_archive) dos pedidos em estado final: idade mínima
+# (dias; 0 desativa), pedidos movidos por transação, pausa (segundos) entre os lotes e intervalo
+# (segundos) entre as execuções do job.
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "90"))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "250"))
+ORDER_ARCHIVE_BATCH_PAUSE = float(os.getenv("ORDER_ARCHIVE_BATCH_PAUSE", "0.1"))
+ORDER_ARCHIVE_INTERVAL = float(os.getenv("ORDER_ARCHIVE_INTERVAL", "3600"))
+
+# Registro de usuários do /start: quantos ids conhecidos ficam em memória, intervalo
+# (segundos) entre as gravações em lote e tamanho do lote que força uma gravação.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "100000"))
+USER_FLUSH_INTERVAL = float(os.getenv("USER_FLUSH_INTERVAL", "1"))
+USER_FLUSH_BATCH_SIZE = int(os.getenv("USER_FLUSH_BATCH_SIZE", "500"))
+
+# Modo de recebimento das atualizações do Telegram: "webhook" (o FastAPI recebe em
+# /webhook/telegram) ou "polling" (fallback para desenvolvimento). Sem URL pública
+# configurada, o padrão é polling. O modo webhook exige TELEGRAM_WEBHOOK_SECRET: sem ele
+# qualquer um que alcance o endpoint poderia enviar atualizações forjadas.
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+BOT_RUN_MODE = os.getenv("BOT_RUN_MODE", "webhook" if TELEGRAM_WEBHOOK_URL else "polling")
+# Atualizações do Telegram processadas em paralelo (as de um mesmo usuário seguem em ordem).
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "32"))
+# Endereço em que o uvicorn escuta.
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+
+# Janela (segundos) aceita entre o timestamp assinado de uma notificação do Mercado Pago
+# e o relógio local, e quantas notificações já vistas ficam guardadas para barrar repetições.
+WEBHOOK_MAX_AGE_SECONDS = int(os.getenv("WEBHOOK_MAX_AGE_SECONDS", "300"))
+WEBHOOK_REPLAY_CACHE_SIZE = int(os.getenv("WEBHOOK_REPLAY_CACHE_SIZE", "100000"))
+
+# Logs: nível mínimo, formato ("json" para produção ou "text" para desenvolvimento) e
+# fração (0 a 1) dos eventos de sucesso de alto volume que é registrada.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1"))
+
+# Papel do processo: "all" (bot e servidor web no mesmo processo), "bot" (só o bot,
+# com a rotina de pedidos) ou "web" (só o servidor web, sem estado, podendo rodar com
+# vários workers ou réplicas). No papel "web", WEB_WORKERS é o número de workers do
+# uvicorn; como cada worker tem o próprio dispatcher, divida TELEGRAM_GLOBAL_RATE
+# entre eles.
+APP_ROLE = os.getenv("APP_ROLE", "all")
+# Porta do /metrics do processo do bot quando APP_ROLE=bot (os outros papéis expõem
+# /metrics no próprio FastAPI). 0 desativa.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+
 if not TELEGRAM_TOKEN or not DATABASE_URL or not MERCADO_PAGO_ACCESS_TOKEN:
     raise ValueError(
         "As variáveis TELEGRAM_TOKEN, DATABASE_URL e MERCADO_PAGO_ACCESS_TOKEN são obrigatórias no arquivo .env"
     )
-
-# LINHA DE DEPURAÇÃO TEMPORÁRIA
-print(f"--> WEBHOOK_SECRET CARREGADA: {WEBHOOK_SECRET}")
\ No newline at end of file
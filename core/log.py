@@ -0,0 +1,128 @@
+# core/log.py
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from core.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_SUCCESS_SAMPLE_RATE,
+    TELEGRAM_TOKEN,
+    MERCADO_PAGO_ACCESS_TOKEN,
+    WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_SECRET,
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Campos de contexto passados via `extra=` que vão para o registro JSON.
+CONTEXT_FIELDS = ("order_id", "payment_id", "user_id", "request_id")
+
+# Valores que nunca podem aparecer nos logs (o token do bot, por exemplo, faz parte
+# das URLs da Bot API que o httpx registra).
+_SECRETS = tuple(secret for secret in (
+    TELEGRAM_TOKEN, MERCADO_PAGO_ACCESS_TOKEN, WEBHOOK_SECRET, TELEGRAM_WEBHOOK_SECRET,
+) if secret)
+
+_listener: QueueListener | None = None
+
+def redact(text: str) -> str:
+    """Troca por *** qualquer segredo da configuração presente no texto."""
+    for secret in _SECRETS:
+        if secret in text:
+            text = text.replace(secret, "***")
+    return text
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos de contexto do registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = str(value)
+        if record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, também sem segredos."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+class SuccessSampler(logging.Filter):
+    """
+    Mantém só uma fração `rate` dos registros marcados com extra={"sampled": True}
+    (eventos de sucesso de alto volume). Avisos e erros nunca são marcados.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1 or not getattr(record, "sampled", False) or random.random() < self.rate
+
+class _LoopQueueHandler(QueueHandler):
+    """
+    No thread de quem registra, só monta a mensagem e o traceback (que dependem de
+    objetos vivos); formatação em JSON e escrita ficam com o QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging() -> None:
+    """
+    Envia os logs do processo por uma fila a um thread próprio, que formata e
+    escreve no stdout: o event loop nunca espera pela escrita. Pode ser chamada
+    mais de uma vez (main.py e cada worker do uvicorn); só a primeira configura.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _LoopQueueHandler(records)
+    handler.addFilter(SuccessSampler(LOG_SUCCESS_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # Silencia logs excessivos do httpx
+
+    _listener = QueueListener(records, output)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging() -> None:
+    """Escreve o que ainda está na fila e encerra o thread de logs."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
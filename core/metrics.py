@@ -0,0 +1,251 @@
+# core/metrics.py
+
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable
+
+# Limites (segundos) dos histogramas de latência, no padrão do Prometheus.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    @property
+    def exposed_name(self) -> str:
+        return self.name
+
+    def render(self) -> str:
+        name = self.exposed_name
+        header = f"# HELP {name} {_escape(self.documentation)}\n# TYPE {name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self._samples())
+
+class Counter(_Metric):
+    """Contador monotônico, opcionalmente com labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    @property
+    def exposed_name(self) -> str:
+        return f"{self.name}_total"
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.exposed_name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+class Gauge(_Metric):
+    """Valor instantâneo; pode ser lido de uma função na hora da coleta."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def _samples(self) -> list[str]:
+        value = self._function() if self._function is not None else self._value
+        return [f"{self.name} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """
+    Histograma de latência com buckets fixos. `observe` custa uma busca binária e
+    três somas, então pode ficar ligado em produção.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de labels: [contagem por bucket (+Inf no fim), soma, total].
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager que observa a duração do bloco."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+
+class Registry:
+    """Conjunto de métricas do processo, exposto em /metrics no formato texto do Prometheus."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+REGISTRY = Registry()
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Responde a uma requisição HTTP: GET /metrics devolve o REGISTRY, o resto 404."""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+        # Os cabeçalhos não importam; só são consumidos até a linha em branco.
+        while (await asyncio.wait_for(reader.readline(), timeout=10)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+            status, content_type, body = "200 OK", CONTENT_TYPE, REGISTRY.render().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not Found"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Servidor HTTP mínimo com /metrics no event loop atual, para processos sem o FastAPI
+    (o bot com APP_ROLE=bot). Feche com `server.close()` ao encerrar.
+    """
+    return await asyncio.start_server(_serve_metrics, host, port)
+
+def timed(histogram: Histogram, **labels):
+    """Decorator para funções assíncronas: observa a duração de cada chamada."""
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --- Métricas da aplicação ---
+
+BOT_HANDLER_SECONDS = REGISTRY.register(Histogram(
+    "bot_handler_duration_seconds", "Duração dos handlers do bot.", ("handler",)))
+MERCADOPAGO_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "mercadopago_request_duration_seconds",
+    "Duração das chamadas ao Mercado Pago, incluindo novas tentativas.", ("operation", "outcome")))
+MERCADOPAGO_CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "mercadopago_circuit_state", "Estado do disjuntor do Mercado Pago (0 fechado, 1 meio-aberto, 2 aberto)."))
+MERCADOPAGO_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mercadopago_in_flight_requests", "Chamadas ao Mercado Pago em andamento."))
+MERCADOPAGO_REJECTED_CALLS = REGISTRY.register(Counter(
+    "mercadopago_rejected_calls",
+    "Chamadas ao Mercado Pago recusadas pelo disjuntor (open) ou pelo limite de simultâneas (saturated).",
+    ("operation", "reason")))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Duração de cada comando SQL executado."))
+DB_CONNECTION_HOLD_SECONDS = REGISTRY.register(Histogram(
+    "db_connection_hold_seconds",
+    "Tempo em que uma sessão segura uma conexão do pool (checkout até checkin)."))
+TELEGRAM_SEND_SECONDS = REGISTRY.register(Histogram(
+    "telegram_send_duration_seconds", "Duração das chamadas de envio ao Bot API.", ("method", "outcome")))
+ORDER_TRANSITIONS = REGISTRY.register(Counter(
+    "order_transitions", "Mudanças de status de pedidos.", ("from_status", "to_status")))
+ORDERS_ARCHIVED = REGISTRY.register(Counter(
+    "orders_archived", "Pedidos movidos da tabela orders para orders_archive."))
+PRODUCT_DELIVERIES = REGISTRY.register(Counter(
+    "product_deliveries",
+    "Entregas de produto por forma de envio (text, file_upload ou file_cached).", ("kind",)))
+PAYMENT_DELIVERY_LAG_SECONDS = REGISTRY.register(Histogram(
+    "payment_delivery_lag_seconds",
+    "Tempo entre a aprovação do pagamento no Mercado Pago e a entrega do produto.",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)))
+TELEGRAM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "telegram_dispatcher_queue_depth", "Mensagens aguardando envio no dispatcher."))
+BOT_UPDATE_SATURATION = REGISTRY.register(Gauge(
+    "bot_update_saturation", "Fração das vagas de processamento de atualizações em uso."))
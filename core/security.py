@@ -2,17 +2,55 @@
 
 import hmac
 import hashlib
+import logging
+import time
 from fastapi import Request, HTTPException, status
-from urllib.parse import urlparse, parse_qs
+from cachetools import TTLCache
 
-from core.config import WEBHOOK_SECRET
+from core.config import WEBHOOK_SECRET, WEBHOOK_MAX_AGE_SECONDS, WEBHOOK_REPLAY_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Chave HMAC pré-computada: cada validação só copia o estado e processa o manifesto.
+_HMAC_KEY = hmac.new(WEBHOOK_SECRET.encode(), digestmod=hashlib.sha256) if WEBHOOK_SECRET else None
+
+# Notificações (request id, pagamento) já gravadas na caixa de entrada por este
+# processo (ver `remember_notification`). Uma notificação mais velha que a janela já
+# é barrada pelo timestamp, então o TTL é a própria janela. Com vários workers cada um
+# tem o seu; o ON CONFLICT da caixa de entrada continua sendo a garantia final contra
+# duplicatas.
+_seen_notifications: TTLCache = TTLCache(maxsize=WEBHOOK_REPLAY_CACHE_SIZE, ttl=WEBHOOK_MAX_AGE_SECONDS)
+
+def _parse_signature(x_signature: str) -> tuple[str | None, str | None]:
+    """Extrai `ts` e `v1` do cabeçalho x-signature ("ts=...,v1=...")."""
+    ts = signature_hash = None
+    for part in x_signature.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "ts":
+            ts = value
+        elif key == "v1":
+            signature_hash = value
+    return ts, signature_hash
+
+def _payment_id(request: Request) -> str | None:
+    return request.query_params.get("data.id") or request.query_params.get("id")
+
+def _timestamp_seconds(ts: str) -> float:
+    """
+    Timestamp da assinatura em segundos. O Mercado Pago envia em milissegundos, mas os
+    exemplos da documentação usam segundos: valores abaixo de 1e11 (ano 5138 em
+    segundos, 1973 em milissegundos) são tratados como segundos.
+    """
+    value = int(ts)
+    return value if value < 1e11 else value / 1000
 
 async def validate_mercadopago_signature(request: Request) -> bytes:
     """
-    Valida a assinatura do webhook do Mercado Pago usando a fórmula correta,
-    decifrada a partir dos logs de depuração.
+    Valida a assinatura do webhook do Mercado Pago e devolve o corpo da requisição.
+    Rejeita assinaturas fora da janela de WEBHOOK_MAX_AGE_SECONDS (403) e
+    notificações já gravadas antes (409), sem tocar no banco nem no gateway.
     """
-    if not WEBHOOK_SECRET:
+    if _HMAC_KEY is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="WEBHOOK_SECRET não está configurado."
@@ -27,55 +65,45 @@ async def validate_mercadopago_signature(request: Request) -> bytes:
             detail="Cabeçalhos de assinatura ausentes."
         )
 
-    try:
-        parts = {p.split("=")[0]: p.split("=")[1] for p in x_signature.split(",")}
-        ts = parts.get("ts")
-        signature_hash = parts.get("v1")
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato de assinatura inválido."
-        )
-
+    ts, signature_hash = _parse_signature(x_signature)
     if not ts or not signature_hash:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Timestamp ou hash da assinatura ausentes."
         )
-    
-    # --- CORREÇÃO FINAL DA LÓGICA DO MANIFEST ---
-    # A fórmula correta, confirmada por padrões de API, é uma combinação
-    # do ID da requisição, o timestamp e o ID do pagamento extraído da URL.
-    parsed_url = urlparse(str(request.url))
-    query_params = parse_qs(parsed_url.query)
-    
-    payment_id = query_params.get("data.id", [None])[0] or query_params.get("id", [None])[0]
 
+    # O manifesto combina o ID do pagamento (da URL), o ID da requisição e o timestamp.
+    payment_id = _payment_id(request)
     if not payment_id:
-         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ID do pagamento não encontrado na notificação.")
-
-    manifest = f"id:{payment_id};request-id:{x_request_id};ts:{ts};"
-
-    expected_signature = hmac.new(
-        WEBHOOK_SECRET.encode(),
-        msg=manifest.encode(),
-        digestmod=hashlib.sha256
-    ).hexdigest()
-
-    if not hmac.compare_digest(expected_signature, signature_hash):
-        print(f"\n--- FALHA NA VALIDAÇÃO ---")
-        print(f"Manifesto Gerado: {manifest}")
-        print(f"Assinatura Recebida: {signature_hash}")
-        print(f"Assinatura Calculada: {expected_signature}")
-        print(f"--- FIM DA FALHA ---\n")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ID do pagamento não encontrado na notificação.")
+
+    # Repetição (reenvio do Mercado Pago ou replay): descartada antes de qualquer trabalho.
+    if (x_request_id, payment_id) in _seen_notifications:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Notificação repetida.")
+
+    try:
+        age = abs(time.time() - _timestamp_seconds(ts))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Timestamp da assinatura inválido.")
+    if age > WEBHOOK_MAX_AGE_SECONDS:
+        logger.warning("Notificação do pagamento %s com timestamp fora da janela (%.0f s).", payment_id, age)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Assinatura expirada.")
+
+    mac = _HMAC_KEY.copy()
+    mac.update(f"id:{payment_id};request-id:{x_request_id};ts:{ts};".encode())
+    if not hmac.compare_digest(mac.hexdigest(), signature_hash):
+        logger.warning("Assinatura inválida na notificação do pagamento %s (request id %s).", payment_id, x_request_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Assinatura inválida."
         )
-    
-    print(f"\n--- SUCESSO NA VALIDAÇÃO ---")
-    print(f"Assinatura para o pagamento {payment_id} validada com sucesso!")
-    print(f"--- FIM DO SUCESSO ---\n")
 
-    body = await request.body()
-    return body
\ No newline at end of file
+    return await request.body()
+
+def remember_notification(request: Request) -> None:
+    """
+    Marca a notificação como já recebida, para que os reenvios sejam barrados (409) sem
+    tocar no banco. Só deve ser chamada depois de a notificação estar gravada na caixa
+    de entrada: se a gravação falhar, o reenvio do Mercado Pago precisa passar.
+    """
+    _seen_notifications[(request.headers["x-request-id"], _payment_id(request))] = True
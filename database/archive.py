@@ -0,0 +1,47 @@
+# database/archive.py
+
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import ORDERS_ARCHIVED
+from .database import dialect_insert
+from .models import Order, OrderArchive, OrderStatus
+
+# Estados em que um pedido não muda mais e pode sair da tabela orders.
+TERMINAL_STATUSES = (OrderStatus.PAID, OrderStatus.EXPIRED, OrderStatus.FAILED)
+
+# Colunas copiadas para orders_archive (a cobrança PIX fica para trás).
+ARCHIVED_COLUMNS = ("id", "user_id", "product_id", "status", "gateway_payment_id", "created_at", "updated_at")
+
+async def archive_orders_batch(db: AsyncSession, created_before: datetime, batch_size: int) -> int:
+    """
+    Move até `batch_size` pedidos em estado final criados antes de `created_before`
+    para orders_archive, numa transação curta (INSERT ... SELECT e DELETE pelos ids).
+    Usa o índice (status, created_at). Retorna quantos pedidos foram movidos; menos
+    que `batch_size` indica que não há mais o que arquivar.
+    """
+    ids = list(await db.scalars(
+        select(Order.id)
+        .where(Order.status.in_(TERMINAL_STATUSES), Order.created_at < created_before)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ))
+    if not ids:
+        await db.rollback()
+        return 0
+
+    # Dois processos arquivando ao mesmo tempo podem pegar os mesmos ids (o SQLite não tem
+    # SKIP LOCKED): o segundo não duplica a cópia e o seu DELETE não remove nada.
+    await db.execute(
+        dialect_insert(OrderArchive)
+        .from_select(ARCHIVED_COLUMNS, select(*(getattr(Order, name) for name in ARCHIVED_COLUMNS))
+                     .where(Order.id.in_(ids)))
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    result = await db.execute(
+        delete(Order).where(Order.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    ORDERS_ARCHIVED.inc(result.rowcount)
+    return result.rowcount
@@ -0,0 +1,99 @@
+# database/catalog.py
+
+from datetime import datetime
+from sqlalchemy import case, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import CatalogState, Product
+
+# A tabela catalog_state tem uma única linha, sempre com este id.
+CATALOG_STATE_ID = 1
+
+def bump_catalog_version(db: Session) -> None:
+    """
+    Incrementa a versão do catálogo na transação atual.
+    Deve ser chamada por toda escrita em produtos, antes do commit.
+    """
+    result = db.execute(
+        update(CatalogState)
+        .where(CatalogState.id == CATALOG_STATE_ID)
+        .values(version=CatalogState.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CatalogState(id=CATALOG_STATE_ID, version=1))
+
+def upsert_products(db: Session, products: list[dict]) -> None:
+    """
+    Grava um lote de produtos (dicts com name, description, price e content) em um
+    único executemany de INSERT ... ON CONFLICT pelo nome: produtos novos são
+    inseridos e os existentes atualizados. Os nomes do lote devem ser únicos.
+    Não faz commit nem incrementa a versão do catálogo.
+    """
+    if not products:
+        return
+    stmt = dialect_insert(Product)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.name],
+        set_={
+            "description": stmt.excluded.description,
+            "price": stmt.excluded.price,
+            "content": stmt.excluded.content,
+            # O file_id guardado é do arquivo antigo: com outro conteúdo, a próxima
+            # entrega faz o upload de novo (ou envia o texto).
+            "telegram_file_id": case(
+                (Product.content == stmt.excluded.content, Product.telegram_file_id), else_=None
+            ),
+            # O onupdate da coluna não vale para o ON CONFLICT; precisa ir explícito.
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, products)
+
+async def save_product_file_id(db: AsyncSession, product_id: int, file_id: str | None) -> None:
+    """
+    Guarda (ou limpa, com None) o file_id do arquivo do produto. Não muda a versão do
+    catálogo: o file_id não aparece no catálogo, e a entrega sempre relê o produto.
+    """
+    await db.execute(update(Product).where(Product.id == product_id).values(telegram_file_id=file_id))
+    await db.commit()
+
+async def fetch_products_for_search(db: AsyncSession, updated_since: datetime | None = None) -> list[Row]:
+    """
+    Campos usados pelo índice de busca (id, name, description, price, updated_at) de
+    todos os produtos, ou só dos alterados a partir de `updated_since`.
+    """
+    stmt = select(Product.id, Product.name, Product.description, Product.price, Product.updated_at)
+    if updated_since is not None:
+        stmt = stmt.where(Product.updated_at >= updated_since)
+    return list((await db.execute(stmt)).all())
+
+async def get_database_time(db: AsyncSession) -> datetime:
+    """Horário atual do banco: o mesmo relógio que grava `Product.updated_at`."""
+    return await db.scalar(select(func.now()))
+
+async def count_products(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count(Product.id)))
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    """Retorna a versão atual do catálogo (0 se nunca houve escrita registrada)."""
+    version = await db.scalar(
+        select(CatalogState.version).where(CatalogState.id == CATALOG_STATE_ID)
+    )
+    return version or 0
+
+async def fetch_products_after(db: AsyncSession, after_id: int, limit: int) -> list[Product]:
+    """Página de produtos com id maior que `after_id`, em ordem crescente (keyset)."""
+    result = await db.scalars(
+        select(Product).where(Product.id > after_id).order_by(Product.id).limit(limit)
+    )
+    return list(result)
+
+async def fetch_products_before(db: AsyncSession, before_id: int, limit: int) -> list[Product]:
+    """Página de produtos com id menor que `before_id`, devolvida em ordem crescente (keyset)."""
+    result = await db.scalars(
+        select(Product).where(Product.id < before_id).order_by(Product.id.desc()).limit(limit)
+    )
+    return list(reversed(result.all()))
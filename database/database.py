@@ -1,19 +1,149 @@
 # database/database.py
-from sqlalchemy import create_engine
+import time
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
-from core.config import DATABASE_URL
+from core.config import (
+    DATABASE_URL,
+    DB_SQLITE_JOURNAL_MODE,
+    DB_SQLITE_SYNCHRONOUS,
+    DB_SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+)
+from core.metrics import DB_QUERY_SECONDS, DB_CONNECTION_HOLD_SECONDS
+from .migrations import pending_migrations, run_migrations
 from .models import Base  # Importa a Base dos seus modelos
 
-# Cria a engine de conexão com o banco de dados
-# O argumento 'connect_args' é específico para o SQLite para permitir o uso em múltiplos threads.
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Drivers assíncronos usados para cada backend suportado.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str):
+    """
+    Converte a DATABASE_URL síncrona (ex: sqlite:///..., postgresql://...)
+    na URL equivalente com driver assíncrono (aiosqlite / asyncpg).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Backend de banco de dados não suportado para uso assíncrono: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+def engine_options(url: str, asynchronous: bool) -> dict:
+    """
+    Parâmetros de create_engine / create_async_engine ajustados ao backend da URL.
+    """
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # Um arquivo local: o pool padrão basta. A concorrência vem dos PRAGMAs
+        # aplicados em cada conexão (ver apply_sqlite_pragmas).
+        return {} if asynchronous else {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if backend == "postgresql" and asynchronous:
+        options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    return options
+
+def apply_sqlite_pragmas(sync_engine: Engine) -> None:
+    """
+    Configura cada nova conexão SQLite: WAL deixa as leituras seguirem durante uma
+    escrita, synchronous=NORMAL (seguro em WAL) evita um fsync por commit e o
+    busy_timeout faz uma escrita concorrente esperar pelo lock em vez de falhar.
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={DB_SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={DB_SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+# Cria a engine de conexão com o banco de dados, com as opções do backend
+# (no SQLite, 'check_same_thread' permite o uso em múltiplos threads).
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, asynchronous=False))
+apply_sqlite_pragmas(engine)
 
 # Cria uma classe de Sessão que será usada para interagir com o banco de dados
+# (usada por scripts síncronos, como o seed_products.py).
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine e fábrica de sessões assíncronas, usadas pelos handlers do bot e pelo webhook.
+# Assim as consultas não bloqueiam o event loop enquanto aguardam o banco.
+async_engine = create_async_engine(to_async_url(DATABASE_URL), **engine_options(DATABASE_URL, asynchronous=True))
+apply_sqlite_pragmas(async_engine.sync_engine)
+
+def instrument_engine(sync_engine: Engine) -> None:
+    """
+    Mede a duração de cada comando SQL e quanto tempo cada conexão fica fora do pool
+    (o tempo de vida útil da sessão que a usa), via eventos do SQLAlchemy.
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY_SECONDS.observe(time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _execute_error(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            DB_CONNECTION_HOLD_SECONDS.observe(time.perf_counter() - started)
+
+instrument_engine(async_engine.sync_engine)
+
+# expire_on_commit=False evita recarregamentos implícitos (lazy loads) após o commit,
+# que não são permitidos em sessões assíncronas.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def utcnow() -> datetime:
+    """Data/hora atual em UTC, usada em todas as colunas de data gravadas pela aplicação."""
+    return datetime.now(timezone.utc)
+
+def as_utc(value: datetime) -> datetime:
+    """O SQLite devolve datas sem fuso; elas são sempre gravadas em UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def dialect_insert(table):
+    """
+    Retorna um INSERT do dialeto em uso (SQLite ou Postgres), que suporta
+    ON CONFLICT DO NOTHING / DO UPDATE.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
 def create_db_and_tables():
     """
     Função para criar as tabelas no banco de dados com base nos modelos definidos.
@@ -21,8 +151,22 @@ def create_db_and_tables():
     """
     print("Verificando e criando tabelas no banco de dados...")
     Base.metadata.create_all(bind=engine)
+    # Colunas e índices novos em tabelas que já existiam.
+    run_migrations(engine)
     print("Tabelas prontas.")
 
+def check_schema() -> None:
+    """
+    Falha logo na inicialização se o banco não tem as tabelas, colunas ou índices dos
+    modelos, em vez de quebrar depois na primeira consulta.
+    """
+    missing = pending_migrations(engine)
+    if missing:
+        raise RuntimeError(
+            f"Esquema do banco desatualizado (faltam: {', '.join(missing)}). "
+            "Rode as migrações com `python -m database.database`."
+        )
+
 # Este bloco permite que você execute este arquivo diretamente para criar as tabelas
 if __name__ == "__main__":
-    create_db_and_tables()
\ No newline at end of file
+    create_db_and_tables()
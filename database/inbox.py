@@ -0,0 +1,109 @@
+# database/inbox.py
+
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import dialect_insert, utcnow
+from .models import WebhookInbox, InboxStatus
+
+# Backoff entre tentativas: base * 2^(tentativas - 1), limitado a um teto (segundos).
+RETRY_BACKOFF_BASE = 2.0
+RETRY_BACKOFF_MAX = 600.0
+
+async def enqueue_notification(db: AsyncSession, payment_id: str, request_id: str) -> None:
+    """
+    Grava a notificação na caixa de entrada. Notificações repetidas
+    (mesmo pagamento e mesmo request id) são ignoradas pelo ON CONFLICT.
+    """
+    stmt = dialect_insert(WebhookInbox).values(
+        payment_id=payment_id,
+        request_id=request_id,
+        status=InboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=utcnow(),
+    ).on_conflict_do_nothing(index_elements=["payment_id", "request_id"])
+    await db.execute(stmt)
+    await db.commit()
+
+def _claimable(now: datetime):
+    # Linhas prontas para (re)tentativa ou cuja posse expirou (worker que caiu no meio).
+    return or_(
+        and_(WebhookInbox.status == InboxStatus.PENDING, WebhookInbox.next_attempt_at <= now),
+        and_(WebhookInbox.status == InboxStatus.PROCESSING, WebhookInbox.locked_until < now),
+    )
+
+async def claim_batch(db: AsyncSession, worker_token: str, batch_size: int, lease_seconds: float) -> list[WebhookInbox]:
+    """
+    Reserva até `batch_size` linhas para o worker identificado por `worker_token`.
+    O UPDATE condicional garante que dois workers nunca reservem a mesma linha.
+    """
+    now = utcnow()
+    # Primeiro uma leitura: sem trabalho pendente, o worker ocioso não disputa o lock de escrita.
+    candidate_ids = list(await db.scalars(
+        select(WebhookInbox.id)
+        .where(_claimable(now))
+        .order_by(WebhookInbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ))
+    if not candidate_ids:
+        await db.rollback()
+        return []
+
+    await db.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.id.in_(candidate_ids), _claimable(now))
+        .values(
+            status=InboxStatus.PROCESSING,
+            locked_by=worker_token,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=WebhookInbox.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    result = await db.scalars(
+        select(WebhookInbox).where(
+            WebhookInbox.locked_by == worker_token,
+            WebhookInbox.status == InboxStatus.PROCESSING,
+        )
+    )
+    return list(result)
+
+async def mark_done(db: AsyncSession, entry_id: int, worker_token: str) -> None:
+    await db.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.id == entry_id, WebhookInbox.locked_by == worker_token)
+        .values(status=InboxStatus.DONE, locked_by=None, locked_until=None, last_error=None)
+    )
+    await db.commit()
+
+async def mark_failed_attempt(db: AsyncSession, entry: WebhookInbox, worker_token: str, error: str, max_attempts: int) -> InboxStatus:
+    """
+    Registra a falha da tentativa atual e agenda a próxima com backoff exponencial
+    e jitter, ou marca a linha como FAILED ao atingir `max_attempts`.
+    """
+    if entry.attempts >= max_attempts:
+        new_status = InboxStatus.FAILED
+        next_attempt_at = entry.next_attempt_at
+    else:
+        new_status = InboxStatus.PENDING
+        delay = min(RETRY_BACKOFF_BASE * 2 ** (entry.attempts - 1), RETRY_BACKOFF_MAX)
+        next_attempt_at = utcnow() + timedelta(seconds=random.uniform(delay / 2, delay))
+
+    await db.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.id == entry.id, WebhookInbox.locked_by == worker_token)
+        .values(
+            status=new_status,
+            next_attempt_at=next_attempt_at,
+            locked_by=None,
+            locked_until=None,
+            last_error=error[:1000],
+        )
+    )
+    await db.commit()
+    return new_status
@@ -0,0 +1,57 @@
+# database/migrations.py
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from .models import Base
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Migrações incrementais e idempotentes para bancos criados por versões anteriores.
+
+    O create_all só cria tabelas que não existem; aqui adicionamos às tabelas já
+    existentes as colunas (anuláveis) e os índices declarados nos modelos que ainda
+    não estão no banco. Pode ser executada a cada inicialização.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                print(f"Migração: adicionando coluna {table.name}.{column.name}")
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                )
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    print(f"Migração: criando índice {index.name}")
+                    index.create(conn)
+
+def pending_migrations(engine: Engine) -> list[str]:
+    """
+    O que falta no banco em relação aos modelos (tabelas, colunas e índices), sem
+    alterar nada. Lista vazia quando o esquema está em dia.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            missing.append(f"tabela {table.name}")
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"coluna {table.name}.{column.name}" for column in table.columns
+                    if column.name not in existing_columns]
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [f"índice {index.name}" for index in table.indexes if index.name not in existing_indexes]
+    return missing
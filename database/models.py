@@ -5,11 +5,14 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Text,
     DateTime,
     Enum,
     Numeric,
     ForeignKey,
-    BigInteger
+    BigInteger,
+    Index,
+    UniqueConstraint
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
@@ -27,6 +30,12 @@ class OrderStatus(enum.Enum):
     EXPIRED = "EXPIRED"
     FAILED = "FAILED"
 
+class InboxStatus(enum.Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
 class User(Base):
     """
     Modelo para armazenar os usuários do Telegram.
@@ -55,8 +64,14 @@ class Product(Base):
     description = Column(String, nullable=False)
     # Usamos Numeric para preços para evitar problemas de arredondamento com float.
     price = Column(Numeric(10, 2), nullable=False)
-    # Armazena o link do conteúdo digital ou o file_id do Telegram.
+    # Armazena o link/texto do conteúdo digital ou o caminho de um arquivo local
+    # (relativo a PRODUCT_FILES_DIR), que é entregue como documento.
     content = Column(String, nullable=False)
+    # file_id devolvido pelo Telegram no primeiro envio do arquivo: as entregas
+    # seguintes reenviam por ele, sem novo upload.
+    telegram_file_id = Column(String, nullable=True)
+    # Última escrita no produto: o índice de busca só relê os produtos alterados.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relacionamento: Um produto pode estar em vários pedidos.
     orders = relationship("Order", back_populates="product")
@@ -64,12 +79,35 @@ class Product(Base):
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}')>"
 
+class CatalogState(Base):
+    """
+    Linha única com a versão do catálogo. Toda escrita em produtos (seed, importação,
+    admin) incrementa a versão, para que os caches de catálogo de qualquer processo
+    saibam que precisam ser recarregados.
+    """
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<CatalogState(version={self.version})>"
+
 class Order(Base):
     """
     Modelo para rastrear cada transação de compra.
     Este é o modelo mais importante para a lógica de pagamento.
     """
     __tablename__ = "orders"
+    __table_args__ = (
+        # Usado pela expiração de pedidos PENDING antigos e pela reconciliação.
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # Busca da cobrança PIX em aberto do usuário para o produto (clique repetido em "Comprar").
+        Index("ix_orders_user_product_status", "user_id", "product_id", "status"),
+        # Histórico de pedidos do usuário, do mais recente para o mais antigo.
+        Index("ix_orders_user_created_at", "user_id", "created_at"),
+    )
 
     # Usamos UUID como chave primária para os pedidos. É um ID único e não sequencial,
     # o que é mais seguro para expor externamente, se necessário.
@@ -83,6 +121,12 @@ class Order(Base):
     # ID do pagamento gerado pelo gateway (ex: Mercado Pago). Essencial para reconciliação.
     gateway_payment_id = Column(String, unique=True, index=True, nullable=True)
 
+    # Cobrança PIX gerada para o pedido, reenviada se o usuário clicar de novo em "Comprar"
+    # enquanto ela ainda vale.
+    pix_qr_code = Column(Text, nullable=True)
+    pix_qr_code_base64 = Column(Text, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -91,4 +135,86 @@ class Order(Base):
     product = relationship("Product", back_populates="orders")
 
     def __repr__(self):
-        return f"<Order(id={self.id}, user_id={self.user_id}, status='{self.status.value}')>"
\ No newline at end of file
+        return f"<Order(id={self.id}, user_id={self.user_id}, status='{self.status.value}')>"
+
+class OrderArchive(Base):
+    """
+    Pedidos em estado final (PAID, EXPIRED, FAILED) antigos, movidos em lotes da tabela
+    orders pelo job de arquivamento, para que ela (e seus índices) fique só com os
+    pedidos recentes. O histórico do usuário continua completo; a cobrança PIX (QR Code),
+    que não será mais reenviada, não é arquivada.
+    """
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        # Histórico de pedidos do usuário, quando passa dos pedidos da tabela orders.
+        Index("ix_orders_archive_user_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(BigInteger, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    gateway_payment_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<OrderArchive(id={self.id}, user_id={self.user_id}, status='{self.status.value}')>"
+
+class WebhookInbox(Base):
+    """
+    Caixa de entrada durável das notificações do Mercado Pago.
+    O webhook apenas grava aqui e responde; os workers processam em segundo plano,
+    guardando em cada linha o estado das tentativas.
+    """
+    __tablename__ = "webhook_inbox"
+    __table_args__ = (
+        # Reentregas da mesma notificação (mesmo pagamento e mesmo x-request-id) são descartadas.
+        UniqueConstraint("payment_id", "request_id", name="uq_webhook_inbox_payment_request"),
+        # Índice usado pelos workers para buscar as próximas linhas a processar.
+        Index("ix_webhook_inbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    payment_id = Column(String, nullable=False)
+    request_id = Column(String, nullable=False)
+    status = Column(Enum(InboxStatus), default=InboxStatus.PENDING, nullable=False)
+
+    # Controle de novas tentativas e da "posse" da linha por um worker.
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<WebhookInbox(id={self.id}, payment_id={self.payment_id}, status='{self.status.value}')>"
+
+class OutboundMessage(Base):
+    """
+    Mensagens do Telegram que falharam (ex: entrega de produto) e aguardam nova tentativa.
+    O dispatcher de envio relê esta tabela periodicamente.
+    """
+    __tablename__ = "outbound_messages"
+    __table_args__ = (
+        Index("ix_outbound_messages_next_attempt", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    # Método do Bot API (ex: send_message) e seus argumentos, em JSON.
+    method = Column(String, nullable=False)
+    payload = Column(String, nullable=False)
+    order_id = Column(UUID(as_uuid=True), nullable=True)
+
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<OutboundMessage(id={self.id}, chat_id={self.chat_id}, method='{self.method}')>"
@@ -0,0 +1,170 @@
+# database/orders.py
+
+import uuid
+from datetime import datetime
+from sqlalchemy import func, or_, select, union_all, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import ORDER_TRANSITIONS
+from .database import as_utc
+from .models import Order, OrderArchive, OrderStatus, Product
+
+async def mark_order_paid(db: AsyncSession, order_id: uuid.UUID) -> Order | None:
+    """
+    Transição atômica PENDING -> PAID, feita em um único UPDATE condicional.
+
+    Retorna o pedido se ESTA chamada o mudou, ou None se ele não existe ou já saiu
+    de PENDING. Notificações duplicadas ou workers concorrentes nunca recebem o
+    mesmo pedido duas vezes, então a entrega só acontece uma vez.
+    """
+    stmt = (
+        update(Order)
+        .where(Order.id == order_id, Order.status == OrderStatus.PENDING)
+        .values(status=OrderStatus.PAID)
+    )
+
+    if db.bind.dialect.update_returning:
+        order = (await db.scalars(stmt.returning(Order))).first()
+        await db.commit()
+    else:
+        # Backends sem RETURNING: o rowcount diz se a transição aconteceu.
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        if result.rowcount == 0:
+            await db.rollback()
+            return None
+        await db.commit()
+        order = await db.get(Order, order_id)
+
+    if order is not None:
+        ORDER_TRANSITIONS.inc(from_status="PENDING", to_status="PAID")
+    return order
+
+async def mark_order_failed(db: AsyncSession, order_id: uuid.UUID) -> bool:
+    """Transição atômica PENDING -> FAILED (pagamento recusado ou cancelado no gateway)."""
+    result = await db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == OrderStatus.PENDING)
+        .values(status=OrderStatus.FAILED)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount == 1:
+        ORDER_TRANSITIONS.inc(from_status="PENDING", to_status="FAILED")
+        return True
+    return False
+
+async def expire_stale_orders(db: AsyncSession, created_before: datetime) -> int:
+    """
+    Marca como EXPIRED, em um único UPDATE, todos os pedidos PENDING criados antes
+    de `created_before`. Usa o índice (status, created_at). Retorna quantos mudaram.
+    """
+    result = await db.execute(
+        update(Order)
+        .where(Order.status == OrderStatus.PENDING, Order.created_at < created_before)
+        .values(status=OrderStatus.EXPIRED)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        ORDER_TRANSITIONS.inc(result.rowcount, from_status="PENDING", to_status="EXPIRED")
+    return result.rowcount
+
+async def get_pending_orders_since(db: AsyncSession, created_after: datetime) -> tuple[set[str], datetime | None]:
+    """
+    Ids (em texto, como no external_reference) dos pedidos PENDING criados depois de
+    `created_after`, junto com a data do mais antigo deles.
+    """
+    rows = (await db.execute(
+        select(Order.id, Order.created_at)
+        .where(Order.status == OrderStatus.PENDING, Order.created_at >= created_after)
+    )).all()
+    if not rows:
+        return set(), None
+    oldest = min(as_utc(created_at) for _, created_at in rows)
+    return {str(order_id) for order_id, _ in rows}, oldest
+
+async def find_open_order(db: AsyncSession, user_id: int, product_id: int, valid_until: datetime) -> Order | None:
+    """
+    Pedido PENDING mais recente do usuário para o produto cuja cobrança PIX ainda vale
+    em `valid_until`. Usa o índice (user_id, product_id, status).
+    """
+    return (await db.scalars(
+        select(Order)
+        .where(
+            Order.user_id == user_id,
+            Order.product_id == product_id,
+            Order.status == OrderStatus.PENDING,
+            Order.pix_qr_code.is_not(None),
+            Order.expires_at > valid_until,
+        )
+        .order_by(Order.expires_at.desc())
+        .limit(1)
+    )).first()
+
+async def get_order_status(db: AsyncSession, order_id: uuid.UUID) -> OrderStatus | None:
+    """Status atual do pedido (consulta pela chave primária)."""
+    return await db.scalar(select(Order.status).where(Order.id == order_id))
+
+def _history_select(model, user_id: int, cursor, before_id: uuid.UUID | None, limit: int):
+    stmt = (
+        select(model.id, model.status, model.created_at, Product.name, Product.price)
+        .join(Product, Product.id == model.product_id)
+        .where(model.user_id == user_id)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        # O `created_at <= cursor` separado deixa o banco usar o índice como intervalo.
+        stmt = stmt.where(
+            model.created_at <= cursor,
+            or_(model.created_at < cursor, model.id < before_id),
+        )
+    return stmt
+
+async def fetch_order_history(
+    db: AsyncSession,
+    user_id: int,
+    before_id: uuid.UUID | None,
+    limit: int,
+) -> list[Row]:
+    """
+    Pedidos do usuário, do mais recente para o mais antigo, a partir do pedido
+    `before_id` (exclusive; None = início), por keyset em (created_at, id) sobre os
+    índices (user_id, created_at) de orders e de orders_archive: os pedidos arquivados
+    continuam no histórico. Um único SELECT (UNION ALL das duas tabelas, cada uma com
+    o seu LIMIT) já traz o produto, sem carga preguiçosa de `Order.product` por pedido.
+    """
+    cursor = None
+    if before_id is not None:
+        # O cursor é comparado com o valor gravado (subconsulta pela chave primária, na
+        # tabela em que o pedido estiver), não com uma data vinda do callback, que poderia
+        # diferir na precisão guardada.
+        cursor = func.coalesce(
+            select(Order.created_at).where(Order.id == before_id).scalar_subquery(),
+            select(OrderArchive.created_at).where(OrderArchive.id == before_id).scalar_subquery(),
+        )
+    orders = union_all(
+        select(_history_select(Order, user_id, cursor, before_id, limit).subquery()),
+        select(_history_select(OrderArchive, user_id, cursor, before_id, limit).subquery()),
+    ).subquery()
+    return list((await db.execute(
+        select(orders).order_by(orders.c.created_at.desc(), orders.c.id.desc()).limit(limit)
+    )).all())
+
+async def get_paid_order_with_product(
+    db: AsyncSession, order_id: uuid.UUID, user_id: int
+) -> tuple[Order | OrderArchive, Product] | None:
+    """
+    Pedido PAGO do usuário junto com o produto (reenvio do conteúdo), em um único
+    SELECT; se o pedido não estiver em orders, procura em orders_archive.
+    """
+    for model in (Order, OrderArchive):
+        row = (await db.execute(
+            select(model, Product)
+            .join(Product, Product.id == model.product_id)
+            .where(model.id == order_id, model.user_id == user_id, model.status == OrderStatus.PAID)
+        )).first()
+        if row is not None:
+            return row.tuple()
+    return None
@@ -0,0 +1,60 @@
+# database/outbox.py
+
+import json
+import uuid
+from datetime import timedelta
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import utcnow
+from .models import OutboundMessage
+
+# Espera entre as tentativas de reenvio: base * 2^tentativas, limitada a um teto (segundos).
+RETRY_BACKOFF_BASE = 30.0
+RETRY_BACKOFF_MAX = 3600.0
+
+async def save_failed_message(
+    db: AsyncSession,
+    chat_id: int,
+    method: str,
+    payload: dict,
+    order_id: uuid.UUID | None,
+    attempts: int,
+    error: str,
+) -> None:
+    """Guarda uma mensagem que não pôde ser enviada para nova tentativa mais tarde."""
+    delay = min(RETRY_BACKOFF_BASE * 2 ** attempts, RETRY_BACKOFF_MAX)
+    db.add(OutboundMessage(
+        chat_id=chat_id,
+        method=method,
+        payload=json.dumps(payload),
+        order_id=order_id,
+        attempts=attempts,
+        next_attempt_at=utcnow() + timedelta(seconds=delay),
+        last_error=error[:1000],
+    ))
+    await db.commit()
+
+async def take_due_messages(db: AsyncSession, limit: int) -> list[OutboundMessage]:
+    """
+    Retira da tabela as mensagens cujo reenvio já venceu.
+    Cada linha é apagada com um DELETE individual: só quem apagou a linha a reenvia,
+    então dois processos nunca reenviam a mesma mensagem.
+    """
+    due = list(await db.scalars(
+        select(OutboundMessage)
+        .where(OutboundMessage.next_attempt_at <= utcnow())
+        .order_by(OutboundMessage.next_attempt_at)
+        .limit(limit)
+    ))
+    taken = []
+    for message in due:
+        result = await db.execute(
+            delete(OutboundMessage)
+            .where(OutboundMessage.id == message.id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            taken.append(message)
+    await db.commit()
+    return taken
@@ -0,0 +1,24 @@
+# database/users.py
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import dialect_insert
+from .models import User
+
+async def upsert_users(db: AsyncSession, users: dict[int, str]) -> None:
+    """
+    Grava um lote de usuários (id -> full_name) em um único INSERT ... ON CONFLICT.
+    Usuários novos são inseridos; os existentes só são atualizados se o nome mudou.
+    """
+    if not users:
+        return
+    stmt = dialect_insert(User).values(
+        [{"id": user_id, "full_name": full_name} for user_id, full_name in users.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.id],
+        set_={"full_name": stmt.excluded.full_name},
+        where=User.full_name != stmt.excluded.full_name,
+    )
+    await db.execute(stmt)
+    await db.commit()
@@ -0,0 +1,144 @@
+# import_catalog.py
+#
+# Importa (ou sincroniza) o catálogo de produtos a partir de um export CSV ou JSONL,
+# com as colunas/chaves name, description, price e content. O arquivo é lido em
+# streaming, então a memória não cresce com o tamanho do catálogo; produtos já
+# existentes (mesmo nome) são atualizados.
+#
+# Uso:
+#     python import_catalog.py produtos.csv
+#     python import_catalog.py produtos.jsonl --batch-size 2000
+
+import argparse
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from database.catalog import bump_catalog_version, upsert_products
+from database.database import SessionLocal, create_db_and_tables
+
+# Maior preço que cabe em Numeric(10, 2).
+MAX_PRICE = Decimal("99999999.99")
+# Quantos erros de validação são mostrados no relatório.
+MAX_REPORTED_ERRORS = 20
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    imported: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+def read_rows(path: Path) -> Iterator[tuple[int, dict | str]]:
+    """
+    Gera (número da linha, registro) do arquivo, um de cada vez: um dict no CSV ou
+    a linha ainda em texto no JSONL (decodificada na validação).
+    """
+    with path.open(encoding="utf-8-sig", newline="") as file:
+        if path.suffix.lower() == ".csv":
+            # A linha 1 é o cabeçalho.
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    yield line_number, line
+
+def validate_row(row: dict | str) -> dict:
+    """Normaliza um registro do arquivo; levanta ValueError se ele for inválido."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido ({e.msg})")
+    if not isinstance(row, dict):
+        raise ValueError("registro não é um objeto")
+    name = str(row.get("name") or "").strip()
+    content = str(row.get("content") or "").strip()
+    if not name:
+        raise ValueError("nome vazio")
+    if not content:
+        raise ValueError("conteúdo vazio")
+
+    try:
+        price = Decimal(str(row.get("price")).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"preço inválido: {row.get('price')!r}")
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise ValueError(f"preço fora do intervalo: {row.get('price')!r}")
+
+    return {
+        "name": name,
+        "description": str(row.get("description") or "").strip(),
+        "price": price.quantize(Decimal("0.01")),
+        "content": content,
+    }
+
+def valid_products(rows: Iterable[tuple[int, dict | str]], report: ImportReport) -> Iterator[dict]:
+    """Filtra os registros válidos, contando e anotando os inválidos no relatório."""
+    for line_number, row in rows:
+        report.rows += 1
+        try:
+            yield validate_row(row)
+        except ValueError as e:
+            report.invalid += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(f"linha {line_number}: {e}")
+
+def batched(products: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    """
+    Lotes de até `size` produtos. Um nome repetido dentro do lote fica só com a
+    última versão (o ON CONFLICT não pode atualizar a mesma linha duas vezes).
+    """
+    iterator = iter(products)
+    while batch := list({product["name"]: product for product in islice(iterator, size)}.values()):
+        yield batch
+
+def import_catalog(path: Path, batch_size: int = 1000) -> ImportReport:
+    """
+    Importa o arquivo em lotes, uma transação por lote. No fim, incrementa a versão
+    do catálogo para que os caches do bot recarreguem os produtos.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    try:
+        for batch in batched(valid_products(read_rows(path), report), batch_size):
+            with SessionLocal() as db:
+                upsert_products(db, batch)
+                db.commit()
+            report.imported += len(batch)
+    finally:
+        # Mesmo se a importação parar no meio, os lotes já gravados precisam aparecer no bot.
+        if report.imported:
+            with SessionLocal() as db:
+                bump_catalog_version(db)
+                db.commit()
+        report.seconds = time.perf_counter() - started
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa produtos de um arquivo CSV ou JSONL.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    report = import_catalog(args.path, args.batch_size)
+    for error in report.errors:
+        print(f"Ignorado: {error}")
+    if report.invalid > len(report.errors):
+        print(f"... e mais {report.invalid - len(report.errors)} registros inválidos.")
+    print(
+        f"{report.rows} registros lidos, {report.imported} produtos gravados, {report.invalid} inválidos "
+        f"em {report.seconds:.2f} s ({report.rows_per_second:.0f} registros/s)."
+    )
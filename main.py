@@ -1,46 +1,39 @@
-# main.py (VERSÃO FINAL com THREADING)
+# main.py
 
-import threading
 import uvicorn
 import logging
-from bot.bot import setup_bot
-from web.server import api as fastapi_app
+from core.config import APP_ROLE, SERVER_HOST, SERVER_PORT, BOT_RUN_MODE, WEB_WORKERS
+from core.log import setup_logging
 
-# Configura os logs para termos uma visão clara do que está acontecendo
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
+# Logs em JSON, escritos por um thread próprio (ver core/log.py).
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def run_server():
-    """
-    Função alvo para a thread do servidor. Inicia o Uvicorn.
-    """
-    uvicorn.run(fastapi_app, host="0.0.0.0", port=8000, log_level="info")
-
-
 if __name__ == "__main__":
-    logger.info("Iniciando a aplicação...")
-
-    # 1. Configura a aplicação do bot
-    ptb_app = setup_bot()
-
-    # 2. Disponibiliza a instância do bot para o FastAPI ANTES de iniciar o servidor
-    fastapi_app.state.ptb_app = ptb_app
-    
-    # 3. Cria uma nova thread que executará a função `run_server`
-    server_thread = threading.Thread(target=run_server)
-    
-    # 4. Inicia a thread do servidor em segundo plano.
-    # O `daemon=True` garante que a thread do servidor será encerrada
-    # quando o processo principal (o bot) for encerrado.
-    server_thread.daemon = True
-    server_thread.start()
-    logger.info("Servidor web iniciado em uma thread separada na porta 8000.")
-
-    # 5. Inicia o bot na thread principal.
-    # Esta chamada `run_polling` é bloqueante e manterá a aplicação viva.
-    logger.info("Bot iniciando em modo polling na thread principal...")
-    ptb_app.run_polling()
\ No newline at end of file
+    if APP_ROLE == "bot":
+        # Só o bot (polling), com a rotina de pedidos; os webhooks do Mercado Pago
+        # ficam com a camada web (APP_ROLE=web), que pode ter vários workers. As migrações
+        # e as métricas do bot (METRICS_PORT) ficam no post_init, em bot/bot.py.
+        from bot.bot import setup_bot
+
+        logger.info("Iniciando só o bot, em modo polling...")
+        setup_bot().run_polling()
+    elif APP_ROLE == "web":
+        # Migrações uma única vez, aqui no processo pai: vários workers aplicando os
+        # mesmos ALTER TABLE ao mesmo tempo entrariam em conflito.
+        from database.database import create_db_and_tables
+
+        create_db_and_tables()
+        logger.info("Iniciando a camada web sem estado com %s workers...", WEB_WORKERS)
+        uvicorn.run("web.server:api", host=SERVER_HOST, port=SERVER_PORT, workers=WEB_WORKERS, log_level="info",
+                    log_config=None)
+    else:
+        # Um único processo e um único event loop: o lifespan do FastAPI inicia o bot
+        # (webhook do Telegram ou, em desenvolvimento, polling) junto com o servidor
+        # que recebe os webhooks do Mercado Pago.
+        from web.server import api as fastapi_app
+
+        logger.info("Iniciando a aplicação (bot em modo %s)...", BOT_RUN_MODE)
+        # log_config=None: os logs do uvicorn também passam pela fila de core/log.py.
+        uvicorn.run(fastapi_app, host=SERVER_HOST, port=SERVER_PORT, log_level="info", log_config=None)
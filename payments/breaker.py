@@ -0,0 +1,160 @@
+# payments/breaker.py
+
+import enum
+import logging
+import time
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(enum.Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+class GatewayUnavailable(Exception):
+    """Chamada recusada sem ir ao gateway: circuito aberto ou limite de chamadas simultâneas."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Gateway de pagamento indisponível ({reason}).")
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    Disjuntor com limite de chamadas simultâneas para um serviço externo.
+
+    FECHADO: as chamadas passam e o resultado de cada uma (`record()`, uma por tentativa
+    quando há novas tentativas) fica numa janela deslizante
+    de `window` segundos. Com pelo menos `min_calls` chamadas na janela, se a fração de
+    falhas chegar a `failure_rate`, ou a de chamadas mais lentas que `slow_call_seconds`
+    chegar a `slow_call_rate`, o circuito ABRE.
+    ABERTO: toda chamada é recusada na hora (GatewayUnavailable), sem esperar o
+    serviço degradado. Depois de `open_seconds` o circuito fica MEIO-ABERTO.
+    MEIO-ABERTO: só `half_open_calls` chamadas de teste passam; se todas derem certo o
+    circuito FECHA, e a primeira falha o ABRE de novo. Se as chamadas de teste não
+    derem resultado em `open_seconds`, novas chamadas de teste são liberadas.
+
+    Em qualquer estado, acima de `max_in_flight` chamadas em andamento as novas são
+    recusadas (descarte de carga), em vez de enfileirar atrás das lentas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        window: float,
+        min_calls: int,
+        open_seconds: float,
+        half_open_calls: int,
+        max_in_flight: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._failure_rate = failure_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate = slow_call_rate
+        self._window = window
+        self._min_calls = min_calls
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._max_in_flight = max_in_flight
+        self._clock = clock
+
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_opened_at = 0.0
+        self._in_flight = 0
+        # Chamadas de teste liberadas e bem-sucedidas no estado MEIO-ABERTO.
+        self._trials = 0
+        self._trial_successes = 0
+        # Janela deslizante: (instante, falhou, lenta), com os totais mantidos a cada mudança.
+        self._calls: deque[tuple[float, bool, bool]] = deque()
+        self._failures = 0
+        self._slow = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self._open_seconds:
+            self._half_opened_at = self._clock()
+            self._transition(CircuitState.HALF_OPEN)
+        elif (self._state == CircuitState.HALF_OPEN and self._trials >= self._half_open_calls
+                and self._clock() - self._half_opened_at >= self._open_seconds):
+            # Chamadas de teste sem resultado (ex.: perdidas sem `record()`): não deixa o
+            # circuito recusando tudo para sempre.
+            self._half_opened_at = self._clock()
+            self._trials = self._trial_successes
+        return self._state
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def rejection_reason(self) -> str | None:
+        """Por que uma chamada agora seria recusada ("open" ou "saturated"), ou None se passaria."""
+        state = self.state
+        if state == CircuitState.OPEN or (state == CircuitState.HALF_OPEN and self._trials >= self._half_open_calls):
+            return "open"
+        if self._in_flight >= self._max_in_flight:
+            return "saturated"
+        return None
+
+    def acquire(self) -> None:
+        """Reserva uma vaga para uma chamada; levanta GatewayUnavailable se ela deve ser recusada."""
+        reason = self.rejection_reason()
+        if reason is not None:
+            raise GatewayUnavailable(reason)
+        if self._state == CircuitState.HALF_OPEN:
+            self._trials += 1
+        self._in_flight += 1
+
+    def release(self) -> None:
+        """Libera a vaga reservada por `acquire()`."""
+        self._in_flight -= 1
+
+    def record(self, duration: float, failed: bool) -> None:
+        """Registra o resultado de uma chamada ao serviço (falha ou duração acima do limite)."""
+        slow = duration >= self._slow_call_seconds
+        if self._state == CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                self._trial_successes += 1
+                if self._trial_successes >= self._half_open_calls:
+                    self._transition(CircuitState.CLOSED)
+            return
+        if self._state == CircuitState.OPEN:
+            # Chamada iniciada antes de o circuito abrir: não muda nada.
+            return
+
+        now = self._clock()
+        self._calls.append((now, failed, slow))
+        self._failures += failed
+        self._slow += slow
+        self._prune(now)
+        calls = len(self._calls)
+        if calls >= self._min_calls and (
+                self._failures / calls >= self._failure_rate or self._slow / calls >= self._slow_call_rate):
+            self._open()
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self._window:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        log = logger.warning if state == CircuitState.OPEN else logger.info
+        log("Circuito %s: %s -> %s.", self.name, self._state.name, state.name)
+        self._state = state
+        self._trials = 0
+        self._trial_successes = 0
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
@@ -1,22 +1,224 @@
 # payments/mercadopago.py
 
-import mercadopago
-from core.config import MERCADO_PAGO_ACCESS_TOKEN
+import asyncio
+import logging
+import random
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+import httpx
+from core.config import (
+    MERCADO_PAGO_ACCESS_TOKEN,
+    MERCADO_PAGO_API_URL,
+    MERCADO_PAGO_NOTIFICATION_URL,
+    MP_HTTP_POOL_SIZE,
+    MP_HTTP_TIMEOUT,
+    MP_HTTP_MAX_RETRIES,
+    MP_BREAKER_FAILURE_RATE,
+    MP_BREAKER_SLOW_CALL_SECONDS,
+    MP_BREAKER_SLOW_CALL_RATE,
+    MP_BREAKER_WINDOW_SECONDS,
+    MP_BREAKER_MIN_CALLS,
+    MP_BREAKER_OPEN_SECONDS,
+    MP_BREAKER_HALF_OPEN_CALLS,
+    MP_MAX_IN_FLIGHT,
+    PIX_EXPIRATION_MINUTES,
+)
+from core.metrics import (
+    MERCADOPAGO_CIRCUIT_STATE,
+    MERCADOPAGO_IN_FLIGHT,
+    MERCADOPAGO_REJECTED_CALLS,
+    MERCADOPAGO_REQUEST_SECONDS,
+)
+from database.database import utcnow
 from database.models import Order, Product
+from payments.breaker import CircuitBreaker, CircuitState, GatewayUnavailable
 
-# Inicializa o SDK do Mercado Pago com seu Access Token.
-sdk = mercadopago.SDK(MERCADO_PAGO_ACCESS_TOKEN)
+logger = logging.getLogger(__name__)
 
-def create_pix_payment(order: Order, product: Product) -> dict | None:
+# Status HTTP que indicam falha temporária e justificam uma nova tentativa.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class MercadoPagoClient:
+    """
+    Cliente assíncrono para a API REST do Mercado Pago.
+
+    Usa um httpx.AsyncClient compartilhado por event loop (conexões keep-alive reaproveitadas),
+    com timeout por chamada e novas tentativas limitadas com backoff exponencial e jitter.
+    Todas as chamadas passam pelo disjuntor `breaker`: com o gateway degradado (muitas
+    falhas ou lentidão) ou chamadas simultâneas demais, são recusadas na hora com
+    GatewayUnavailable em vez de esperar o timeout.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = MERCADO_PAGO_API_URL,
+        pool_size: int = MP_HTTP_POOL_SIZE,
+        timeout: float = MP_HTTP_TIMEOUT,
+        max_retries: int = MP_HTTP_MAX_RETRIES,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self._access_token = access_token
+        self._base_url = base_url
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.breaker = breaker or CircuitBreaker(
+            "mercadopago",
+            failure_rate=MP_BREAKER_FAILURE_RATE,
+            slow_call_seconds=MP_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=MP_BREAKER_SLOW_CALL_RATE,
+            window=MP_BREAKER_WINDOW_SECONDS,
+            min_calls=MP_BREAKER_MIN_CALLS,
+            open_seconds=MP_BREAKER_OPEN_SECONDS,
+            half_open_calls=MP_BREAKER_HALF_OPEN_CALLS,
+            max_in_flight=MP_MAX_IN_FLIGHT,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Criado sob demanda, um por event loop: as conexões do pool pertencem
+        # ao loop que as abriu (scripts e benchmarks podem criar loops novos).
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers={"Authorization": f"Bearer {self._access_token}"},
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self._pool_size,
+                    max_keepalive_connections=self._pool_size,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões do event loop atual."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def request(self, method: str, path: str, operation: str = "other", **kwargs) -> httpx.Response:
+        """
+        Executa a requisição, repetindo em erros de rede e status temporários.
+        Retorna a última resposta recebida ou propaga o último erro de rede.
+        A duração total (com as novas tentativas) vai para a métrica da `operation`.
+        Levanta GatewayUnavailable, sem chamar o gateway, se o disjuntor recusar.
+        """
+        try:
+            self.breaker.acquire()
+        except GatewayUnavailable as e:
+            MERCADOPAGO_REJECTED_CALLS.inc(operation=operation, reason=e.reason)
+            raise
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self._request(method, path, **kwargs)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            self.breaker.release()
+            MERCADOPAGO_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+
+    def available(self, operation: str = "create") -> bool:
+        """
+        Se uma chamada agora passaria pelo disjuntor. Permite recusar um pedido antes
+        de gravar qualquer coisa; a recusa conta na métrica como as de `request()`.
+        """
+        reason = self.breaker.rejection_reason()
+        if reason is None:
+            return True
+        MERCADOPAGO_REJECTED_CALLS.inc(operation=operation, reason=reason)
+        return False
+
+    def _last_attempt(self, attempt: int) -> bool:
+        # Com o circuito aberto (por outras chamadas) não adianta insistir: a falha
+        # volta na hora em vez de prender a vaga durante o backoff.
+        return attempt == self._max_retries or self.breaker.state == CircuitState.OPEN
+
+    async def _attempt(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Uma tentativa, com o resultado registrado no disjuntor qualquer que seja o desfecho."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except BaseException:
+            # Erro de rede, resposta inválida ou cancelamento: toda tentativa precisa de
+            # um resultado, senão uma chamada de teste do MEIO-ABERTO nunca termina.
+            self.breaker.record(time.perf_counter() - started, failed=True)
+            raise
+        # 4xx é erro nosso (dados, autenticação), não indisponibilidade do gateway.
+        self.breaker.record(time.perf_counter() - started, failed=response.status_code in RETRYABLE_STATUS)
+        return response
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(self._max_retries + 1):
+            try:
+                response = await self._attempt(method, path, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS or self._last_attempt(attempt):
+                    return response
+                logger.warning("Mercado Pago respondeu %s em %s %s (tentativa %s).",
+                               response.status_code, method, path, attempt + 1)
+            except httpx.TransportError as e:
+                if self._last_attempt(attempt):
+                    raise
+                logger.warning("Erro de rede no Mercado Pago em %s %s (tentativa %s): %s",
+                               method, path, attempt + 1, e)
+
+            # Backoff exponencial com "full jitter" para não sincronizar as novas tentativas.
+            await asyncio.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+
+    async def create_payment(self, payment_data: dict, idempotency_key: str) -> httpx.Response:
+        # A chave de idempotência torna as novas tentativas seguras: o Mercado Pago
+        # devolve o mesmo pagamento em vez de criar uma segunda cobrança.
+        return await self.request(
+            "POST",
+            "/v1/payments",
+            operation="create",
+            json=payment_data,
+            headers={"X-Idempotency-Key": idempotency_key},
+        )
+
+    async def get_payment(self, payment_id: str) -> httpx.Response:
+        return await self.request("GET", f"/v1/payments/{payment_id}", operation="get")
+
+    async def search_payments(self, params: dict) -> httpx.Response:
+        return await self.request("GET", "/v1/payments/search", operation="search", params=params)
+
+
+# Quantidade de pagamentos por página na busca em lote.
+SEARCH_PAGE_SIZE = 100
+
+def format_mp_datetime(value: datetime) -> str:
+    """Formato de data aceito pela API do Mercado Pago (ISO 8601 com milissegundos e fuso)."""
+    return value.isoformat(timespec="milliseconds")
+
+def parse_mp_datetime(value: str | None) -> datetime | None:
+    """Lê uma data da API do Mercado Pago (ex.: date_approved); None se ausente ou inválida."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+# Cliente compartilhado por todo o processo.
+mp_client = MercadoPagoClient(MERCADO_PAGO_ACCESS_TOKEN)
+MERCADOPAGO_CIRCUIT_STATE.set_function(lambda: mp_client.breaker.state.value)
+MERCADOPAGO_IN_FLIGHT.set_function(lambda: mp_client.breaker.in_flight)
+
+
+async def create_pix_payment(order: Order, product: Product) -> dict | None:
     """
     Cria uma cobrança PIX no Mercado Pago para um determinado pedido.
     Retorna o dicionário de resposta da API do Mercado Pago ou None em caso de erro.
     """
-    # Esta URL DEVE ser HTTPS e acessível publicamente.
-    # Usaremos o ngrok para desenvolvimento para expor nosso servidor local.
-    # Em produção, você substituirá pela URL do seu servidor.
-    notification_url = "https://12f0f86180ba.ngrok-free.app/webhook/mercadopago"
-
     payment_data = {
         "transaction_amount": float(product.price),
         "description": product.name,
@@ -26,20 +228,76 @@ def create_pix_payment(order: Order, product: Product) -> dict | None:
             "first_name": "UsuarioTelegram",
             "last_name": str(order.user_id),
         },
-        "notification_url": notification_url,
-        "external_reference": str(order.id)
+        # Esta URL DEVE ser HTTPS e acessível publicamente (ngrok em desenvolvimento).
+        "notification_url": MERCADO_PAGO_NOTIFICATION_URL,
+        "external_reference": str(order.id),
+        # A cobrança expira junto com o pedido (ver a rotina de expiração em bot/jobs.py).
+        "date_of_expiration": format_mp_datetime(
+            order.expires_at or utcnow() + timedelta(minutes=PIX_EXPIRATION_MINUTES)
+        )
     }
 
     try:
-        payment_response = sdk.payment().create(payment_data)
-        payment = payment_response.get("response")
+        payment_response = await mp_client.create_payment(payment_data, idempotency_key=str(order.id))
+        payment = payment_response.json()
 
-        if payment and payment.get("status") == "pending":
+        if payment_response.is_success and payment.get("status") == "pending":
             return payment
         else:
-            print("Erro ao criar pagamento:", payment_response)
+            logger.error("Erro ao criar pagamento para o pedido %s: %s %s", order.id, payment_response.status_code,
+                         payment.get("message"), extra={"order_id": order.id, "user_id": order.user_id})
             return None
-            
-    except Exception as e:
-        print(f"Erro na API do Mercado Pago: {e}")
-        return None
\ No newline at end of file
+
+    except GatewayUnavailable as e:
+        logger.warning("Pagamento do pedido %s não criado: %s", order.id, e,
+                       extra={"order_id": order.id, "user_id": order.user_id})
+        return None
+    except Exception:
+        logger.exception("Erro na API do Mercado Pago ao criar o pagamento do pedido %s.", order.id,
+                         extra={"order_id": order.id, "user_id": order.user_id})
+        return None
+
+
+async def get_payment(payment_id: str) -> dict:
+    """
+    Consulta um pagamento no Mercado Pago.
+    Retorna o dicionário do pagamento (vazio se a API não devolveu um pagamento)
+    e levanta httpx.HTTPStatusError se o gateway continuar indisponível.
+    """
+    payment_response = await mp_client.get_payment(payment_id)
+    if payment_response.status_code in RETRYABLE_STATUS:
+        # Falha temporária: propaga para que quem chamou possa tentar de novo mais tarde.
+        payment_response.raise_for_status()
+    if not payment_response.is_success:
+        logger.error("Erro ao consultar pagamento %s: %s", payment_id, payment_response.status_code,
+                     extra={"payment_id": payment_id})
+        return {}
+    return payment_response.json()
+
+
+async def iter_payments(begin_date: datetime, end_date: datetime, page_size: int = SEARCH_PAGE_SIZE) -> AsyncIterator[dict]:
+    """
+    Percorre, em páginas, os pagamentos criados entre `begin_date` e `end_date`
+    usando a busca do Mercado Pago (uma chamada por página, não uma por pedido).
+    """
+    offset = 0
+    while True:
+        payment_response = await mp_client.search_payments({
+            "sort": "date_created",
+            "criteria": "asc",
+            "range": "date_created",
+            "begin_date": format_mp_datetime(begin_date),
+            "end_date": format_mp_datetime(end_date),
+            "limit": page_size,
+            "offset": offset,
+        })
+        payment_response.raise_for_status()
+        page = payment_response.json()
+        results = page.get("results", [])
+        for payment in results:
+            yield payment
+
+        offset += len(results)
+        total = page.get("paging", {}).get("total", 0)
+        if len(results) < page_size or offset >= total:
+            return
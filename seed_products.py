@@ -1,5 +1,6 @@
 # seed_products.py
 
+from database.catalog import bump_catalog_version
 from database.database import SessionLocal, create_db_and_tables
 from database.models import Product
 from decimal import Decimal
@@ -24,6 +25,8 @@ def seed_data():
             )
 
             db.add(produto_teste)
+            # Avisa os caches de catálogo dos processos do bot que houve mudança.
+            bump_catalog_version(db)
             db.commit()
             print("Produto de teste inserido com sucesso!")
         else:
@@ -1,103 +1,153 @@
 # web/server.py
 
+import asyncio
+import hmac
 import json
-import re
-import uuid # <-- Importe a biblioteca UUID
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
 from fastapi import FastAPI, Request, Response, status, HTTPException
-from sqlalchemy.orm import Session
+from telegram import Update
 from telegram.ext import Application
-import mercadopago
 
-from core.security import validate_mercadopago_signature
-from database.database import SessionLocal
-from database.models import Order, OrderStatus, Product
-from payments.mercadopago import sdk
+from bot.bot import setup_bot, run_bot
+from bot.delivery import fulfill_order
+from bot.dispatcher import TelegramDispatcher, build_bot_client
+from core.config import APP_ROLE, TELEGRAM_WEBHOOK_SECRET
+from core.log import setup_logging
+from core.metrics import CONTENT_TYPE, REGISTRY, TELEGRAM_QUEUE_DEPTH
+from core.security import remember_notification, validate_mercadopago_signature
+from database.database import AsyncSessionLocal, async_engine, check_schema
+from database.inbox import enqueue_notification
+from payments.mercadopago import get_payment, mp_client, parse_mp_datetime
+from web.worker import InboxWorkerPool
 
-api = FastAPI()
+logger = logging.getLogger(__name__)
 
-async def deliver_product(order: Order, product: Product, ptb_app: Application):
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Com `--workers`, cada worker do uvicorn é um processo novo e configura os próprios logs.
+    setup_logging()
+    if APP_ROLE == "web":
+        # As migrações rodam uma vez no processo pai (main.py), antes dos workers; aqui
+        # cada worker só confere o esquema e falha logo se ele estiver desatualizado.
+        await asyncio.to_thread(check_schema)
+        # Camada web sem estado: cada worker do uvicorn tem o próprio cliente do Bot API
+        # (só para envios) e o próprio dispatcher; o bot roda em outro processo.
+        bot = build_bot_client()
+        await bot.initialize()
+        dispatcher = TelegramDispatcher(bot)
+        dispatcher.start()
+        TELEGRAM_QUEUE_DEPTH.set_function(lambda: dispatcher.queue_depth)
+        app.state.ptb_app = None
+        try:
+            async with inbox_workers(app, dispatcher):
+                yield
+        finally:
+            await dispatcher.stop()
+            await bot.shutdown()
+            # Libera os pools de conexões (Mercado Pago e banco) deste worker.
+            await mp_client.aclose()
+            await async_engine.dispose()
+        return
+
+    # O bot roda neste mesmo event loop: handlers, JobQueue, dispatcher de envio e os
+    # workers da caixa de entrada do webhook compartilham o loop do uvicorn. As migrações
+    # rodam no post_init do bot, antes dos workers.
+    ptb_app: Application = getattr(app.state, "ptb_app", None) or setup_bot()
+    app.state.ptb_app = ptb_app
+    async with run_bot(ptb_app):
+        async with inbox_workers(app, ptb_app.bot_data["dispatcher"]):
+            yield
+
+@asynccontextmanager
+async def inbox_workers(app: FastAPI, dispatcher: TelegramDispatcher):
+    """Workers que processam a caixa de entrada do webhook do Mercado Pago."""
+    app.state.inbox_pool = InboxWorkerPool(partial(process_payment_notification, dispatcher=dispatcher))
+    app.state.inbox_pool.start()
+    try:
+        yield
+    finally:
+        await app.state.inbox_pool.stop()
+
+api = FastAPI(lifespan=lifespan)
+
+async def process_payment_notification(payment_id: str, dispatcher: TelegramDispatcher) -> None:
     """
-    Função assíncrona para enviar o conteúdo digital ao usuário via Telegram.
+    Processa uma notificação da caixa de entrada: consulta o pagamento no Mercado Pago,
+    marca o pedido como pago e entrega o produto. Exceções fazem o worker reagendar a linha.
     """
-    success_message = (
-        f"Pagamento aprovado!\n\n"
-        f"Seu conteúdo '{product.name}' está liberado:\n{product.content}"
-    )
-    
-    try:
-        await ptb_app.bot.send_message(
-            chat_id=order.user_id,
-            text=success_message
-        )
-        print(f"Produto entregue com sucesso para o pedido {order.id}")
-    except Exception as e:
-        print(f"Erro ao entregar o produto para o pedido {order.id}: {e}")
+    payment_info = await get_payment(payment_id)
+    payment_status = payment_info.get("status")
+    logger.info("Pagamento %s com status %s no Mercado Pago.", payment_id, payment_status,
+                extra={"payment_id": payment_id, "sampled": True})
+
+    if payment_status != "approved":
+        return
+
+    order_id_str = payment_info.get("external_reference")
+    if not order_id_str:
+        logger.warning("Pagamento %s não possui external_reference.", payment_id, extra={"payment_id": payment_id})
+        return
+
+    approved_at = parse_mp_datetime(payment_info.get("date_approved"))
+    # Convertendo a string de volta para um objeto UUID
+    await fulfill_order(uuid.UUID(order_id_str), dispatcher, approved_at)
 
 @api.post("/webhook/mercadopago")
 async def mercadopago_webhook(request: Request):
     """
-    Endpoint que recebe, valida e processa as notificações de pagamento.
+    Endpoint que recebe e valida as notificações de pagamento.
+    A notificação é apenas gravada na caixa de entrada; os workers a processam depois.
     """
-    ptb_app: Application = request.app.state.ptb_app
-    
     try:
         body_bytes = await validate_mercadopago_signature(request)
     except HTTPException as e:
-        if e.status_code == 403:
-            print("Recebida notificação com assinatura inválida. Ignorando.")
+        # Assinatura inválida/expirada ou notificação repetida: responde 200 para o
+        # Mercado Pago não reenviar, sem fazer nenhum trabalho.
+        if e.status_code in (status.HTTP_403_FORBIDDEN, status.HTTP_409_CONFLICT):
             return Response(status_code=status.HTTP_200_OK)
         raise e
 
     notification_data = json.loads(body_bytes)
-    
+
     if notification_data.get("type") == "payment":
         payment_id = notification_data.get("data", {}).get("id")
         if not payment_id:
             return Response(status_code=status.HTTP_200_OK)
 
-        print(f"Notificação recebida para o pagamento ID: {payment_id}. Verificando status na API...")
-        
-        try:
-            payment_info_response = sdk.payment().get(payment_id)
-            payment_info = payment_info_response.get("response", {})
-            payment_status = payment_info.get("status")
-            print(f"Status retornado pela API para o pagamento {payment_id}: {payment_status}")
-
-            if payment_status == "approved":
-                db: Session = SessionLocal()
-                try:
-                    order_id_str = payment_info.get("external_reference")
-                    if not order_id_str:
-                         print(f"Webhook para pagamento {payment_id} não possui external_reference.")
-                         return Response(status_code=status.HTTP_200_OK)
-
-                    # --- AQUI ESTÁ A CORREÇÃO ---
-                    # Convertendo a string de volta para um objeto UUID
-                    order_uuid = uuid.UUID(order_id_str)
-                    
-                    # Usando o objeto UUID na busca
-                    order = db.query(Order).filter(Order.id == order_uuid).first()
-
-                    if not order or order.status == OrderStatus.PAID:
-                        print(f"Pedido {order_id_str} não encontrado ou já processado.")
-                        return Response(status_code=status.HTTP_200_OK)
-
-                    order.status = OrderStatus.PAID
-                    db.commit()
-                    db.refresh(order)
-                    print(f"Pedido {order.id} atualizado para PAGO.")
-                    
-                    product = db.query(Product).filter(Product.id == order.product_id).first()
-                    if product:
-                        await deliver_product(order, product, ptb_app)
-                    else:
-                        print(f"ERRO CRÍTICO: Produto não encontrado para o pedido {order.id}")
-                finally:
-                    db.close()
-            else:
-                print(f"Pagamento {payment_id} não está aprovado ({payment_status}). Nenhuma ação será tomada.")
-        
-        except Exception as e:
-            print(f"Erro ao processar o webhook para o pagamento {payment_id}: {e}")
-
-    return Response(status_code=status.HTTP_200_OK)
\ No newline at end of file
+        async with AsyncSessionLocal() as db:
+            await enqueue_notification(db, str(payment_id), request.headers["x-request-id"])
+        request.app.state.inbox_pool.notify()
+
+    # Só agora, com a notificação gravada, os reenvios passam a ser descartados: se algo
+    # acima falhar (500), o reenvio do Mercado Pago precisa ser aceito.
+    remember_notification(request)
+
+    return Response(status_code=status.HTTP_200_OK)
+
+@api.post("/webhook/telegram")
+async def telegram_webhook(request: Request):
+    """
+    Endpoint que recebe as atualizações do Telegram no modo webhook.
+    A atualização vai direto para a fila da aplicação do bot, que roda neste mesmo loop.
+    Sem TELEGRAM_WEBHOOK_SECRET configurado (ex.: modo polling) tudo é recusado.
+    """
+    received = request.headers.get("x-telegram-bot-api-secret-token", "")
+    if not TELEGRAM_WEBHOOK_SECRET or not hmac.compare_digest(received, TELEGRAM_WEBHOOK_SECRET):
+        return Response(status_code=status.HTTP_403_FORBIDDEN)
+
+    ptb_app: Application | None = request.app.state.ptb_app
+    if ptb_app is None:
+        # Camada web sem estado (APP_ROLE=web): as atualizações vão para o processo do bot.
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    update = Update.de_json(await request.json(), ptb_app.bot)
+    await ptb_app.update_queue.put(update)
+    return Response(status_code=status.HTTP_200_OK)
+
+@api.get("/metrics")
+async def metrics():
+    """Métricas deste processo no formato texto do Prometheus."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,124 @@
+# web/worker.py
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable
+
+from core.config import (
+    INBOX_WORKERS,
+    INBOX_BATCH_SIZE,
+    INBOX_POLL_INTERVAL,
+    INBOX_MAX_ATTEMPTS,
+    INBOX_LEASE_SECONDS,
+)
+from database.database import AsyncSessionLocal
+from database.inbox import claim_batch, mark_done, mark_failed_attempt
+from database.models import WebhookInbox, InboxStatus
+
+logger = logging.getLogger(__name__)
+
+class InboxWorkerPool:
+    """
+    Pool de workers assíncronos que esvazia a caixa de entrada do webhook (webhook_inbox).
+
+    Cada worker reserva um lote de linhas, chama `process(payment_id)` para todas elas
+    em paralelo e registra o resultado. Falhas são reagendadas com backoff até `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[str], Awaitable[None]],
+        workers: int = INBOX_WORKERS,
+        batch_size: int = INBOX_BATCH_SIZE,
+        poll_interval: float = INBOX_POLL_INTERVAL,
+        max_attempts: int = INBOX_MAX_ATTEMPTS,
+        lease_seconds: float = INBOX_LEASE_SECONDS,
+    ):
+        self._process = process
+        self._workers = workers
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._lease_seconds = lease_seconds
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        for worker_id in range(self._workers):
+            self._tasks.append(asyncio.create_task(self._run(worker_id), name=f"inbox-worker-{worker_id}"))
+        logger.info("Pool da caixa de entrada iniciado com %s workers.", self._workers)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def notify(self) -> None:
+        """Acorda os workers ociosos assim que uma nova notificação é gravada."""
+        self._wakeup.set()
+
+    async def _run(self, worker_id: int) -> None:
+        worker_token = f"{uuid.uuid4()}:{worker_id}"
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    batch = await claim_batch(db, worker_token, self._batch_size, self._lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Worker %s falhou ao reservar lote da caixa de entrada.", worker_id)
+                batch = []
+
+            if not batch:
+                await self._wait_for_work()
+                continue
+
+            # As linhas do lote são processadas em paralelo; o próximo lote só é
+            # reservado quando todas terminarem.
+            try:
+                await asyncio.gather(*(self._handle(entry, worker_token) for entry in batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Nenhum erro pode encerrar o worker: as linhas ficam com a posse e são
+                # retomadas quando ela expirar.
+                logger.exception("Worker %s falhou ao processar lote da caixa de entrada.", worker_id)
+
+    async def _wait_for_work(self) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _handle(self, entry: WebhookInbox, worker_token: str) -> None:
+        try:
+            await self._handle_entry(entry, worker_token)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Falha ao registrar o resultado (ex.: banco ocupado): a linha continua
+            # PROCESSING e é retomada por outro worker quando a posse expirar.
+            logger.exception("Falha ao registrar o resultado da notificação do pagamento %s.", entry.payment_id)
+
+    async def _handle_entry(self, entry: WebhookInbox, worker_token: str) -> None:
+        try:
+            await self._process(entry.payment_id)
+        except asyncio.CancelledError:
+            # A posse da linha expira e outro worker a retoma depois.
+            raise
+        except Exception as e:
+            async with AsyncSessionLocal() as db:
+                new_status = await mark_failed_attempt(db, entry, worker_token, repr(e), self._max_attempts)
+            if new_status == InboxStatus.FAILED:
+                logger.error("Notificação do pagamento %s falhou definitivamente após %s tentativas: %r",
+                             entry.payment_id, entry.attempts, e)
+            else:
+                logger.warning("Notificação do pagamento %s falhou (tentativa %s), será reprocessada: %r",
+                               entry.payment_id, entry.attempts, e)
+            return
+
+        async with AsyncSessionLocal() as db:
+            await mark_done(db, entry.id, worker_token)